@@ -1,6 +1,9 @@
-from flask import Flask, redirect, render_template, request, make_response, session, abort, url_for
+from flask import Flask, redirect, render_template, request, make_response, session, abort, url_for, Response, stream_with_context
 import secrets
 import sys
+import json
+import threading
+import time
 from functools import wraps
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
@@ -313,6 +316,14 @@ def settings():
 def health():
     return jsonify({"status": "ok"}), 200
 
+@app.get("/ready")
+@limiter.exempt
+def ready():
+    """Readiness probe: 503 until this worker has loaded and warmed up its models."""
+    from services_warmup import get_readiness
+    readiness = get_readiness()
+    return jsonify(readiness), 200 if readiness["ready"] else 503
+
 @app.get("/firestore-test")
 def firestore_test():
     doc = db.collection("diagnostics").document("ping")
@@ -336,6 +347,9 @@ def score_daily():
     Legacy endpoint for daily pronunciation challenges.
     Now uses unified submit_challenge_answer logic.
     Kept for backwards compatibility.
+
+    Send "async": true to get a job ID back immediately (202) instead of
+    waiting for the evaluation; see /api/jobs/<job_id>.
     """
     from services_challenges import submit_challenge_answer
 
@@ -350,6 +364,15 @@ def score_daily():
     if not audio_url:
         return jsonify({"error": "audio_url is required"}), 400
 
+    if body.get("async"):
+        return enqueue_submission_job(
+            uid,
+            challenge_id=challenge_id,
+            user_answer=None,
+            audio_url=audio_url,
+            xp_multiplier=1.0  # Daily = 1x
+        )
+
     try:
         result = submit_challenge_answer(
             uid=uid,
@@ -655,7 +678,8 @@ def submit_challenge():
     {
         "challenge_id": "...",
         "user_answer": "text" | 0-3 | null,  # For text/MC challenges (null for pronunciation)
-        "audio_url": "..."  # Required for pronunciation challenges
+        "audio_url": "...",  # Required for pronunciation challenges
+        "async": false  # Optional: return a job ID immediately (202) and score in the background
     }
 
     Response format (consistent for all types):
@@ -681,6 +705,15 @@ def submit_challenge():
     if not challenge_id:
         return jsonify({"error": "challenge_id is required"}), 400
 
+    if body.get("async"):
+        return enqueue_submission_job(
+            uid,
+            challenge_id=challenge_id,
+            user_answer=user_answer,
+            audio_url=audio_url,
+            xp_multiplier=1.0  # Default multiplier for unified endpoint
+        )
+
     try:
         result = submit_challenge_answer(
             uid=uid,
@@ -699,6 +732,126 @@ def submit_challenge():
         return jsonify({"error": "Failed to submit challenge"}), 500
 
 
+# ============================================================================
+# Background Evaluation Jobs
+# ============================================================================
+
+def enqueue_submission_job(uid, **submission):
+    """
+    Queue submit_challenge_answer() as a background job.
+    XP, streak and badge side effects run when the job finishes.
+
+    Returns:
+        Flask response (202) with the job ID and where to fetch the result
+    """
+    from services_challenges import submit_challenge_answer
+    from services_jobs import enqueue_job
+
+    job_id = enqueue_job(uid, "challenge_submit", submit_challenge_answer, uid=uid, **submission)
+
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": url_for("get_job_status", job_id=job_id),
+        "events_url": url_for("stream_job_events", job_id=job_id)
+    }), 202
+
+
+@app.get("/api/jobs/<job_id>")
+@limiter.exempt
+@require_auth
+def get_job_status(job_id):
+    """
+    Poll a background evaluation job.
+
+    Response:
+    {
+        "id": "...",
+        "status": "queued" | "running" | "done" | "failed",
+        "result": {...} | null,  # Same body the synchronous endpoint returns
+        "error": "..." | null
+    }
+    """
+    from services_jobs import get_job
+
+    job = get_job(job_id, uid=request.user["uid"])
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(job), 200
+
+
+# Each open SSE stream holds a request thread; cap them so they can't starve other requests
+_job_event_streams = threading.BoundedSemaphore(max(1, app.config['JOB_EVENTS_MAX_STREAMS']))
+
+
+@app.get("/api/jobs/<job_id>/events")
+@limiter.exempt
+@require_auth
+def stream_job_events(job_id):
+    """
+    Server-Sent Events stream for a background evaluation job.
+
+    Emits a "status" event whenever the status changes and a final "result"
+    event with the full job. The stream closes after JOB_EVENTS_TIMEOUT seconds
+    with a "timeout" event so request threads are never held for long; clients
+    simply reconnect. At most JOB_EVENTS_MAX_STREAMS streams are open per
+    worker; beyond that the request gets 503 and should poll status_url.
+    """
+    from services_jobs import get_job, TERMINAL_STATUSES
+
+    uid = request.user["uid"]
+    if not get_job(job_id, uid=uid):
+        return jsonify({"error": "Job not found"}), 404
+
+    if not _job_event_streams.acquire(blocking=False):
+        response = jsonify({
+            "error": "Too many open event streams, poll the job status instead",
+            "status_url": url_for("get_job_status", job_id=job_id)
+        })
+        response.headers["Retry-After"] = str(int(app.config['JOB_POLL_INTERVAL']) or 1)
+        return response, 503
+
+    events_timeout = app.config['JOB_EVENTS_TIMEOUT']
+    poll_interval = app.config['JOB_POLL_INTERVAL']
+
+    def generate():
+        deadline = time.monotonic() + events_timeout
+        last_status = None
+
+        yield f"retry: {int(poll_interval * 1000)}\n\n"
+
+        while True:
+            job = get_job(job_id, uid=uid)
+            if job is None:
+                yield "event: error\ndata: {\"error\": \"Job not found\"}\n\n"
+                return
+
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {json.dumps({'id': job_id, 'status': last_status})}\n\n"
+
+            if last_status in TERMINAL_STATUSES:
+                yield f"event: result\ndata: {json.dumps(job)}\n\n"
+                return
+
+            if time.monotonic() >= deadline:
+                yield f"event: timeout\ndata: {json.dumps({'id': job_id, 'status': last_status})}\n\n"
+                return
+
+            time.sleep(poll_interval)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Runs when the server closes the response (stream finished or client gone)
+    response.call_on_close(_job_event_streams.release)
+    return response
+
+
 @app.post("/api/challenges/irl/verify")
 @require_auth
 def verify_irl():
@@ -1144,6 +1297,82 @@ def admin_generate_challenges():
         return jsonify({"error": str(e)}), 500
 
 
+@app.get("/admin/metrics")
+@require_auth
+def admin_metrics():
+    """
+    Runtime metrics of this worker process.
+
+    Returns:
+        {
+            "text_analysis": {cache: {...}, breaker: {...}, llm_calls, fallbacks},
+            "ollama": {purpose: {calls, failures, retries, tokens_per_second, ...}},
+            "pool_refill": {running, last_cycle, cycles, generated, saved, deferred_cycles}
+        }
+    """
+    from services_irl_verification import get_text_analysis_metrics
+    from services_ollama import get_ollama_metrics
+    from services_pool_refill import get_refill_scheduler_status
+    return jsonify({
+        "text_analysis": get_text_analysis_metrics(),
+        "ollama": get_ollama_metrics(),
+        "pool_refill": get_refill_scheduler_status()
+    }), 200
+
+
+@app.get("/admin/pool-stats")
+@require_auth
+def admin_pool_stats():
+    """
+    Challenge pool counts and health (aggregation count queries, cached per worker).
+
+    Query params:
+        level: Optional CEFR level to filter the stats by
+
+    Returns:
+        {
+            "stats": {total, by_status, by_type, by_cefr_level},
+            "health": {healthy, warnings, available_by_level}
+        }
+    """
+    from services_challenge_pool import get_pool_stats, get_pool_health
+    try:
+        level = request.args.get("level")
+        if level and level not in ["A1", "A2", "B1", "B2", "C1", "C2"]:
+            raise ValidationError("level must be a valid CEFR level (A1-C2)")
+
+        return jsonify({
+            "stats": get_pool_stats(cefr_level=level),
+            "health": get_pool_health()
+        }), 200
+
+    except ValidationError as e:
+        return jsonify({"error": e.message}), e.status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.get("/admin/pool-forecast")
+@require_auth
+def admin_pool_forecast():
+    """
+    Drain forecast and refill plan of the predictive pool refill (nothing is generated).
+
+    Returns:
+        {
+            "forecast": [{cefr_level, type, available, uses_per_hour, drain_per_hour,
+                          hours_to_empty, target, needed}, ...],
+            "planned": [{cefr_level, type, count}, ...]
+        }
+    """
+    from services_pool_refill import run_refill_cycle
+    try:
+        cycle = run_refill_cycle(dry_run=True)
+        return jsonify({"forecast": cycle["forecast"], "planned": cycle["planned"]}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.post("/admin/refill-pool")
 @require_auth
 def admin_refill_pool():
@@ -1292,5 +1521,10 @@ def admin_generate_single_challenge():
 
 
 if __name__ == '__main__':
+    from services_warmup import start_warmup
+    from services_pool_refill import start_refill_scheduler
+    start_warmup()
+    start_refill_scheduler()
+
     # Bind to 0.0.0.0 to accept connections from network/tunnel (works on all machines)
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+CLIP Runtime Benchmark
+
+Compares CLIP photo verification runtimes (fp32 vs int8 vision encoder, torch
+thread count) on a local fixture set of photos. Reports per-photo latency
+(decode + preprocess + vision encoder + keyword matmul) and how well each
+runtime's verdicts agree with the reference runtime (the first one).
+
+Fixture set layout:
+    benchmarks/fixtures/images/manifest.json
+    [
+        {"file": "kaffe.jpg", "topic": "cafe"},
+        ...
+    ]
+
+Usage:
+    python benchmarks/benchmark_clip_runtime.py
+    python benchmarks/benchmark_clip_runtime.py --runtimes fp32:4 int8:4 int8:1 --repeat 5
+"""
+
+import sys
+import os
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services_irl_verification import (
+    load_clip_backend,
+    clip_topic_probs,
+    _load_topic_embeddings,
+    PHOTO_VERIFY_THRESHOLD
+)
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "images")
+
+DEFAULT_RUNTIMES = [
+    f"fp32:{os.cpu_count() or 1}",
+    f"int8:{os.cpu_count() or 1}",
+    "fp32:1",
+    "int8:1"
+]
+
+
+def load_fixtures(fixtures_dir):
+    """
+    Load the fixture manifest and read photos into memory.
+
+    Returns:
+        list of dicts with 'name', 'topic' and 'data' (bytes)
+    """
+    with open(os.path.join(fixtures_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    fixtures = []
+    for entry in manifest:
+        with open(os.path.join(fixtures_dir, entry["file"]), "rb") as f:
+            fixtures.append({"name": entry["file"], "topic": entry["topic"], "data": f.read()})
+
+    return fixtures
+
+
+def parse_runtime(spec):
+    """Parse 'precision:threads' (e.g. 'int8:2')."""
+    precision, threads = spec.split(":")
+    if precision not in ("fp32", "int8"):
+        raise ValueError(f"Unknown precision '{precision}' in runtime '{spec}'")
+    return {"name": spec, "quantize_int8": precision == "int8", "num_threads": int(threads)}
+
+
+def run_runtime(runtime, fixtures, repeat):
+    """
+    Verify every fixture photo with one runtime.
+
+    Returns:
+        dict with 'load_s', 'latencies_ms' and per-photo 'results'
+    """
+    # The app sets this once per process (TORCH_NUM_THREADS); here each runtime gets its own
+    torch.set_num_threads(runtime["num_threads"])
+
+    start = time.perf_counter()
+    model, processor = load_clip_backend(runtime["quantize_int8"])
+    embeddings = _load_topic_embeddings(model, processor)
+    load_s = time.perf_counter() - start
+
+    # One untimed pass so lazy initialization isn't counted
+    keywords, text_embeddings = embeddings.get(fixtures[0]["topic"], embeddings[None])
+    clip_topic_probs(model, text_embeddings, fixtures[0]["data"])
+
+    latencies_ms = []
+    results = []
+    for fixture in fixtures:
+        keywords, text_embeddings = embeddings.get(fixture["topic"], embeddings[None])
+        for _ in range(repeat):
+            start = time.perf_counter()
+            probs = clip_topic_probs(model, text_embeddings, fixture["data"])
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        best_idx = probs.argmax().item()
+        confidence = float(probs[0][best_idx].item())
+        results.append({
+            "confidence": confidence,
+            "best_match": keywords[best_idx],
+            "verified": confidence > PHOTO_VERIFY_THRESHOLD
+        })
+
+    return {"load_s": load_s, "latencies_ms": latencies_ms, "results": results}
+
+
+def main():
+    """Main entry point for CLI usage."""
+    parser = argparse.ArgumentParser(description="Benchmark CLIP photo verification runtimes")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Folder with manifest.json and photos")
+    parser.add_argument("--runtimes", nargs="+", default=DEFAULT_RUNTIMES, help="precision:threads specs")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per photo")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    runtimes = [parse_runtime(spec) for spec in args.runtimes]
+    print(f"Benchmarking {len(runtimes)} CLIP runtimes on {len(fixtures)} photos (x{args.repeat})\n")
+
+    reference = None
+    print(f"{'='*88}")
+    print(f"{'Runtime':<10} {'Load':>7} {'Mean':>9} {'p95':>9} {'Verdict agree':>14} "
+          f"{'Match agree':>12} {'|Δ conf|':>9}")
+    print(f"{'='*88}")
+
+    for runtime in runtimes:
+        run = run_runtime(runtime, fixtures, args.repeat)
+        if reference is None:
+            reference = run["results"]
+
+        pairs = list(zip(run["results"], reference))
+        verdict_agree = sum(r["verified"] == ref["verified"] for r, ref in pairs) / len(pairs)
+        match_agree = sum(r["best_match"] == ref["best_match"] for r, ref in pairs) / len(pairs)
+        conf_diff = sum(abs(r["confidence"] - ref["confidence"]) for r, ref in pairs) / len(pairs)
+
+        latencies = np.array(run["latencies_ms"])
+        print(f"{runtime['name']:<10} {run['load_s']:>6.1f}s {latencies.mean():>6.1f} ms "
+              f"{np.percentile(latencies, 95):>6.1f} ms {verdict_agree:>13.0%} "
+              f"{match_agree:>11.0%} {conf_diff:>9.3f}")
+
+    print(f"{'='*88}")
+    print(f"Agreement is measured against {runtimes[0]['name']}; threshold {PHOTO_VERIFY_THRESHOLD}.")
+
+
+if __name__ == "__main__":
+    main()
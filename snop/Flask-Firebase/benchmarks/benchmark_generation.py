@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Challenge Generation Benchmark
+
+Compares single-challenge prompts with multi-challenge prompts against the
+local Ollama server. Every mode generates the same mix of challenge types and
+difficulties; for each it reports throughput, how many challenges came out
+valid, and prompt (prefill) and output tokens per generated challenge.
+
+Requires a running Ollama server with the configured model (OLLAMA_MODEL).
+
+Usage:
+    python benchmarks/benchmark_generation.py
+    python benchmarks/benchmark_generation.py --count 24 --per-prompt 1 4 8 --concurrency 2
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services_ollama
+from services_ai_generation import generate_challenges_concurrently
+
+CHALLENGE_TYPES = ["pronunciation", "listening", "fill_blank", "multiple_choice"]
+
+
+def build_specs(count):
+    """Same mix of types and difficulties for every mode (topics are picked by the generators)."""
+    return [
+        {"type": CHALLENGE_TYPES[i % len(CHALLENGE_TYPES)], "difficulty": 1 + (i // len(CHALLENGE_TYPES)) % 3}
+        for i in range(count)
+    ]
+
+
+def run_mode(specs, per_prompt):
+    """
+    Generate specs with one per-prompt setting.
+
+    Returns:
+        dict with the batch 'stats' and summed Ollama token counts
+    """
+    services_ollama._metrics.clear()
+    batch = generate_challenges_concurrently(specs, per_prompt=per_prompt)
+    metrics = services_ollama.get_ollama_metrics().values()
+
+    return {
+        "stats": batch["stats"],
+        "calls": sum(m["calls"] for m in metrics),
+        "prompt_tokens": sum(m["prompt_tokens"] for m in metrics),
+        "eval_tokens": sum(m["eval_tokens"] for m in metrics)
+    }
+
+
+def main():
+    """Main entry point for CLI usage."""
+    parser = argparse.ArgumentParser(description="Benchmark single vs multi-challenge generation prompts")
+    parser.add_argument("--count", type=int, default=12, help="Challenges per mode")
+    parser.add_argument("--per-prompt", type=int, nargs="+", default=[1, 3, 6], help="Challenges per prompt to compare")
+    parser.add_argument("--concurrency", type=int, default=None, help="Override GENERATION_CONCURRENCY")
+    args = parser.parse_args()
+
+    from config import get_config
+    cfg = get_config()
+    if args.concurrency:
+        # Read when the generation pool is first created
+        cfg.GENERATION_CONCURRENCY = args.concurrency
+
+    specs = build_specs(args.count)
+    print(f"Generating {len(specs)} challenges per mode with {cfg.OLLAMA_MODEL} "
+          f"({cfg.GENERATION_CONCURRENCY} requests in flight)\n")
+
+    print(f"{'='*84}")
+    print(f"{'Per prompt':<11} {'Calls':>6} {'Valid':>8} {'Seconds':>9} {'Per min':>9} "
+          f"{'Prompt tok/ch':>14} {'Output tok/ch':>14}")
+    print(f"{'='*84}")
+
+    for per_prompt in args.per_prompt:
+        run = run_mode(specs, per_prompt)
+        stats = run["stats"]
+        generated = max(stats["generated"], 1)
+        print(f"{per_prompt:<11} {run['calls']:>6} {stats['generated']:>4}/{stats['requested']:<3} "
+              f"{stats['seconds']:>8.1f}s {stats['challenges_per_minute'] or 0:>9.1f} "
+              f"{run['prompt_tokens'] / generated:>14.0f} {run['eval_tokens'] / generated:>14.0f}")
+
+    print(f"{'='*84}")
+    print("Calls include per-item retries. Tokens are summed over all calls, including failed ones.")
+
+
+if __name__ == "__main__":
+    main()
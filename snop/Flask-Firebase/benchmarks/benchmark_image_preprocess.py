@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+IRL Photo Preprocessing Benchmark
+
+Compares decode + preprocess time of the old verify_photo path (full-resolution
+Image.open + CLIPProcessor) against services_images.preprocess_for_clip (JPEG
+draft-mode decode + NumPy center crop), and reports how far the resulting CLIP
+pixel values differ.
+
+Images are read from benchmarks/fixtures/images/ (*.jpg, *.jpeg, *.png). If the
+folder is empty, synthetic 12 MP JPEGs are generated in memory.
+
+Usage:
+    python benchmarks/benchmark_image_preprocess.py
+    python benchmarks/benchmark_image_preprocess.py --fixtures path/to/photos --repeat 5
+"""
+
+import sys
+import os
+import argparse
+import glob
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services_images import preprocess_for_clip
+from services_irl_verification import CLIP_MODEL_NAME
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "images")
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def load_fixtures(fixtures_dir, synthetic):
+    """Return (name, bytes) pairs for the fixture photos."""
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(fixtures_dir, pattern)))
+    if paths:
+        fixtures = []
+        for path in paths:
+            with open(path, "rb") as f:
+                fixtures.append((os.path.basename(path), f.read()))
+        return fixtures
+
+    print(f"No images in {fixtures_dir}, generating {synthetic} synthetic 4032x3024 JPEGs")
+    rng = np.random.default_rng(21)
+    fixtures = []
+    for i in range(synthetic):
+        # Smooth gradient plus noise compresses roughly like a phone photo
+        y, x = np.mgrid[0:3024, 0:4032]
+        base = np.stack([x * 255 // 4032, y * 255 // 3024, (x + y) * 255 // 7056], axis=-1)
+        pixels = np.clip(base + rng.integers(-20, 20, base.shape), 0, 255).astype(np.uint8)
+        buffer = BytesIO()
+        Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+        fixtures.append((f"synthetic_{i}.jpg", buffer.getvalue()))
+    return fixtures
+
+
+def old_preprocess(processor, data):
+    """The previous verify_photo path: full decode, then CLIPProcessor."""
+    image = Image.open(BytesIO(data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return processor(images=image, return_tensors="np")["pixel_values"]
+
+
+def time_ms(func, data, repeat):
+    """Average milliseconds per call and the last result."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(data)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    """Main entry point for CLI usage."""
+    parser = argparse.ArgumentParser(description="Benchmark IRL photo decode + CLIP preprocessing")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Folder with photos")
+    parser.add_argument("--synthetic", type=int, default=3, help="Synthetic photos if the folder is empty")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per image and path")
+    args = parser.parse_args()
+
+    from transformers import CLIPProcessor
+    processor = CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+
+    fixtures = load_fixtures(args.fixtures, args.synthetic)
+
+    print(f"{'='*82}")
+    print(f"{'Image':<26} {'Size':>11} {'CLIPProcessor':>14} {'Draft+NumPy':>12} {'Speedup':>8} {'Max |Δ|':>8}")
+    print(f"{'='*82}")
+
+    total_old = total_new = 0.0
+    for name, data in fixtures:
+        size = "x".join(str(n) for n in Image.open(BytesIO(data)).size)
+
+        old_ms, old_pixels = time_ms(lambda d: old_preprocess(processor, d), data, args.repeat)
+        new_ms, new_pixels = time_ms(preprocess_for_clip, data, args.repeat)
+        total_old += old_ms
+        total_new += new_ms
+
+        # Pixel values are normalized, so |Δ| ~0.1 is a few 8-bit levels
+        max_diff = float(np.abs(old_pixels - new_pixels).max())
+
+        print(f"{name[:26]:<26} {size:>11} {old_ms:>11.1f} ms {new_ms:>9.1f} ms "
+              f"{old_ms / new_ms:>7.1f}x {max_diff:>8.3f}")
+
+    print(f"{'='*82}")
+    print(f"{'Mean':<26} {'':>11} {total_old / len(fixtures):>11.1f} ms {total_new / len(fixtures):>9.1f} ms "
+          f"{total_old / total_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
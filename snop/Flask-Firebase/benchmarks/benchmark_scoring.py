@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Pronunciation Scoring Benchmark
+
+Measures the scoring paths in services_scoring.py on target phrases from
+cefr_challenges.json with simulated transcription errors (dropped and inserted
+words, substituted, inserted and transposed letters):
+- SequenceMatcher ratio alone (the overall similarity the thresholds use)
+- score_alignment (ratio + per-word flags, the request-time path)
+- the phonetic path (G2P + weighted phoneme edit distance)
+- a 2 * LCS / (n + m) ratio, with how far it drifts from SequenceMatcher and
+  how many results it would move across the feedback/XP thresholds
+Also shows how both scoring modes treat Norwegian minimal pairs and spelling variants.
+
+Usage:
+    python benchmarks/benchmark_scoring.py
+    python benchmarks/benchmark_scoring.py --repeat 2000
+"""
+
+import sys
+import os
+import argparse
+import json
+import random
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services_pronunciation import normalize_text
+from services_scoring import similarity_ratio, score_alignment
+from services_phonetics import text_to_phonemes, phonetic_similarity
+
+# Feedback and XP bands in services_pronunciation.py
+THRESHOLDS = (0.5, 0.7, 0.85, 0.95)
+
+CHALLENGES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cefr_challenges.json")
+
+
+def load_targets():
+    """Load target phrases grouped by CEFR level."""
+    with open(CHALLENGES_PATH, "r", encoding="utf-8") as f:
+        challenges = json.load(f).get("challenges", [])
+
+    targets = {}
+    for challenge in challenges:
+        text = challenge.get("target") or challenge.get("sentence") or challenge.get("prompt")
+        if text:
+            targets.setdefault(challenge.get("cefr_level", "A1"), []).append(normalize_text(text))
+    return targets
+
+
+# (heard, target) - same sound spelled differently, then true minimal pairs
+MINIMAL_PAIRS = [
+    ("tjøre", "kjøre"),
+    ("vor", "hvor"),
+    ("skjære", "sjære"),
+    ("jente", "gjente"),
+    ("kjøre", "sjøre"),
+    ("tak", "takk"),
+    ("hus", "hys"),
+    ("kjøre", "kaffe"),
+]
+
+
+def phonetic_score(transcription, target):
+    """Phonetic path as used at request time (target phonemes precomputed)."""
+    return phonetic_similarity(text_to_phonemes(transcription), text_to_phonemes(target))
+
+
+def simulate_transcription(target, rng):
+    """
+    Introduce typical ASR errors: dropped and inserted words, substituted,
+    inserted and transposed letters.
+    """
+    letters = "abcdefghijklmnopqrstuvwxyzæøå"
+    noisy = []
+    for word in target.split():
+        if rng.random() < 0.1:
+            continue
+        if len(word) > 1 and rng.random() < 0.3:
+            i = rng.randrange(len(word))
+            edit = rng.choice(("substitute", "insert", "transpose"))
+            if edit == "substitute":
+                word = word[:i] + rng.choice(letters) + word[i + 1:]
+            elif edit == "insert":
+                word = word[:i] + rng.choice(letters) + word[i:]
+            else:
+                i = min(i, len(word) - 2)
+                word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        noisy.append(word)
+        if rng.random() < 0.1:
+            noisy.append(rng.choice(("og", "eh", "jo", "da")))
+    return " ".join(noisy)
+
+
+def lcs_length(a, b):
+    """
+    Length of the longest common subsequence of two strings.
+    2 * lcs_length(a, b) / (len(a) + len(b)) bounds SequenceMatcher's ratio from above.
+
+    Bit-parallel DP (Allison-Dix / Hyyrö): each DP column is packed into one
+    Python integer, so a whole column is updated with a handful of big-int
+    operations per character of b instead of one Python step per cell.
+
+    Args:
+        a: str - First string
+        b: str - Second string
+
+    Returns:
+        int - LCS length
+    """
+    if not a or not b:
+        return 0
+
+    # Bit mask of positions in a for every character
+    masks = {}
+    for i, ch in enumerate(a):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+
+    full = (1 << len(a)) - 1
+    v = full
+    for ch in b:
+        u = v & masks.get(ch, 0)
+        v = ((v + u) | (v - u)) & full
+
+    # Zero bits in v mark matched positions
+    return len(a) - bin(v).count("1")
+
+
+def lcs_ratio(a, b):
+    """2 * LCS / (n + m), the ratio that was considered in place of SequenceMatcher's."""
+    total = len(a) + len(b)
+    return 2.0 * lcs_length(a, b) / total if total else 1.0
+
+
+def band(ratio):
+    """Index of the feedback/XP band a ratio falls in."""
+    return sum(ratio >= t for t in THRESHOLDS)
+
+
+def time_per_call(func, pairs, repeat):
+    """Average microseconds per call over all pairs."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for transcription, target in pairs:
+            func(transcription, target)
+    return (time.perf_counter() - start) / (repeat * len(pairs)) * 1e6
+
+
+def main():
+    """Main entry point for CLI usage."""
+    parser = argparse.ArgumentParser(description="Benchmark pronunciation similarity scoring")
+    parser.add_argument("--repeat", type=int, default=500, help="Passes over the phrase set per level")
+    parser.add_argument("--seed", type=int, default=21, help="Random seed for simulated errors")
+    parser.add_argument("--variants", type=int, default=100,
+                        help="Simulated transcriptions per phrase for the ratio comparison")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    targets = load_targets()
+
+    print(f"{'='*104}")
+    print(f"{'Level':<6} {'Pairs':>6} {'Avg len':>8} {'SequenceMatcher':>16} {'+ word align':>13} "
+          f"{'Phonetic':>10} {'LCS ratio':>10} {'Mean Δ':>7} {'Max Δ':>7} {'Band changes':>13}")
+    print(f"{'='*104}")
+
+    for level in sorted(targets):
+        pairs = [(simulate_transcription(t, rng), t) for t in targets[level]]
+        avg_len = sum(len(t) for _, t in pairs) / len(pairs)
+
+        ratio_us = time_per_call(similarity_ratio, pairs, args.repeat)
+        align_us = time_per_call(score_alignment, pairs, args.repeat)
+        phonetic_us = time_per_call(phonetic_score, pairs, args.repeat)
+        lcs_us = time_per_call(lcs_ratio, pairs, args.repeat)
+
+        # LCS ratio >= SequenceMatcher ratio, so the differences are never negative
+        variants = [(simulate_transcription(t, rng), t) for t in targets[level] for _ in range(args.variants)]
+        diffs = [lcs_ratio(a, b) - similarity_ratio(a, b) for a, b in variants]
+        band_changes = sum(band(lcs_ratio(a, b)) != band(similarity_ratio(a, b)) for a, b in variants)
+
+        print(f"{level:<6} {len(pairs):>6} {avg_len:>8.0f} {ratio_us:>13.1f} us {align_us:>10.1f} us "
+              f"{phonetic_us:>7.1f} us {lcs_us:>7.1f} us {sum(diffs) / len(diffs):>+7.3f} "
+              f"{max(diffs):>+7.3f} {band_changes:>13}")
+
+    print(f"{'='*104}")
+    print("'+ word align' is the full score_alignment() call (ratio + per-word flags).")
+    print("'Phonetic' includes G2P of both sides; at request time the target side is precomputed.")
+    print(f"Δ and 'Band changes' cover {args.variants} simulated transcriptions per phrase; 'Band changes'")
+    print(f"counts results the LCS ratio would move across a feedback/XP threshold {THRESHOLDS}.")
+
+    print(f"\n{'Heard':<10} {'Target':<10} {'Text':>6} {'Phonetic':>9}  Phonemes")
+    print(f"{'-'*70}")
+    for heard, target in MINIMAL_PAIRS:
+        print(f"{heard:<10} {target:<10} {similarity_ratio(heard, target):>6.2f} "
+              f"{phonetic_score(heard, target):>9.2f}  "
+              f"{' '.join(text_to_phonemes(heard))} / {' '.join(text_to_phonemes(target))}")
+
+
+if __name__ == "__main__":
+    main()
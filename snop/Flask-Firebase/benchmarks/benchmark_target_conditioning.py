@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Target Conditioning Benchmark
+
+Checks whether conditioning fast scoring on the target phrase (decoder prompt
+plus divergence stop, WHISPER_TARGET_CONDITIONING) inflates the scores of
+recordings that do NOT match their target. Every fixture is scored against its
+own target and against known-wrong targets, with three decoders:
+    full         - model.transcribe() with the configured decode options
+    fast         - _decode_with_target without conditioning
+    conditioned  - _decode_with_target with prompt and divergence stop
+
+Conditioning is only safe to enable if the wrong-target similarity and false
+pass rate of "conditioned" stay at the level of "full".
+
+Uses the same fixture set as benchmark_whisper_backends.py. Wrong targets come
+from the optional "wrong_targets" list of a manifest entry, or else from the
+other fixtures' targets:
+    [
+        {"file": "hei_hvordan.m4a", "target": "Hei, hvordan har du det?",
+         "wrong_targets": ["Hei, hvor bor du?"]},
+        ...
+    ]
+
+Usage:
+    python benchmarks/benchmark_target_conditioning.py
+    python benchmarks/benchmark_target_conditioning.py --fixtures path/to/audio --wrong-per-fixture 5
+"""
+
+import sys
+import os
+import argparse
+import json
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services_audio import load_audio, trim_silence
+from services_pronunciation import (
+    get_whisper_model,
+    get_whisper_settings,
+    get_decode_options,
+    calculate_similarity,
+    whisper_transcribe,
+    _decode_with_target
+)
+from benchmark_whisper_backends import DEFAULT_FIXTURES, PASS_THRESHOLD, load_fixtures
+
+DECODERS = ["full", "fast", "conditioned"]
+
+
+def load_wrong_targets(fixtures_dir, fixtures, per_fixture):
+    """
+    Known-wrong targets for every fixture.
+
+    Returns:
+        list of lists - Wrong targets, aligned with fixtures
+    """
+    with open(os.path.join(fixtures_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    wrong = []
+    for index, (entry, fixture) in enumerate(zip(manifest, fixtures)):
+        targets = entry.get("wrong_targets")
+        if not targets:
+            # The next fixtures' targets, skipping any that happen to be identical
+            others = fixtures[index + 1:] + fixtures[:index]
+            targets = [other["target"] for other in others if other["target"] != fixture["target"]]
+        wrong.append(targets[:per_fixture])
+    return wrong
+
+
+def transcribe(decoder, model, audio, target, settings, decode_options):
+    """Transcribe trimmed audio with one decoder (full, fast or conditioned)."""
+    if decoder != "full":
+        text = _decode_with_target(
+            model,
+            audio,
+            target,
+            settings["fast_token_margin"],
+            condition_on_target=decoder == "conditioned"
+        )
+        if text is not None:
+            return text
+    return whisper_transcribe(model, audio, **decode_options)["text"].strip()
+
+
+def summarize(similarities):
+    """Mean similarity and pass rate."""
+    if not similarities:
+        return 0.0, 0.0
+    mean = sum(similarities) / len(similarities)
+    passed = sum(1 for s in similarities if s >= PASS_THRESHOLD) / len(similarities)
+    return mean, passed
+
+
+def main():
+    """Main entry point for CLI usage."""
+    parser = argparse.ArgumentParser(description="Measure score inflation from target-conditioned decoding")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory with manifest.json and audio files")
+    parser.add_argument("--wrong-per-fixture", type=int, default=3, help="Known-wrong targets scored per fixture")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    wrong_targets = load_wrong_targets(args.fixtures, fixtures, args.wrong_per_fixture)
+    print(f"Loaded {len(fixtures)} fixtures, {sum(len(w) for w in wrong_targets)} known-wrong pairs")
+
+    model = get_whisper_model()
+    settings = get_whisper_settings()
+    decode_options = get_decode_options(settings["decoding"], settings["beam_size"])
+
+    scores = {decoder: {"right": [], "wrong": []} for decoder in DECODERS}
+    for fixture, wrong in zip(fixtures, wrong_targets):
+        audio = trim_silence(load_audio(fixture["path"]))
+        if audio is None:
+            continue
+        for decoder in DECODERS:
+            # Conditioned decoding depends on the target, so each pair gets its own transcript
+            text = transcribe(decoder, model, audio, fixture["target"], settings, decode_options)
+            scores[decoder]["right"].append(calculate_similarity(text, fixture["target"]))
+            for target in wrong:
+                if decoder != "full":
+                    text = transcribe(decoder, model, audio, target, settings, decode_options)
+                scores[decoder]["wrong"].append(calculate_similarity(text, target))
+
+    print(f"\n{'='*72}")
+    print(f"{'Decoder':<13} {'Right sim':>10} {'Right pass':>11} {'Wrong sim':>10} {'False pass':>11} {'Δ vs full':>10}")
+    print(f"{'='*72}")
+    full_wrong, _ = summarize(scores["full"]["wrong"])
+    for decoder in DECODERS:
+        right_mean, right_pass = summarize(scores[decoder]["right"])
+        wrong_mean, false_pass = summarize(scores[decoder]["wrong"])
+        print(f"{decoder:<13} {right_mean:>10.3f} {right_pass:>10.0%} {wrong_mean:>10.3f} "
+              f"{false_pass:>10.0%} {wrong_mean - full_wrong:>+10.3f}")
+    print(f"{'='*72}")
+    print("Δ vs full: wrong-target similarity inflation. Enable WHISPER_TARGET_CONDITIONING only if it is ~0.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Whisper Backend Benchmark
+
+Compares CPU Whisper backends (model size, int8 quantization, thread count,
+greedy vs beam decoding) on a local fixture set of recordings. Reports the
+real-time factor (processing time / audio duration) and how well each backend's
+calculate_similarity scores agree with the reference backend (the first one).
+
+Fixture set layout:
+    benchmarks/fixtures/audio/manifest.json
+    [
+        {"file": "hei_hvordan.m4a", "target": "Hei, hvordan har du det?"},
+        ...
+    ]
+
+Usage:
+    python benchmarks/benchmark_whisper_backends.py
+    python benchmarks/benchmark_whisper_backends.py --fixtures path/to/audio
+    python benchmarks/benchmark_whisper_backends.py --backends base:fp32:greedy tiny:int8:greedy --threads 2
+"""
+
+import sys
+import os
+import argparse
+import json
+import time
+
+import torch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services_audio import load_audio, SAMPLE_RATE
+from services_pronunciation import (
+    load_whisper_backend,
+    get_decode_options,
+    calculate_similarity,
+    _transcribe_file
+)
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "audio")
+
+DEFAULT_BACKENDS = [
+    "base:fp32:beam",
+    "base:fp32:greedy",
+    "base:int8:greedy",
+    "tiny:int8:greedy",
+    "small:int8:greedy"
+]
+
+# Same pass threshold as evaluate_pronunciation
+PASS_THRESHOLD = 0.70
+
+
+def load_fixtures(fixtures_dir):
+    """
+    Load the fixture manifest and resolve audio paths.
+
+    Returns:
+        list of dicts with 'path', 'target' and 'duration' (seconds)
+    """
+    with open(os.path.join(fixtures_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    fixtures = []
+    for entry in manifest:
+        path = os.path.join(fixtures_dir, entry["file"])
+        duration = len(load_audio(path)) / SAMPLE_RATE
+        fixtures.append({"path": path, "target": entry["target"], "duration": duration})
+
+    return fixtures
+
+
+def parse_backend(spec):
+    """Parse 'size:precision:decoding' (e.g. 'tiny:int8:greedy')."""
+    size, precision, decoding = spec.split(":")
+    if precision not in ("fp32", "int8"):
+        raise ValueError(f"Unknown precision '{precision}' in backend '{spec}'")
+    return {"name": spec, "model_size": size, "quantize_int8": precision == "int8", "decoding": decoding}
+
+
+def run_backend(backend, fixtures, num_threads, beam_size):
+    """
+    Transcribe every fixture with one backend.
+
+    Returns:
+        dict - Load time, real-time factor and per-fixture similarity scores
+    """
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+    start = time.perf_counter()
+    model = load_whisper_backend(
+        model_size=backend["model_size"],
+        quantize_int8=backend["quantize_int8"]
+    )
+    load_seconds = time.perf_counter() - start
+
+    decode_options = get_decode_options(backend["decoding"], beam_size)
+
+    # Warm up once so one-off allocations don't skew the first fixture
+    _transcribe_file(fixtures[0]["path"], model=model, decode_options=decode_options)
+
+    similarities = []
+    processing_seconds = 0.0
+    for fixture in fixtures:
+        start = time.perf_counter()
+        transcription = _transcribe_file(fixture["path"], model=model, decode_options=decode_options)
+        processing_seconds += time.perf_counter() - start
+        similarities.append(calculate_similarity(transcription, fixture["target"]))
+
+    audio_seconds = sum(f["duration"] for f in fixtures)
+    return {
+        "name": backend["name"],
+        "load_seconds": load_seconds,
+        "rtf": processing_seconds / audio_seconds if audio_seconds else 0.0,
+        "similarities": similarities
+    }
+
+
+def compare_to_reference(result, reference):
+    """Pass/fail agreement and mean absolute similarity difference vs reference."""
+    pairs = list(zip(result["similarities"], reference["similarities"]))
+    agreement = sum(
+        1 for a, b in pairs if (a >= PASS_THRESHOLD) == (b >= PASS_THRESHOLD)
+    ) / len(pairs)
+    mean_abs_diff = sum(abs(a - b) for a, b in pairs) / len(pairs)
+    return agreement, mean_abs_diff
+
+
+def main():
+    """Main entry point for CLI usage."""
+    parser = argparse.ArgumentParser(description="Benchmark CPU Whisper backends")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory with manifest.json and audio files")
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS,
+                        help="Backends as size:precision:decoding (first one is the reference)")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0 = torch default)")
+    parser.add_argument("--beam-size", type=int, default=5, help="Beam width for beam decoding")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    print(f"Loaded {len(fixtures)} fixtures ({sum(f['duration'] for f in fixtures):.1f}s of audio)")
+
+    results = []
+    for spec in args.backends:
+        backend = parse_backend(spec)
+        print(f"\nRunning {backend['name']}...")
+        results.append(run_backend(backend, fixtures, args.threads, args.beam_size))
+
+    reference = results[0]
+    print(f"\n{'='*78}")
+    print(f"{'Backend':<22} {'Load (s)':>9} {'RTF':>8} {'Mean sim':>9} {'Pass agree':>11} {'|Δ sim|':>9}")
+    print(f"{'='*78}")
+    for result in results:
+        agreement, mean_abs_diff = compare_to_reference(result, reference)
+        mean_similarity = sum(result["similarities"]) / len(result["similarities"])
+        print(f"{result['name']:<22} {result['load_seconds']:>9.2f} {result['rtf']:>8.3f} "
+              f"{mean_similarity:>9.3f} {agreement:>10.0%} {mean_abs_diff:>9.3f}")
+    print(f"{'='*78}")
+    print(f"Reference: {reference['name']}. RTF < 1.0 means faster than real time.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ Flask application configuration.
 Handles environment-based settings for development, staging, and production.
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -36,6 +37,102 @@ class Config:
     USE_MOCK_PRONUNCIATION = os.getenv("USE_MOCK_PRONUNCIATION", "true").lower() == "true"
     USE_MOCK_LEADERBOARD = os.getenv("USE_MOCK_LEADERBOARD", "true").lower() == "true"
 
+    # torch intra-op threads, shared by Whisper and CLIP (torch.set_num_threads is process-wide)
+    TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", 0))  # 0 = this process's share of the CPU cores
+
+    # Whisper (pronunciation evaluation)
+    WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")  # tiny, base or small
+    WHISPER_QUANTIZE_INT8 = os.getenv("WHISPER_QUANTIZE_INT8", "false").lower() == "true"
+    WHISPER_DECODING = os.getenv("WHISPER_DECODING", "greedy")  # greedy or beam
+    WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", 5))
+    # Fast scoring: one greedy pass capped at the target phrase length
+    WHISPER_FAST_SCORING = os.getenv("WHISPER_FAST_SCORING", "false").lower() == "true"
+    WHISPER_FAST_TOKEN_MARGIN = int(os.getenv("WHISPER_FAST_TOKEN_MARGIN", 10))
+    # Prompt fast scoring with the target and stop on divergence. Biases transcripts
+    # toward the target (inflates scores of wrong recordings); off until
+    # benchmarks/benchmark_target_conditioning.py shows it is safe
+    WHISPER_TARGET_CONDITIONING = os.getenv("WHISPER_TARGET_CONDITIONING", "false").lower() == "true"
+
+    # Pronunciation scoring: "text" (character SequenceMatcher ratio) or "phonetic" (Norwegian G2P + weighted edit distance)
+    PRONUNCIATION_SCORING = os.getenv("PRONUNCIATION_SCORING", "text")
+
+    # IRL photo verification (CLIP)
+    CLIP_EMBEDDINGS_CACHE = os.getenv("CLIP_EMBEDDINGS_CACHE", "")  # Optional .npz path for topic text embeddings
+    CLIP_QUANTIZE_INT8 = os.getenv("CLIP_QUANTIZE_INT8", "false").lower() == "true"  # int8 vision encoder
+    PHOTO_HASH_MAX_DISTANCE = int(os.getenv("PHOTO_HASH_MAX_DISTANCE", 6))  # dHash bits (max 7) for "same photo"
+
+    # Models loaded (and exercised once) at worker startup, before /ready reports ready
+    WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "").split(",") if m.strip()]  # whisper, clip
+
+    # Concurrent request pipelines (IRL verification stages)
+    PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 8))  # Stage threads per web worker
+    IRL_UPLOAD_TIMEOUT = float(os.getenv("IRL_UPLOAD_TIMEOUT", 15))
+    IRL_AUDIO_TIMEOUT = float(os.getenv("IRL_AUDIO_TIMEOUT", 25))
+    IRL_PHOTO_TIMEOUT = float(os.getenv("IRL_PHOTO_TIMEOUT", 10))
+    IRL_TEXT_TIMEOUT = float(os.getenv("IRL_TEXT_TIMEOUT", 20))
+
+    # Web worker processes on this host (exported by gunicorn_config.py), used to split CPU threads
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+
+    # Ollama client (shared by challenge generation and IRL text analysis)
+    OLLAMA_HOST = os.getenv("OLLAMA_HOST", "")  # Empty = ollama default (http://localhost:11434)
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # Keep the model loaded between calls
+    OLLAMA_MAX_RETRIES = int(os.getenv("OLLAMA_MAX_RETRIES", 2))  # Extra attempts on invalid JSON/transport errors
+    OLLAMA_GENERATION_TIMEOUT = float(os.getenv("OLLAMA_GENERATION_TIMEOUT", 60))  # Seconds per generation request
+    # Challenge generation: requests in flight per process (match OLLAMA_NUM_PARALLEL on the server)
+    GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", 4))
+    GENERATION_TIMEOUT = float(os.getenv("GENERATION_TIMEOUT", 120))  # Seconds per challenge, retries included
+    # Challenges requested per prompt (1 = one prompt per challenge; see benchmarks/benchmark_generation.py)
+    GENERATION_PER_PROMPT = int(os.getenv("GENERATION_PER_PROMPT", 1))
+    # Near-duplicate rejection of generated pool challenges (character n-gram cosine similarity)
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.85))
+    NEAR_DUPLICATE_INDEX_PATH = os.getenv(  # "" = keep the index in memory only
+        "NEAR_DUPLICATE_INDEX_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "near_duplicate_index.npz")
+    )
+
+    # Touched by interactive Ollama calls so background generation on this host can yield ("" = off)
+    OLLAMA_ACTIVITY_FILE = os.getenv("OLLAMA_ACTIVITY_FILE", os.path.join(tempfile.gettempdir(), "snop_ollama_interactive"))
+
+    # Ollama (IRL text analysis): timeout, circuit breaker and result cache
+    OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", 15))  # Seconds per request
+    OLLAMA_SLOW_CALL_SECONDS = float(os.getenv("OLLAMA_SLOW_CALL_SECONDS", 10))  # Slower calls count as failures
+    OLLAMA_BREAKER_THRESHOLD = int(os.getenv("OLLAMA_BREAKER_THRESHOLD", 3))  # Consecutive failures to open
+    OLLAMA_BREAKER_RESET_SECONDS = float(os.getenv("OLLAMA_BREAKER_RESET_SECONDS", 30))  # Open time before a probe
+    TEXT_ANALYSIS_CACHE_SIZE = int(os.getenv("TEXT_ANALYSIS_CACHE_SIZE", 1024))
+    TEXT_ANALYSIS_CACHE_TTL = int(os.getenv("TEXT_ANALYSIS_CACHE_TTL", 24 * 3600))
+    # Local screening cascade: only texts scoring in [REJECT_BELOW, ACCEPT_FROM) go to the LLM
+    TEXT_CASCADE_ENABLED = os.getenv("TEXT_CASCADE_ENABLED", "true").lower() == "true"
+    TEXT_CASCADE_REJECT_BELOW = int(os.getenv("TEXT_CASCADE_REJECT_BELOW", 40))
+    TEXT_CASCADE_ACCEPT_FROM = int(os.getenv("TEXT_CASCADE_ACCEPT_FROM", 85))
+
+    # Bulk Firestore inserts (generated and seeded challenges)
+    BULK_WRITE_WORKERS = int(os.getenv("BULK_WRITE_WORKERS", 4))  # Write batches committed in parallel
+    BULK_WRITE_RETRIES = int(os.getenv("BULK_WRITE_RETRIES", 3))  # Extra attempts per failed batch
+
+    # Predictive pool refill (background scheduler, see services_pool_refill.py)
+    POOL_REFILL_ENABLED = os.getenv("POOL_REFILL_ENABLED", "false").lower() == "true"
+    POOL_REFILL_INTERVAL = float(os.getenv("POOL_REFILL_INTERVAL", 600))  # Seconds between refill cycles
+    POOL_USAGE_WINDOW_HOURS = int(os.getenv("POOL_USAGE_WINDOW_HOURS", 24))  # Usage history behind the drain rate
+    POOL_USAGE_FLUSH_SECONDS = float(os.getenv("POOL_USAGE_FLUSH_SECONDS", 60))  # Buffered usage writes / refill request checks
+    POOL_MIN_AVAILABLE = int(os.getenv("POOL_MIN_AVAILABLE", 5))  # Per (cefr_level, type), even with no usage
+    POOL_BUFFER_HOURS = float(os.getenv("POOL_BUFFER_HOURS", 24))  # Keep this many hours of forecast drain available
+    POOL_REFILL_MAX_PER_CYCLE = int(os.getenv("POOL_REFILL_MAX_PER_CYCLE", 12))  # Challenges generated per cycle
+    POOL_REFILL_PER_REQUEST = int(os.getenv("POOL_REFILL_PER_REQUEST", 3))  # Challenges per (single) Ollama request
+    POOL_REFILL_QUIET_SECONDS = float(os.getenv("POOL_REFILL_QUIET_SECONDS", 30))  # Idle time after interactive calls
+
+    # Pool statistics (aggregation count queries), cached per process
+    POOL_STATS_CACHE_TTL = float(os.getenv("POOL_STATS_CACHE_TTL", 60))
+
+    # Background evaluation jobs
+    EVALUATION_JOB_WORKERS = int(os.getenv("EVALUATION_JOB_WORKERS", 2))  # Threads per web worker
+    JOB_EVENTS_TIMEOUT = int(os.getenv("JOB_EVENTS_TIMEOUT", 25))  # Max seconds an SSE stream stays open
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))  # Seconds between SSE status checks
+    JOB_EVENTS_MAX_STREAMS = int(os.getenv("JOB_EVENTS_MAX_STREAMS", 1))  # Open SSE streams per web worker
+    JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", 300))  # Unfinished jobs older than this are failed
+    JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", 24))  # Job documents expire after this
+
     # Server
     PORT = int(os.getenv("PORT", 5000))
     HOST = os.getenv("HOST", "0.0.0.0")
@@ -70,6 +167,7 @@ class ProductionConfig(Config):
     # Production should always use real services
     USE_MOCK_PRONUNCIATION = False
     USE_MOCK_LEADERBOARD = False
+    WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "whisper,clip").split(",") if m.strip()]
 
     # Stricter session settings
     SESSION_COOKIE_SECURE = True
@@ -10,10 +10,17 @@ bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Workers inherit this, so each one can size its torch thread pool to its share of the cores
+os.environ["WEB_CONCURRENCY"] = str(workers)
+# Threaded workers: SSE job streams and "async" submissions (evaluated as a
+# background job, see services_jobs.py) don't block the whole worker
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
 worker_connections = 1000
-timeout = 120  # 2 minutes for pronunciation evaluation
+# Submissions without "async" (the default, and what the mobile app sends) still
+# download and transcribe inside the request; keep 2 minutes for them
+timeout = 120
 keepalive = 5
 
 # Logging
@@ -46,6 +53,13 @@ def on_reload(server):
     """Called when a worker is reloaded."""
     print("♻️  Reloading worker processes")
 
+def post_fork(server, worker):
+    """Called in each worker after fork: start loading models and the pool refill scheduler in the background."""
+    from services_warmup import start_warmup
+    from services_pool_refill import start_refill_scheduler
+    start_warmup()
+    start_refill_scheduler()
+
 def when_ready(server):
     """Called just after the server is started."""
     print(f"✅ SNOP Backend ready on {bind}")
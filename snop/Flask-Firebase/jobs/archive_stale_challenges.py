@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Challenge Pool Archival Sweep
+
+Archives available pool challenges that have not been used (or, if never
+used, were created) more than --days ago. Safe to interrupt and re-run:
+archived challenges are no longer matched, so the next run continues with
+what is left.
+
+Usage:
+    python jobs/archive_stale_challenges.py                # Archive after 30 days
+    python jobs/archive_stale_challenges.py --days 60      # Custom inactivity period
+    python jobs/archive_stale_challenges.py --dry-run      # Only count stale challenges
+"""
+
+import sys
+import os
+import argparse
+import logging
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main entry point for CLI usage."""
+    parser = argparse.ArgumentParser(description="Archive pool challenges that have not been used recently")
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=30,
+        help="Days of inactivity before a challenge is archived (default: 30)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Count stale challenges without archiving them"
+    )
+    args = parser.parse_args()
+
+    from services_challenge_pool import archive_old_challenges
+
+    count = archive_old_challenges(days=args.days, dry_run=args.dry_run)
+    logger.info(f"{'Would archive' if args.dry_run else 'Archived'} {count} challenges")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Evaluation Job Cleanup
+
+Deletes evaluation_jobs documents past their expires_at (JOB_RETENTION_HOURS
+after creation). Not needed when a Firestore TTL policy is set on
+evaluation_jobs.expires_at.
+
+Usage:
+    python jobs/cleanup_evaluation_jobs.py
+"""
+
+import sys
+import os
+import logging
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+
+def main():
+    """Main entry point for CLI usage."""
+    from services_jobs import cleanup_expired_jobs
+    cleanup_expired_jobs()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,13 +25,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
 
-from services_ai_generation import (
-    generate_pronunciation_challenge,
-    generate_listening_challenge,
-    generate_fill_blank_challenge,
-    generate_multiple_choice_challenge,
-    CEFR_TO_DIFFICULTY
-)
+from services_ai_generation import generate_challenges_concurrently, CEFR_TO_DIFFICULTY
 
 # Set up logging
 logging.basicConfig(
@@ -46,8 +40,18 @@ CEFR_LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2"]
 # Challenge types
 CHALLENGE_TYPES = ["pronunciation", "listening", "fill_blank", "multiple_choice"]
 
-# Generation timeout (seconds)
-GENERATION_TIMEOUT = 60
+def _init_firebase():
+    """Initialize Firebase from firebase-auth.json unless it is already initialized."""
+    import firebase_admin
+
+    if not firebase_admin._apps:
+        from firebase_admin import credentials
+        cred_path = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'firebase-auth.json'
+        )
+        cred = credentials.Certificate(cred_path)
+        firebase_admin.initialize_app(cred)
 
 
 def get_pool_stats(cefr_level):
@@ -58,50 +62,32 @@ def get_pool_stats(cefr_level):
         cefr_level: str - CEFR level (A1-C2)
 
     Returns:
-        dict with 'available', 'used', 'total' counts
+        dict with 'available', 'archived', 'total' counts
     """
     try:
-        import firebase_admin
-        from firebase_admin import firestore
-
-        # Initialize Firebase if not already done
-        if not firebase_admin._apps:
-            from firebase_admin import credentials
-            cred_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'firebase-auth.json'
-            )
-            cred = credentials.Certificate(cred_path)
-            firebase_admin.initialize_app(cred)
-
-        db = firestore.client()
-
-        # Query challenges by CEFR level
-        challenges_ref = db.collection("challenge_pool")
+        _init_firebase()
+        from services_challenge_pool import count_pool_challenges_many
 
-        # Get available (not used) challenges
-        available_query = challenges_ref.where("cefr_level", "==", cefr_level).where("used", "==", False)
-        available_docs = list(available_query.stream())
-
-        # Get used challenges
-        used_query = challenges_ref.where("cefr_level", "==", cefr_level).where("used", "==", True)
-        used_docs = list(used_query.stream())
+        counts = count_pool_challenges_many([("available", cefr_level, None), ("archived", cefr_level, None)])
+        available = counts[("available", cefr_level, None)]
+        archived = counts[("archived", cefr_level, None)]
 
         return {
-            "available": len(available_docs),
-            "used": len(used_docs),
-            "total": len(available_docs) + len(used_docs)
+            "available": available,
+            "archived": archived,
+            "total": available + archived
         }
 
     except Exception as e:
         logger.warning(f"Could not get pool stats for {cefr_level}: {e}")
         # Return zeros if pool doesn't exist yet
-        return {"available": 0, "used": 0, "total": 0}
+        return {"available": 0, "archived": 0, "total": 0}
 
 
 def add_to_pool(challenges):
     """
     Add generated challenges to the pool in Firestore.
+    Exact and near duplicates of pool challenges are skipped.
 
     Args:
         challenges: list - List of challenge dicts
@@ -110,34 +96,13 @@ def add_to_pool(challenges):
         list - List of document IDs of saved challenges
     """
     try:
-        import firebase_admin
-        from firebase_admin import firestore
-
-        if not firebase_admin._apps:
-            from firebase_admin import credentials
-            cred_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'firebase-auth.json'
-            )
-            cred = credentials.Certificate(cred_path)
-            firebase_admin.initialize_app(cred)
-
-        db = firestore.client()
-        saved_ids = []
-
-        for challenge in challenges:
-            # Add pool metadata
-            challenge["used"] = False
-            challenge["created_at"] = datetime.utcnow().isoformat()
-            challenge["generated_by"] = "ai_batch_job"
-
-            # Add to challenge_pool collection
-            doc_ref = db.collection("challenge_pool").add(challenge)
-            doc_id = doc_ref[1].id
-            saved_ids.append(doc_id)
-            logger.debug(f"Added challenge to pool: {doc_id}")
-
-        return saved_ids
+        _init_firebase()
+        from services_challenge_pool import add_to_pool as add_challenges_to_pool
+
+        return add_challenges_to_pool(
+            [{**challenge, "generated_by": "ai_batch_job"} for challenge in challenges],
+            near_duplicates=True
+        )
 
     except Exception as e:
         logger.error(f"Failed to add challenges to pool: {e}")
@@ -162,57 +127,24 @@ def generate_for_level(cefr_level, count, types=None):
     # Map CEFR level to difficulty
     difficulty = CEFR_TO_DIFFICULTY.get(cefr_level, 1)
 
-    challenges = []
-    type_index = 0
-
-    for i in range(count):
-        # Distribute evenly across types
-        challenge_type = types[type_index % len(types)]
-        type_index += 1
-
-        logger.info(f"Generating {challenge_type} challenge {i+1}/{count} for {cefr_level}...")
+    # Distribute evenly across types
+    specs = [
+        {"type": types[i % len(types)], "difficulty": difficulty, "topic": None, "frequency": "daily"}
+        for i in range(count)
+    ]
 
-        try:
-            # Generate based on type
-            if challenge_type == "pronunciation":
-                challenge = generate_pronunciation_challenge(
-                    difficulty=difficulty,
-                    topic=None,
-                    frequency="daily"
-                )
-            elif challenge_type == "listening":
-                challenge = generate_listening_challenge(
-                    difficulty=difficulty,
-                    topic=None,
-                    frequency="daily"
-                )
-            elif challenge_type == "fill_blank":
-                challenge = generate_fill_blank_challenge(
-                    difficulty=difficulty,
-                    topic=None,
-                    frequency="daily"
-                )
-            elif challenge_type == "multiple_choice":
-                challenge = generate_multiple_choice_challenge(
-                    difficulty=difficulty,
-                    topic=None,
-                    frequency="daily"
-                )
-            else:
-                logger.warning(f"Unknown challenge type: {challenge_type}")
-                continue
-
-            # Add CEFR level to the challenge
-            challenge["cefr_level"] = cefr_level
+    logger.info(f"Generating {count} challenges for {cefr_level}...")
+    batch = generate_challenges_concurrently(specs)
 
-            challenges.append(challenge)
-            logger.info(f"  Generated: {challenge.get('title', 'Unknown')}")
-
-        except Exception as e:
-            logger.error(f"  Failed to generate {challenge_type} for {cefr_level}: {e}")
-            # Continue with next challenge (don't abort batch)
-            continue
+    # Add CEFR level to the challenges
+    challenges = batch["challenges"]
+    for challenge in challenges:
+        challenge["cefr_level"] = cefr_level
 
+    logger.info(
+        f"{cefr_level}: generated {len(challenges)}/{count} "
+        f"({batch['stats']['challenges_per_minute']} challenges/min)"
+    )
     return challenges
 
 
@@ -386,16 +318,19 @@ def check_ollama_available():
         bool - True if Ollama is available
     """
     try:
-        import ollama
+        from config import get_config
+        from services_ollama import get_client
+
+        model = get_config().OLLAMA_MODEL
         # Try to list models
-        models = ollama.list()
-        model_names = [m.get('name', '') for m in models.get('models', [])]
+        models = get_client().list()
+        model_names = [m.get('model') or m.get('name') or '' for m in models.get('models', [])]
 
-        if any('llama3.2' in name for name in model_names):
-            logger.info("Ollama is available with llama3.2 model")
+        if any(model in name for name in model_names):
+            logger.info(f"Ollama is available with {model} model")
             return True
         else:
-            logger.warning(f"Ollama available but llama3.2 not found. Models: {model_names}")
+            logger.warning(f"Ollama available but {model} not found. Models: {model_names}")
             return False
 
     except Exception as e:
@@ -435,6 +370,11 @@ def main():
         action="store_true",
         help="Only check if Ollama is available"
     )
+    parser.add_argument(
+        "--rebuild-dedupe-index",
+        action="store_true",
+        help="Rebuild the near-duplicate index from the pool before refilling"
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -459,6 +399,10 @@ def main():
             logger.error("Run: ollama pull llama3.2 && ollama serve")
             sys.exit(1)
 
+    if args.rebuild_dedupe_index and not args.dry_run:
+        from services_near_duplicates import get_index
+        get_index(rebuild=True)
+
     # Run refill job
     if args.level:
         result = refill_single_level(
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Backfill content hashes on challenge_pool documents.
+
+Adds content_hash to every pool challenge and creates its entry in the
+challenge_pool_hashes index, so inserts can check for duplicates with index
+lookups instead of scanning the pool. When several existing challenges share
+a hash, the first one seen is indexed and the rest are reported as duplicates.
+Documents already carrying their current hash are not updated, but the index
+entry of every first-seen hash is (re)written, so missing entries are repaired
+and the script is safe to re-run.
+
+Usage:
+    python migrate_content_hashes.py [--dry-run]
+"""
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables BEFORE importing firebase_config
+load_dotenv()
+
+from firebase_config import db
+from services_challenge_pool import content_hash, hash_index_write, COLLECTION_NAME
+
+
+def backfill_content_hashes(dry_run=False):
+    """
+    Add content_hash and index entries to pool challenges that lack them.
+
+    Args:
+        dry_run: bool - Only count what would be updated
+
+    Returns:
+        dict - Counts of scanned, updated, skipped and duplicate documents,
+               and of index entries written
+    """
+    print(f"Scanning {COLLECTION_NAME} for content hashes...")
+
+    results = {"scanned": 0, "updated": 0, "skipped": 0, "duplicates": 0, "indexed": 0}
+    seen = set()
+    batch = db.batch()
+    batch_count = 0
+
+    for doc in db.collection(COLLECTION_NAME).stream():
+        results["scanned"] += 1
+        data = doc.to_dict()
+        challenge_hash = content_hash(data)
+
+        is_first = challenge_hash not in seen
+        seen.add(challenge_hash)
+        if not is_first:
+            results["duplicates"] += 1
+
+        needs_hash = data.get("content_hash") != challenge_hash
+        if needs_hash:
+            results["updated"] += 1
+        else:
+            results["skipped"] += 1
+        if is_first:
+            results["indexed"] += 1
+
+        if dry_run or not (needs_hash or is_first):
+            continue
+
+        if needs_hash:
+            batch.update(doc.reference, {"content_hash": challenge_hash})
+            batch_count += 1
+        if is_first:
+            # set(), not the create() add_to_pool uses: the backfill owns the index
+            # and must repair entries whether or not they exist
+            index_ref, index_data, _ = hash_index_write(challenge_hash, doc.id)
+            batch.set(index_ref, index_data)
+            batch_count += 1
+
+        # Firestore batches are limited to 500 operations
+        if batch_count >= 499:
+            batch.commit()
+            batch = db.batch()
+            batch_count = 0
+            print(f"  Updated {results['updated']} challenges, indexed {results['indexed']} hashes...")
+
+    if batch_count > 0:
+        batch.commit()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill content hashes on the challenge pool")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Preview without making changes"
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SNOP Content Hash Backfill")
+    print("=" * 60)
+
+    if args.dry_run:
+        print("🔍 DRY RUN MODE - No changes will be made")
+
+    results = backfill_content_hashes(dry_run=args.dry_run)
+
+    print(f"\nScanned: {results['scanned']}")
+    print(f"{'Would update' if args.dry_run else 'Updated'}: {results['updated']}")
+    print(f"Skipped (already current): {results['skipped']}")
+    print(f"{'Would index' if args.dry_run else 'Indexed'}: {results['indexed']} hashes")
+    print(f"Duplicates of another pool challenge: {results['duplicates']}")
+
+
+if __name__ == "__main__":
+    main()
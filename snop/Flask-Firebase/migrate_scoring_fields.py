@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Backfill precomputed pronunciation scoring fields on challenge_pool documents.
+
+Adds target_normalized, target_phonemes and scoring_fields_version to every
+pool challenge that has a target phrase, so evaluation only needs to normalize
+the transcription. Fields written by older versions that nothing reads any
+more (target_tokens, target_phonetic_key) are removed. Documents already at the
+current SCORING_FIELDS_VERSION are skipped, so the script is safe to re-run.
+
+Usage:
+    python migrate_scoring_fields.py [--dry-run]
+"""
+import argparse
+from dotenv import load_dotenv
+from firebase_admin import firestore
+
+# Load environment variables BEFORE importing firebase_config
+load_dotenv()
+
+from firebase_config import db
+from services_pronunciation import precompute_target_fields, SCORING_FIELDS_VERSION
+
+COLLECTION_NAME = "challenge_pool"
+
+# Scoring fields stored by earlier versions
+OBSOLETE_FIELDS = ("target_tokens", "target_phonetic_key")
+
+
+def backfill_scoring_fields(dry_run=False):
+    """
+    Add scoring fields to pool challenges that are missing or outdated.
+
+    Args:
+        dry_run: bool - Only count what would be updated
+
+    Returns:
+        dict - Counts of scanned, updated and skipped documents
+    """
+    print(f"Scanning {COLLECTION_NAME} for pronunciation targets...")
+
+    results = {"scanned": 0, "updated": 0, "skipped": 0}
+    batch = db.batch()
+    batch_count = 0
+
+    for doc in db.collection(COLLECTION_NAME).stream():
+        results["scanned"] += 1
+        data = doc.to_dict()
+
+        target = data.get("target")
+        if not target or data.get("scoring_fields_version") == SCORING_FIELDS_VERSION:
+            results["skipped"] += 1
+            continue
+
+        results["updated"] += 1
+        if dry_run:
+            continue
+
+        fields = precompute_target_fields(target)
+        fields.update({field: firestore.DELETE_FIELD for field in OBSOLETE_FIELDS if field in data})
+        batch.update(doc.reference, fields)
+        batch_count += 1
+
+        # Firestore batches are limited to 500 operations
+        if batch_count >= 500:
+            batch.commit()
+            batch = db.batch()
+            batch_count = 0
+            print(f"  Updated {results['updated']} challenges...")
+
+    if batch_count > 0:
+        batch.commit()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill pronunciation scoring fields on the challenge pool")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Preview without making changes"
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SNOP Scoring Fields Backfill")
+    print("=" * 60)
+
+    if args.dry_run:
+        print("🔍 DRY RUN MODE - No changes will be made")
+
+    results = backfill_scoring_fields(dry_run=args.dry_run)
+
+    print(f"\nScanned: {results['scanned']}")
+    print(f"{'Would update' if args.dry_run else 'Updated'}: {results['updated']}")
+    print(f"Skipped (no target or already current): {results['skipped']}")
+
+
+if __name__ == "__main__":
+    main()
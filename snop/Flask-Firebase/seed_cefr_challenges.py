@@ -16,28 +16,36 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from firebase_config import db
+from services_pronunciation import with_scoring_fields
+from services_challenge_pool import content_hash, hash_index_write, HASH_INDEX_COLLECTION
+from services_bulk_writes import bulk_set
 
 COLLECTION_NAME = "challenge_pool"
 
 def clear_challenge_pool():
-    """Clear all documents from challenge_pool collection."""
+    """Clear all documents from challenge_pool collection (and its content hash index)."""
     print("Clearing existing challenge_pool...")
 
-    docs = db.collection(COLLECTION_NAME).stream()
     count = 0
-    batch = db.batch()
+    for collection_name in (COLLECTION_NAME, HASH_INDEX_COLLECTION):
+        docs = db.collection(collection_name).stream()
+        deleted = 0
+        batch = db.batch()
 
-    for doc in docs:
-        batch.delete(doc.reference)
-        count += 1
+        for doc in docs:
+            batch.delete(doc.reference)
+            deleted += 1
 
-        if count % 500 == 0:
+            if deleted % 500 == 0:
+                batch.commit()
+                batch = db.batch()
+                print(f"  Deleted {deleted} documents from {collection_name}...")
+
+        if deleted % 500 != 0:
             batch.commit()
-            batch = db.batch()
-            print(f"  Deleted {count} documents...")
 
-    if count % 500 != 0:
-        batch.commit()
+        if collection_name == COLLECTION_NAME:
+            count = deleted
 
     print(f"Cleared {count} existing challenges from pool")
     return count
@@ -66,28 +74,33 @@ def seed_challenges(json_path="cefr_challenges.json"):
     # Seed to Firestore
     print("\nSeeding to Firestore...")
     timestamp = datetime.now(timezone.utc).isoformat()
-    count = 0
+    groups = []
 
     for challenge in challenges:
         # Add pool metadata
         challenge_data = {
-            **challenge,
+            **with_scoring_fields(challenge),
             "status": "available",
             "used_count": 0,
-            "created_at": timestamp
+            "created_at": timestamp,
+            "content_hash": content_hash(challenge)
         }
 
-        # Use challenge ID as document ID
+        # Use challenge ID as document ID; the content hash index entry goes in the same batch
         challenge_id = challenge.get('id')
-        if challenge_id:
-            db.collection(COLLECTION_NAME).document(challenge_id).set(challenge_data)
-        else:
-            db.collection(COLLECTION_NAME).add(challenge_data)
-
-        count += 1
-
-        if count % 20 == 0:
-            print(f"  Seeded {count} challenges...")
+        doc_ref = (db.collection(COLLECTION_NAME).document(challenge_id) if challenge_id
+                   else db.collection(COLLECTION_NAME).document())
+        groups.append([(doc_ref, challenge_data), hash_index_write(challenge_data["content_hash"], doc_ref.id)])
+
+    result = bulk_set(groups, label="Seed challenges")
+    count = len(groups) - len(result["failed_groups"])
+    print(f"  Wrote {result['written']} documents in {result['batches']} batches "
+          f"({result['docs_per_second']} docs/s)")
+    if result["conflict_groups"]:
+        print(f"  ↷ Skipped {len(result['conflict_groups'])} challenges whose content is already in the pool")
+    failed = len(result["failed_groups"]) - len(result["conflict_groups"])
+    if failed:
+        print(f"  ✗ Failed to seed {failed} challenges")
 
     print(f"\nSuccessfully seeded {count} challenges to {COLLECTION_NAME}")
     return count
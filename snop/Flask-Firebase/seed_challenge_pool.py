@@ -31,15 +31,13 @@ MULTIPLE_CHOICE:
 =============================================================================
 """
 
-import hashlib
 import logging
 from dotenv import load_dotenv
 
 # Load environment variables before importing firebase_config
 load_dotenv()
 
-from firebase_config import db
-from services_challenge_pool import add_to_pool
+from services_challenge_pool import add_to_pool, dedupe_challenges
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -628,42 +626,6 @@ SEED_CHALLENGES = (
 )
 
 
-def generate_challenge_hash(challenge):
-    """Generate a hash for a challenge based on its content."""
-    # Create a unique identifier based on key fields
-    key_fields = [
-        challenge.get("type", ""),
-        challenge.get("cefr_level", ""),
-        challenge.get("title", ""),
-        challenge.get("target", challenge.get("sentence", challenge.get("prompt", "")))
-    ]
-    content = "|".join(str(f) for f in key_fields)
-    return hashlib.md5(content.encode()).hexdigest()
-
-
-def get_existing_hashes():
-    """Get hashes of existing challenges in the pool."""
-    try:
-        docs = db.collection(COLLECTION_NAME).stream()
-        existing_hashes = set()
-
-        for doc in docs:
-            data = doc.to_dict()
-            # Generate hash for existing challenge
-            challenge_hash = generate_challenge_hash(data)
-            existing_hashes.add(challenge_hash)
-
-            # Also check by title as backup
-            title = data.get("title", "")
-            if title:
-                existing_hashes.add(title.lower())
-
-        return existing_hashes
-    except Exception as e:
-        logger.error(f"Error getting existing hashes: {e}")
-        return set()
-
-
 def seed_pool():
     """
     Seed the challenge pool with initial challenges.
@@ -671,23 +633,8 @@ def seed_pool():
     """
     logger.info("Starting challenge pool seeding...")
 
-    # Get existing challenge identifiers
-    existing_hashes = get_existing_hashes()
-    logger.info(f"Found {len(existing_hashes)} existing challenge identifiers")
-
-    # Filter out challenges that already exist
-    new_challenges = []
-    skipped = 0
-
-    for challenge in SEED_CHALLENGES:
-        challenge_hash = generate_challenge_hash(challenge)
-        title_lower = challenge.get("title", "").lower()
-
-        if challenge_hash in existing_hashes or title_lower in existing_hashes:
-            skipped += 1
-            continue
-
-        new_challenges.append(challenge)
+    # Look up only these challenges' content hashes (independent of pool size)
+    new_challenges, skipped = dedupe_challenges(SEED_CHALLENGES)
 
     if not new_challenges:
         logger.info("No new challenges to add - pool already seeded")
@@ -697,7 +644,7 @@ def seed_pool():
     logger.info(f"Adding {len(new_challenges)} new challenges (skipping {skipped} duplicates)")
 
     # Add new challenges to pool
-    result = add_to_pool(new_challenges)
+    result = add_to_pool(new_challenges, dedupe=False)
 
     # Print summary
     print(f"\nChallenge Pool Seeding Complete")
@@ -3,10 +3,14 @@
 AI-powered challenge generation service using Ollama (self-hosted LLM).
 Generates Norwegian language learning challenges with translations.
 """
-import json
-import ollama
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timezone
-from services_challenges import add_challenge
+import json
+import logging
+import random
+import threading
+import time
+from services_ollama import chat_json, object_schema
 
 # Topics for challenge generation
 TOPICS = [
@@ -34,6 +38,339 @@ CEFR_TO_DIFFICULTY = {
     "C2": 3
 }
 
+logger = logging.getLogger(__name__)
+
+# Generation request outcomes
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+
+# Created lazily so each gunicorn worker gets its own pool after fork
+_generation_executor = None
+_generation_executor_lock = threading.Lock()
+
+JSON_SYSTEM_PROMPT = (
+    'You are a JSON generator. You ONLY output valid JSON objects. '
+    'Never include explanations, markdown formatting, or any text outside the JSON object.'
+)
+
+# Fields every generated challenge must have, by type
+REQUIRED_FIELDS = {
+    "pronunciation": ['type', 'title', 'description', 'prompt', 'target', 'difficulty', 'frequency'],
+    "listening": ['type', 'title', 'description', 'audio_text', 'options', 'correct_answer'],
+    "fill_blank": ['type', 'title', 'description', 'sentence', 'missing_word'],
+    "multiple_choice": ['type', 'title', 'description', 'prompt', 'options', 'correct_answer']
+}
+
+_STRING = {"type": "string"}
+_INTEGER = {"type": "integer"}
+_OPTIONS = {"type": "array", "items": _STRING, "minItems": 4, "maxItems": 4}
+_COMMON_PROPERTIES = {
+    "type": _STRING, "title": _STRING, "title_no": _STRING,
+    "description": _STRING, "description_no": _STRING,
+    "difficulty": _INTEGER, "frequency": _STRING, "level": _STRING,
+    "age_group": _STRING, "topic": _STRING
+}
+
+# JSON schemas passed to Ollama as the output format, by type
+CHALLENGE_SCHEMAS = {
+    "pronunciation": object_schema({
+        **_COMMON_PROPERTIES, "prompt": _STRING, "target": _STRING,
+        "irl_bonus_available": {"type": "boolean"}, "irl_bonus_xp": _INTEGER, "irl_prompt": _STRING
+    }, REQUIRED_FIELDS["pronunciation"]),
+    "listening": object_schema({
+        **_COMMON_PROPERTIES, "audio_text": _STRING, "options": _OPTIONS, "correct_answer": _INTEGER
+    }, REQUIRED_FIELDS["listening"]),
+    "fill_blank": object_schema({
+        **_COMMON_PROPERTIES, "sentence": _STRING, "missing_word": _STRING, "xp_reward": _INTEGER
+    }, REQUIRED_FIELDS["fill_blank"]),
+    "multiple_choice": object_schema({
+        **_COMMON_PROPERTIES, "prompt": _STRING, "options": _OPTIONS,
+        "correct_answer": _INTEGER, "xp_reward": _INTEGER
+    }, REQUIRED_FIELDS["multiple_choice"])
+}
+
+
+def validate_challenge(challenge_type, challenge_data):
+    """
+    Check a generated challenge before it is used.
+
+    Raises:
+        ValueError - Not an object, missing fields, or bad options/correct_answer
+    """
+    if not isinstance(challenge_data, dict):
+        raise ValueError("Challenge must be a JSON object")
+
+    for field in REQUIRED_FIELDS[challenge_type]:
+        if field not in challenge_data:
+            raise ValueError(f"Missing required field: {field}")
+
+    if "options" in REQUIRED_FIELDS[challenge_type]:
+        options = challenge_data['options']
+        if not isinstance(options, list) or len(options) != 4:
+            raise ValueError("Must have exactly 4 options")
+
+        answer = challenge_data['correct_answer']
+        if isinstance(answer, bool) or not isinstance(answer, int) or not (0 <= answer <= 3):
+            raise ValueError("correct_answer must be 0-3")
+
+
+def _generate(challenge_type, prompt):
+    """
+    Ask Ollama for one challenge of a type, constrained to its JSON schema.
+    Invalid answers are retried (OLLAMA_MAX_RETRIES) before giving up.
+    """
+    from config import get_config
+
+    try:
+        return chat_json(
+            messages=[
+                {'role': 'system', 'content': JSON_SYSTEM_PROMPT},
+                {'role': 'user', 'content': prompt}
+            ],
+            schema=CHALLENGE_SCHEMAS[challenge_type],
+            purpose=f"generate_{challenge_type}",
+            options={'temperature': 0.3},  # Lower temperature for consistent JSON
+            validate=lambda data: validate_challenge(challenge_type, data),
+            timeout=get_config().OLLAMA_GENERATION_TIMEOUT
+        )
+    except Exception as e:
+        print(f"Error generating challenge: {e}")
+        raise
+
+
+# Multi-challenge prompts: shared instructions per type, sent once for K challenges
+MULTI_PROMPT_PARTS = {
+    "pronunciation": {
+        "task": "pronunciation challenges (the learner says the target phrase aloud; evaluated with Whisper ASR)",
+        "rules": [
+            "Create realistic, practical phrases Norwegians actually use",
+            "Both languages ALWAYS included (English for context, Norwegian for pronunciation)",
+            "target = The EXACT phrase they will pronounce",
+            "irl_bonus_xp is 10, 15 or 20 for difficulty 1, 2 or 3; irl_prompt is a real-life practice suggestion in Norwegian"
+        ],
+        "by_difficulty": {
+            1: "1-3 word simple phrases, common everyday words, present tense",
+            2: "4-6 word phrases, mix of common and specific vocabulary, past/future tense and conjunctions",
+            3: "7+ word complex phrases, advanced vocabulary and idioms, subordinate clauses"
+        },
+        "example": {
+            "type": "pronunciation",
+            "title": "Order coffee",
+            "title_no": "Bestille kaffe",
+            "description": "You are at a café and want to order a coffee",
+            "description_no": "Du er på en kafé og vil bestille en kaffe",
+            "prompt": "I would like a coffee, please",
+            "target": "Jeg vil gjerne ha en kaffe, takk",
+            "difficulty": 1,
+            "frequency": "daily",
+            "level": "beginner",
+            "age_group": "all",
+            "topic": "cafe",
+            "irl_bonus_available": True,
+            "irl_bonus_xp": 10,
+            "irl_prompt": "Bestill kaffe på norsk neste gang du er på kafé"
+        }
+    },
+    "listening": {
+        "task": "listening comprehension challenges",
+        "rules": [
+            "audio_text is a Norwegian phrase",
+            "4 English translation options (only 1 correct, 3 plausible wrong answers)",
+            "correct_answer is the index (0-3) of the correct option"
+        ],
+        "by_difficulty": {1: "1-3 words", 2: "4-6 words", 3: "7+ words"},
+        "example": {
+            "type": "listening",
+            "title": "Understanding a greeting",
+            "title_no": "Forstå en hilsen",
+            "description": "Listen and select the correct translation",
+            "description_no": "Lytt og velg riktig oversettelse",
+            "audio_text": "God morgen",
+            "options": ["Good morning", "Good evening", "Good night", "Good day"],
+            "correct_answer": 0,
+            "difficulty": 1,
+            "frequency": "daily",
+            "level": "beginner",
+            "age_group": "all",
+            "topic": "social"
+        }
+    },
+    "fill_blank": {
+        "task": "fill-in-the-blank challenges",
+        "rules": [
+            "sentence is a Norwegian sentence with ONE word replaced by ___",
+            "missing_word is the correct word (Norwegian)"
+        ],
+        "by_difficulty": {
+            1: "Simple common words (1-2 syllables)",
+            2: "Moderate vocabulary (2-3 syllables)",
+            3: "Advanced vocabulary and expressions"
+        },
+        "example": {
+            "type": "fill_blank",
+            "title": "Complete the sentence",
+            "title_no": "Fullfør setningen",
+            "description": "Fill in the missing Norwegian word",
+            "description_no": "Fyll inn det manglende norske ordet",
+            "sentence": "Jeg vil gjerne ha en ___ takk",
+            "missing_word": "kaffe",
+            "difficulty": 1,
+            "frequency": "daily",
+            "level": "beginner",
+            "age_group": "all",
+            "topic": "cafe",
+            "xp_reward": 10
+        }
+    },
+    "multiple_choice": {
+        "task": "multiple choice translation challenges",
+        "rules": [
+            "prompt is an English phrase",
+            "4 Norwegian translation options (only 1 correct, 3 plausible wrong answers)",
+            "correct_answer is the index (0-3) of the correct option"
+        ],
+        "by_difficulty": {
+            1: "Simple phrases (1-3 words)",
+            2: "Moderate phrases (4-6 words)",
+            3: "Complex phrases (7+ words)"
+        },
+        "example": {
+            "type": "multiple_choice",
+            "title": "Translate to Norwegian",
+            "title_no": "Oversett til norsk",
+            "description": "Choose the correct Norwegian translation",
+            "description_no": "Velg riktig norsk oversettelse",
+            "prompt": "Good morning",
+            "options": ["God morgen", "God kveld", "God natt", "God dag"],
+            "correct_answer": 0,
+            "difficulty": 1,
+            "frequency": "daily",
+            "level": "beginner",
+            "age_group": "all",
+            "topic": "social",
+            "xp_reward": 10
+        }
+    }
+}
+
+
+def _multi_challenge_prompt(challenge_type, specs):
+    """Prompt asking for one challenge per spec, in order, as {"challenges": [...]}."""
+    parts = MULTI_PROMPT_PARTS[challenge_type]
+    rules = "\n".join(f"- {rule}" for rule in parts["rules"])
+    by_difficulty = "\n".join(f"- Difficulty {d}: {text}" for d, text in parts["by_difficulty"].items())
+    items = "\n".join(
+        f"{n}. topic: {spec['topic']}, difficulty: {spec['difficulty']} "
+        f"({LEVELS.get(spec['difficulty'], 'beginner')}), frequency: {spec['frequency']}"
+        for n, spec in enumerate(specs, 1)
+    )
+    example = json.dumps(parts["example"], ensure_ascii=False, indent=2)
+
+    return f"""Generate {len(specs)} different Norwegian {parts["task"]}.
+
+Rules for every challenge:
+{rules}
+- Use Norwegian Bokmål
+- Culturally relevant to Norway
+- No two challenges may use the same phrase
+
+By difficulty:
+{by_difficulty}
+
+Example of ONE challenge:
+{example}
+
+Challenges to create, in this order:
+{items}
+
+Respond with a JSON object {{"challenges": [...]}} holding exactly {len(specs)} challenges in the order above."""
+
+
+def generate_challenge_group(challenge_type, specs):
+    """
+    Generate several challenges of one type from a single prompt.
+
+    The long shared instructions are sent (and prefilled) once for the whole
+    group. Each returned item is validated on its own; only the items that
+    failed are asked for again, up to OLLAMA_MAX_RETRIES more rounds.
+
+    Args:
+        challenge_type: str - "pronunciation", "listening", "fill_blank" or "multiple_choice"
+        specs: list of dict - {difficulty, topic, frequency} per challenge (topic None = random)
+
+    Returns:
+        list - Per spec, in order: the challenge dict, or the Exception it failed with
+    """
+    from config import get_config
+
+    cfg = get_config()
+    specs = [{"difficulty": 1, "frequency": "daily", **spec} for spec in specs]
+
+    # Different random topics within the group where possible
+    free_topics = random.sample(TOPICS, len(TOPICS))
+    for spec in specs:
+        if spec.get("topic") is None:
+            spec["topic"] = free_topics.pop() if free_topics else random.choice(TOPICS)
+
+    outcomes = [None] * len(specs)
+    pending = list(range(len(specs)))
+    for _ in range(cfg.OLLAMA_MAX_RETRIES + 1):
+        if not pending:
+            break
+
+        group = [specs[i] for i in pending]
+        schema = object_schema({
+            "challenges": {
+                "type": "array",
+                "items": CHALLENGE_SCHEMAS[challenge_type],
+                "minItems": len(group),
+                "maxItems": len(group)
+            }
+        })
+        try:
+            items = chat_json(
+                messages=[
+                    {'role': 'system', 'content': JSON_SYSTEM_PROMPT},
+                    {'role': 'user', 'content': _multi_challenge_prompt(challenge_type, group)}
+                ],
+                schema=schema,
+                purpose=f"generate_{challenge_type}_group",
+                options={'temperature': 0.3},
+                retries=0,  # Retried below, per item
+                timeout=cfg.OLLAMA_GENERATION_TIMEOUT * len(group)
+            ).get("challenges") or []
+        except Exception as e:
+            logger.warning(f"Group generation of {len(group)} {challenge_type} challenges failed: {e}")
+            for i in pending:
+                outcomes[i] = e
+            continue
+
+        still_pending = []
+        for position, i in enumerate(pending):
+            try:
+                if position >= len(items):
+                    raise ValueError("Missing from the model's answer")
+                challenge = items[position]
+                validate_challenge(challenge_type, challenge)
+            except (ValueError, TypeError, KeyError) as e:
+                outcomes[i] = e
+                still_pending.append(i)
+                continue
+
+            # Keep what was asked for, whatever the model echoed back
+            challenge.update(
+                type=challenge_type,
+                topic=specs[i]["topic"],
+                difficulty=specs[i]["difficulty"],
+                frequency=specs[i]["frequency"],
+                level=LEVELS.get(specs[i]["difficulty"], "beginner")
+            )
+            outcomes[i] = challenge
+        pending = still_pending
+
+    return outcomes
+
 
 def _get_example_challenge(difficulty, topic):
     """Get an example challenge for the AI to follow."""
@@ -129,75 +466,7 @@ Example for difficulty {difficulty}, topic {topic}:
 
 Generate the challenge now:"""
 
-    try:
-        # Call Ollama API
-        response = ollama.chat(
-            model='llama3.2',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a JSON generator. You ONLY output valid JSON objects. Never include explanations, markdown formatting, or any text outside the JSON object.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            options={
-                'temperature': 0.3,  # Lower temperature for consistent JSON
-            }
-        )
-
-        # Extract response content
-        content = response['message']['content'].strip()
-
-        # Remove markdown code blocks
-        if content.startswith('```json'):
-            content = content[7:]
-        if content.startswith('```'):
-            content = content[3:]
-        if content.endswith('```'):
-            content = content[:-3]
-        content = content.strip()
-
-        # Extract JSON from any surrounding text
-        import re
-        # Find the first { and last } to extract just the JSON object
-        first_brace = content.find('{')
-        last_brace = content.rfind('}')
-        if first_brace != -1 and last_brace != -1:
-            content = content[first_brace:last_brace + 1]
-
-        # Clean up common JSON errors
-        # Remove trailing commas before closing brackets/braces
-        content = re.sub(r',(\s*[}\]])', r'\1', content)
-        # Remove markdown bold markers that might appear
-        content = content.replace('**', '')
-        # Remove any newlines in string values that break JSON
-        content = re.sub(r'(?<!\\)\n', ' ', content)
-
-        # Fix incomplete JSON (missing closing brace)
-        if content.count('{') > content.count('}'):
-            content += '}'
-
-        # Parse JSON
-        challenge_data = json.loads(content)
-
-        # Validate required fields
-        required_fields = ['type', 'title', 'description', 'prompt', 'target', 'difficulty', 'frequency']
-        for field in required_fields:
-            if field not in challenge_data:
-                raise ValueError(f"Missing required field: {field}")
-
-        return challenge_data
-
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse JSON response: {e}")
-        print(f"Raw response: {content}")
-        raise ValueError(f"Invalid JSON from AI: {e}")
-    except Exception as e:
-        print(f"Error generating challenge: {e}")
-        raise
+    return _generate("pronunciation", prompt)
 
 
 def generate_listening_challenge(difficulty=1, topic=None, frequency="daily"):
@@ -250,82 +519,192 @@ EXAMPLE OUTPUT:
 
 Generate similar valid JSON for topic "{topic}" and difficulty {difficulty}. Output ONLY the JSON object:"""
 
-    try:
-        # Call Ollama API
-        response = ollama.chat(
-            model='llama3.2',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a JSON generator. You ONLY output valid JSON objects. Never include explanations, markdown formatting, or any text outside the JSON object.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            options={
-                'temperature': 0.3,  # Lower temperature for consistent JSON
-            }
-        )
+    return _generate("listening", prompt)
 
-        # Extract and clean response
-        content = response['message']['content'].strip()
-
-        # Remove markdown code blocks
-        if content.startswith('```json'):
-            content = content[7:]
-        if content.startswith('```'):
-            content = content[3:]
-        if content.endswith('```'):
-            content = content[:-3]
-        content = content.strip()
-
-        # Extract JSON from any surrounding text
-        import re
-        # Find the first { and last } to extract just the JSON object
-        first_brace = content.find('{')
-        last_brace = content.rfind('}')
-        if first_brace != -1 and last_brace != -1:
-            content = content[first_brace:last_brace + 1]
-
-        # Clean up common JSON errors
-        # Remove trailing commas before closing brackets/braces
-        content = re.sub(r',(\s*[}\]])', r'\1', content)
-        # Remove markdown bold markers that might appear
-        content = content.replace('**', '')
-        # Remove any newlines in string values that break JSON
-        content = re.sub(r'(?<!\\)\n', ' ', content)
-
-        # Fix incomplete JSON (missing closing brace)
-        if content.count('{') > content.count('}'):
-            content += '}'
-
-        # Parse JSON
-        challenge_data = json.loads(content)
-
-        # Validate required fields
-        required_fields = ['type', 'title', 'description', 'audio_text', 'options', 'correct_answer']
-        for field in required_fields:
-            if field not in challenge_data:
-                raise ValueError(f"Missing required field: {field}")
-
-        # Validate options
-        if len(challenge_data['options']) != 4:
-            raise ValueError("Must have exactly 4 options")
 
-        if not (0 <= challenge_data['correct_answer'] <= 3):
-            raise ValueError("correct_answer must be 0-3")
+def _get_generation_executor():
+    """Get (or create) this process's generation thread pool (GENERATION_CONCURRENCY threads)."""
+    global _generation_executor
+    if _generation_executor is None:
+        with _generation_executor_lock:
+            if _generation_executor is None:
+                from config import get_config
+                _generation_executor = ThreadPoolExecutor(
+                    max_workers=get_config().GENERATION_CONCURRENCY,
+                    thread_name_prefix="challenge-generation"
+                )
+    return _generation_executor
 
-        return challenge_data
 
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse JSON response: {e}")
-        print(f"Raw response: {content}")
-        raise ValueError(f"Invalid JSON from AI: {e}")
+def _generator_for(challenge_type):
+    return {
+        "pronunciation": generate_pronunciation_challenge,
+        "listening": generate_listening_challenge,
+        "fill_blank": generate_fill_blank_challenge,
+        "multiple_choice": generate_multiple_choice_challenge
+    }.get(challenge_type)
+
+
+def _plan_units(specs, per_prompt):
+    """Split spec indices into request units: single challenges, or same-type groups of per_prompt."""
+    if per_prompt <= 1:
+        return [[i] for i in range(len(specs))]
+
+    by_type = {}
+    for i, spec in enumerate(specs):
+        by_type.setdefault(spec["type"], []).append(i)
+    return [
+        indices[start:start + per_prompt]
+        for indices in by_type.values()
+        for start in range(0, len(indices), per_prompt)
+    ]
+
+
+def _run_unit(specs, unit, per_prompt, started):
+    """Generate the challenges of one request unit; returns a challenge or Exception per index."""
+    now = time.perf_counter()
+    for i in unit:
+        started[i] = now
+
+    challenge_type = specs[unit[0]]["type"]
+    if _generator_for(challenge_type) is None:
+        return [ValueError(f"Unknown challenge type: {challenge_type}")] * len(unit)
+
+    if per_prompt > 1:
+        return generate_challenge_group(challenge_type, [specs[i] for i in unit])
+
+    spec = specs[unit[0]]
+    try:
+        return [_generator_for(challenge_type)(spec.get("difficulty", 1), spec.get("topic"), spec.get("frequency", "daily"))]
     except Exception as e:
-        print(f"Error generating challenge: {e}")
-        raise
+        return [e]
+
+
+def generate_challenges_concurrently(specs, timeout=None, per_prompt=None):
+    """
+    Generate challenges with several Ollama requests in flight.
+
+    The pool is shared by the whole process, so concurrent batches together
+    never have more than GENERATION_CONCURRENCY requests in flight. A request
+    that runs past its timeout is reported as timed out; its thread finishes
+    in the background (bounded by the Ollama request timeout) and its result
+    is dropped.
+
+    With per_prompt > 1, challenges of the same type are requested together,
+    per_prompt per prompt (see generate_challenge_group()).
+
+    Args:
+        specs: list of dict - One per challenge: {type, difficulty, topic, frequency}
+        timeout: float - Seconds a challenge may take once started, retries included
+                 (default: GENERATION_TIMEOUT); a multi-challenge prompt gets this
+                 once per challenge it carries
+        per_prompt: int - Challenges per prompt (default: GENERATION_PER_PROMPT)
+
+    Returns:
+        dict: {
+            challenges: list - Generated challenges, in spec order
+            results: list - Per spec, in spec order: {index, type, difficulty, topic,
+                     status: "ok" | "failed" | "timeout", error, seconds,
+                     finished: int (1-based completion order)}
+            stats: {requested, generated, failed, timed_out, concurrency, per_prompt,
+                    seconds, challenges_per_minute}
+        }
+    """
+    from config import get_config
+
+    cfg = get_config()
+    timeout = cfg.GENERATION_TIMEOUT if timeout is None else timeout
+    per_prompt = cfg.GENERATION_PER_PROMPT if per_prompt is None else per_prompt
+    executor = _get_generation_executor()
+
+    started = {}  # spec index -> time its request started running
+    results = [None] * len(specs)
+    finished = 0
+
+    def finish(index, status, challenge=None, error=None):
+        nonlocal finished
+        finished += 1
+        spec = specs[index]
+        seconds = time.perf_counter() - started[index] if index in started else 0.0
+        results[index] = {
+            "index": index,
+            "type": spec["type"],
+            "difficulty": spec.get("difficulty", 1),
+            "topic": challenge.get("topic") if challenge else spec.get("topic"),
+            "status": status,
+            "challenge": challenge,
+            "error": str(error) if error else None,
+            "seconds": round(seconds, 2),
+            "finished": finished
+        }
+        if status == STATUS_OK:
+            logger.info(f"  ✓ [{finished}/{len(specs)}] {spec['type']}: {challenge.get('title', 'Unknown')} ({seconds:.1f}s)")
+        else:
+            logger.warning(f"  ✗ [{finished}/{len(specs)}] {spec['type']} {status}: {error}")
+
+    def unit_timeout(unit):
+        return timeout * len(unit)
+
+    batch_start = time.perf_counter()
+    futures = {
+        executor.submit(_run_unit, specs, unit, per_prompt, started): unit
+        for unit in _plan_units(specs, per_prompt)
+    }
+    pending = set(futures)
+    try:
+        while pending:
+            # Units not yet started can't time out before their timeout from now
+            deadlines = [
+                started[futures[f][0]] + unit_timeout(futures[f]) if futures[f][0] in started
+                else time.perf_counter() + unit_timeout(futures[f])
+                for f in pending
+            ]
+            wait_for = max(0.0, min(deadlines) - time.perf_counter())
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.discard(future)
+                unit = futures[future]
+                error = future.exception()
+                outcomes = [error] * len(unit) if error is not None else future.result()
+                for index, outcome in zip(unit, outcomes):
+                    if isinstance(outcome, Exception):
+                        finish(index, STATUS_FAILED, error=outcome)
+                    else:
+                        finish(index, STATUS_OK, challenge=outcome)
+
+            now = time.perf_counter()
+            for future in list(pending):
+                unit = futures[future]
+                if unit[0] in started and now - started[unit[0]] >= unit_timeout(unit):
+                    pending.discard(future)
+                    error = TimeoutError(f"Generation exceeded {unit_timeout(unit)}s")
+                    for index in unit:
+                        finish(index, STATUS_TIMEOUT, error=error)
+    finally:
+        for future in pending:
+            future.cancel()
+
+    seconds = time.perf_counter() - batch_start
+    challenges = [r.pop("challenge") for r in results if r["status"] == STATUS_OK]
+    for r in results:
+        r.pop("challenge", None)
+
+    stats = {
+        "requested": len(specs),
+        "generated": len(challenges),
+        "failed": sum(r["status"] == STATUS_FAILED for r in results),
+        "timed_out": sum(r["status"] == STATUS_TIMEOUT for r in results),
+        "concurrency": cfg.GENERATION_CONCURRENCY,
+        "per_prompt": per_prompt,
+        "seconds": round(seconds, 2),
+        "challenges_per_minute": round(len(challenges) * 60 / seconds, 1) if seconds > 0 else None
+    }
+    logger.info(
+        f"Generated {stats['generated']}/{stats['requested']} challenges in {stats['seconds']}s "
+        f"({stats['challenges_per_minute']}/min, {stats['concurrency']} in flight, {per_prompt} per prompt)"
+    )
+    return {"challenges": challenges, "results": results, "stats": stats}
 
 
 def generate_challenges_batch(
@@ -373,33 +752,20 @@ def generate_challenges_batch(
         difficulties.append(random.choice(list(difficulty_mix.keys())))
     difficulties = difficulties[:count]
 
-    # Generate challenges
-    challenges = []
-    for i, difficulty in enumerate(difficulties):
-        challenge_type = random.choice(challenge_types)
-        topic = random.choice(topic_mix) if topic_mix else None
-
-        print(f"Generating challenge {i+1}/{count}: {challenge_type}, difficulty {difficulty}, topic {topic}...")
-
-        try:
-            if challenge_type == "pronunciation":
-                challenge = generate_pronunciation_challenge(difficulty, topic, frequency)
-            elif challenge_type == "listening":
-                challenge = generate_listening_challenge(difficulty, topic, frequency)
-            elif challenge_type == "fill_blank":
-                challenge = generate_fill_blank_challenge(difficulty, topic, frequency)
-            elif challenge_type == "multiple_choice":
-                challenge = generate_multiple_choice_challenge(difficulty, topic, frequency)
-            else:
-                print(f"  ✗ Unknown challenge type: {challenge_type}")
-                continue
-
-            challenges.append(challenge)
-            print(f"  ✓ Generated: {challenge.get('title', 'Unknown')}")
-
-        except Exception as e:
-            print(f"  ✗ Failed to generate challenge {i+1}: {e}")
-            continue
+    specs = [
+        {
+            "type": random.choice(challenge_types),
+            "difficulty": difficulty,
+            "topic": random.choice(topic_mix) if topic_mix else None,
+            "frequency": frequency
+        }
+        for difficulty in difficulties
+    ]
+
+    print(f"Generating {count} challenges...")
+    batch = generate_challenges_concurrently(specs)
+    challenges = batch["challenges"]
+    print(f"  Generated {len(challenges)}/{count} ({batch['stats']['challenges_per_minute']}/min)")
 
     return challenges
 
@@ -414,17 +780,25 @@ def save_challenges_to_firestore(challenges):
     Returns:
         list - List of document IDs of saved challenges
     """
-    saved_ids = []
-
-    for challenge in challenges:
-        try:
-            doc_id = add_challenge(challenge)
-            saved_ids.append(doc_id)
-            print(f"  ✓ Saved to Firestore: {challenge['title']} (ID: {doc_id})")
-        except Exception as e:
-            print(f"  ✗ Failed to save challenge '{challenge.get('title', 'Unknown')}': {e}")
-            continue
+    from firebase_config import db
+    from services_bulk_writes import bulk_set
+
+    created_at = datetime.now(timezone.utc).isoformat()
+    doc_refs = [db.collection("challenges").document() for _ in challenges]
+    result = bulk_set(
+        [[(doc_ref, {**challenge, "created_at": created_at})] for doc_ref, challenge in zip(doc_refs, challenges)],
+        label="Save generated challenges"
+    )
 
+    saved_ids = []
+    for i, (doc_ref, challenge) in enumerate(zip(doc_refs, challenges)):
+        if i in result["failed_groups"]:
+            print(f"  ✗ Failed to save challenge '{challenge.get('title', 'Unknown')}'")
+        else:
+            saved_ids.append(doc_ref.id)
+            print(f"  ✓ Saved to Firestore: {challenge['title']} (ID: {doc_ref.id})")
+
+    print(f"  Wrote {result['written']} challenges ({result['docs_per_second']} docs/s)")
     return saved_ids
 
 
@@ -479,63 +853,7 @@ EXAMPLE OUTPUT:
 
 Generate similar valid JSON for topic "{topic}" and difficulty {difficulty}. Output ONLY the JSON object:"""
 
-    try:
-        response = ollama.chat(
-            model='llama3.2',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a JSON generator. You ONLY output valid JSON objects. Never include explanations, markdown formatting, or any text outside the JSON object.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            options={'temperature': 0.3}
-        )
-
-        content = response['message']['content'].strip()
-
-        # Clean JSON response
-        if content.startswith('```json'):
-            content = content[7:]
-        if content.startswith('```'):
-            content = content[3:]
-        if content.endswith('```'):
-            content = content[:-3]
-        content = content.strip()
-
-        import re
-        first_brace = content.find('{')
-        last_brace = content.rfind('}')
-        if first_brace != -1 and last_brace != -1:
-            content = content[first_brace:last_brace + 1]
-
-        content = re.sub(r',(\s*[}\]])', r'\1', content)
-        content = content.replace('**', '')
-        content = re.sub(r'(?<!\\)\n', ' ', content)
-
-        if content.count('{') > content.count('}'):
-            content += '}'
-
-        challenge_data = json.loads(content)
-
-        # Validate required fields
-        required_fields = ['type', 'title', 'description', 'sentence', 'missing_word']
-        for field in required_fields:
-            if field not in challenge_data:
-                raise ValueError(f"Missing required field: {field}")
-
-        return challenge_data
-
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse JSON response: {e}")
-        print(f"Raw response: {content}")
-        raise ValueError(f"Invalid JSON from AI: {e}")
-    except Exception as e:
-        print(f"Error generating challenge: {e}")
-        raise
+    return _generate("fill_blank", prompt)
 
 
 def generate_multiple_choice_challenge(difficulty=1, topic=None, frequency="daily"):
@@ -590,69 +908,7 @@ EXAMPLE OUTPUT:
 
 Generate similar valid JSON for topic "{topic}" and difficulty {difficulty}. Output ONLY the JSON object:"""
 
-    try:
-        response = ollama.chat(
-            model='llama3.2',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a JSON generator. You ONLY output valid JSON objects. Never include explanations, markdown formatting, or any text outside the JSON object.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            options={'temperature': 0.3}
-        )
-
-        content = response['message']['content'].strip()
-
-        # Clean JSON response
-        if content.startswith('```json'):
-            content = content[7:]
-        if content.startswith('```'):
-            content = content[3:]
-        if content.endswith('```'):
-            content = content[:-3]
-        content = content.strip()
-
-        import re
-        first_brace = content.find('{')
-        last_brace = content.rfind('}')
-        if first_brace != -1 and last_brace != -1:
-            content = content[first_brace:last_brace + 1]
-
-        content = re.sub(r',(\s*[}\]])', r'\1', content)
-        content = content.replace('**', '')
-        content = re.sub(r'(?<!\\)\n', ' ', content)
-
-        if content.count('{') > content.count('}'):
-            content += '}'
-
-        challenge_data = json.loads(content)
-
-        # Validate required fields
-        required_fields = ['type', 'title', 'description', 'prompt', 'options', 'correct_answer']
-        for field in required_fields:
-            if field not in challenge_data:
-                raise ValueError(f"Missing required field: {field}")
-
-        if len(challenge_data['options']) != 4:
-            raise ValueError("Must have exactly 4 options")
-
-        if not (0 <= challenge_data['correct_answer'] <= 3):
-            raise ValueError("correct_answer must be 0-3")
-
-        return challenge_data
-
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse JSON response: {e}")
-        print(f"Raw response: {content}")
-        raise ValueError(f"Invalid JSON from AI: {e}")
-    except Exception as e:
-        print(f"Error generating challenge: {e}")
-        raise
+    return _generate("multiple_choice", prompt)
 
 
 def generate_and_save_challenges(
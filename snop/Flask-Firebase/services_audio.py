@@ -0,0 +1,112 @@
+# services_audio.py
+"""
+Audio preprocessing for pronunciation evaluation.
+Decodes recordings to 16 kHz mono and trims leading/trailing silence with a
+lightweight energy-based voice activity detector (VAD) before Whisper runs.
+"""
+import numpy as np
+
+# Whisper expects 16 kHz mono float32 audio
+SAMPLE_RATE = 16000
+
+# VAD tuning
+FRAME_MS = 30                 # Analysis frame length
+PAD_MS = 150                  # Silence kept around detected speech
+MIN_SPEECH_MS = 120           # Shorter bursts are treated as noise (clicks, taps)
+ABSOLUTE_FLOOR_DB = -50.0     # Frames below this are always silence (dBFS)
+NOISE_MARGIN_DB = 10.0        # Speech must be this far above the noise floor
+PEAK_RANGE_DB = 35.0          # ...and within this range of the loudest frame
+
+
+def load_audio(file_path):
+    """
+    Decode an audio file (m4a, wav, mp3, ...) to a 16 kHz mono float32 array.
+
+    Args:
+        file_path: str - Path to the audio file
+
+    Returns:
+        np.ndarray - Audio samples in [-1, 1]
+    """
+    import whisper
+    return whisper.load_audio(file_path, sr=SAMPLE_RATE)
+
+
+def frame_energies_db(audio, frame_length):
+    """
+    Compute per-frame RMS energy in dBFS using non-overlapping frames.
+
+    Args:
+        audio: np.ndarray - Audio samples
+        frame_length: int - Samples per frame
+
+    Returns:
+        np.ndarray - Energy of each frame in dB
+    """
+    n_frames = len(audio) // frame_length
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+
+    frames = audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def detect_speech_bounds(audio, sample_rate=SAMPLE_RATE):
+    """
+    Find the first and last sample that contain speech.
+
+    The threshold adapts to each recording: it sits above the estimated noise
+    floor (10th percentile frame energy) but never below an absolute floor, so
+    both quiet rooms and noisy streets work without tuning. A recording of
+    continuous speech has no silent frames, so its "noise floor" is speech and
+    nothing clears the adaptive threshold; if it is loud enough, the whole
+    recording is kept.
+
+    Args:
+        audio: np.ndarray - Audio samples
+        sample_rate: int - Sample rate of the audio
+
+    Returns:
+        tuple (start, end) in samples, or None if no speech was detected
+    """
+    frame_length = int(sample_rate * FRAME_MS / 1000)
+    energies = frame_energies_db(audio, frame_length)
+    if energies.size == 0:
+        return None
+
+    noise_floor = np.percentile(energies, 10)
+    peak = energies.max()
+    threshold = max(noise_floor + NOISE_MARGIN_DB, peak - PEAK_RANGE_DB, ABSOLUTE_FLOOR_DB)
+
+    speech = energies > threshold
+    min_frames = max(1, MIN_SPEECH_MS // FRAME_MS)
+    if np.count_nonzero(speech) < min_frames:
+        if np.count_nonzero(energies > ABSOLUTE_FLOOR_DB) >= min_frames:
+            return 0, len(audio)
+        return None
+
+    speech_idx = np.flatnonzero(speech)
+    pad = int(sample_rate * PAD_MS / 1000)
+    start = max(0, speech_idx[0] * frame_length - pad)
+    end = min(len(audio), (speech_idx[-1] + 1) * frame_length + pad)
+    return start, end
+
+
+def trim_silence(audio, sample_rate=SAMPLE_RATE):
+    """
+    Trim leading and trailing silence from a recording.
+
+    Args:
+        audio: np.ndarray - Audio samples
+        sample_rate: int - Sample rate of the audio
+
+    Returns:
+        np.ndarray - Trimmed audio, or None if the recording contains no speech
+    """
+    bounds = detect_speech_bounds(audio, sample_rate)
+    if bounds is None:
+        return None
+
+    start, end = bounds
+    return audio[start:end]
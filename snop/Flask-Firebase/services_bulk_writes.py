@@ -0,0 +1,180 @@
+# services_bulk_writes.py
+"""
+Shared bulk writes for Firestore (challenge generation, pool refills, seeding, archival).
+- Writes are packed into write batches of up to 500 operations
+- Batches are committed in parallel (BULK_WRITE_WORKERS)
+- A failed batch is retried with backoff; set() and field update() writes are
+  idempotent, so retrying a batch that did reach the server is harmless
+- Writes that must land together (e.g. a pool document and its hash index
+  entry) are passed as one group and always share a batch
+- create() writes fail if the document exists (e.g. a hash index entry written
+  by a concurrent insert). That group is reported as a conflict, and the rest
+  of its batch is committed group by group
+- Reports documents per second
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+
+from google.api_core.exceptions import AlreadyExists
+
+from firebase_config import db
+
+logger = logging.getLogger(__name__)
+
+# Firestore limit on operations per write batch
+MAX_BATCH_OPS = 500
+
+# Write operations; a write is (document reference, data) or (document reference, data, operation)
+WRITE_SET = "set"
+WRITE_UPDATE = "update"
+WRITE_CREATE = "create"
+
+
+def _chunk_groups(groups, max_ops):
+    """Pack write groups into chunks of at most max_ops writes, never splitting a group."""
+    chunks = []
+    current, current_ops = [], 0
+    for index, group in enumerate(groups):
+        if current and current_ops + len(group) > max_ops:
+            chunks.append(current)
+            current, current_ops = [], 0
+        current.append(index)
+        current_ops += len(group)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _created_documents_match(groups, indices):
+    """
+    Whether every create() target of these groups already holds the data it would
+    be created with (plain values only; server timestamps and other transforms are
+    not compared). True means an earlier attempt reached the server after all.
+    """
+    plain = (str, int, float, bool, type(None))
+    for index in indices:
+        for write in groups[index]:
+            if len(write) < 3 or write[2] != WRITE_CREATE:
+                continue
+            snapshot = write[0].get()
+            if not snapshot.exists:
+                return False
+            stored = snapshot.to_dict()
+            if any(stored.get(field) != value for field, value in write[1].items() if isinstance(value, plain)):
+                return False
+    return True
+
+
+def _commit_groups(groups, indices, retries, update):
+    """Commit groups as one write batch, retrying on failure. Returns the last error or None."""
+    default_operation = WRITE_UPDATE if update else WRITE_SET
+    for attempt in range(retries + 1):
+        batch = db.batch()
+        for index in indices:
+            for write in groups[index]:
+                operation = write[2] if len(write) > 2 else default_operation
+                getattr(batch, operation)(write[0], write[1])
+        try:
+            batch.commit()
+            return None
+        except AlreadyExists as e:
+            if attempt > 0 and _created_documents_match(groups, indices):
+                return None
+            # Retrying can't help: the document exists
+            return e
+        except Exception as e:
+            logger.warning(f"Batch of {len(indices)} write groups failed (attempt {attempt + 1}/{retries + 1}): {e}")
+            if attempt < retries:
+                time.sleep(min(2 ** attempt, 10))
+            error = e
+    return error
+
+
+def _commit_chunk(groups, chunk, retries, update):
+    """
+    Commit one chunk as a write batch.
+
+    Returns:
+        dict: group index -> error, for groups that were not written
+    """
+    error = _commit_groups(groups, chunk, retries, update)
+    if error is None:
+        return {}
+    if not isinstance(error, AlreadyExists) or len(chunk) == 1:
+        return {index: error for index in chunk}
+
+    # Some group's create() hit an existing document; find it by writing groups on their own
+    failed = {}
+    for index in chunk:
+        error = _commit_groups(groups, [index], retries, update)
+        if error is not None:
+            failed[index] = error
+    return failed
+
+
+def bulk_set(groups, label="bulk write", workers=None, retries=None, max_ops=MAX_BATCH_OPS, update=False):
+    """
+    Write documents with parallel batched commits.
+
+    Args:
+        groups: list of write groups; each is a list of (document reference, data)
+                or (document reference, data, WRITE_SET | WRITE_UPDATE | WRITE_CREATE)
+                writes that are committed atomically together
+        label: str - Name used in log lines
+        workers: int - Batches committed in parallel (default: BULK_WRITE_WORKERS)
+        retries: int - Extra attempts per failed batch (default: BULK_WRITE_RETRIES)
+        max_ops: int - Writes per batch (Firestore allows at most 500)
+        update: bool - Update fields of existing documents instead of setting
+                whole documents, for writes without an operation (a missing
+                document fails its batch)
+
+    Returns:
+        dict: {
+            written: int - Documents written
+            failed: int - Documents not written after all retries
+            failed_groups: set - Indices of groups that were not written
+            conflict_groups: set - Of those, groups whose create() target already existed
+            batches: int,
+            seconds: float,
+            docs_per_second: float | None
+        }
+    """
+    from config import get_config
+
+    cfg = get_config()
+    workers = cfg.BULK_WRITE_WORKERS if workers is None else workers
+    retries = cfg.BULK_WRITE_RETRIES if retries is None else retries
+
+    start = time.perf_counter()
+    chunks = _chunk_groups(groups, min(max_ops, MAX_BATCH_OPS))
+
+    errors = {}
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks))),
+                                thread_name_prefix="bulk-write") as executor:
+            for chunk_errors in executor.map(lambda chunk: _commit_chunk(groups, chunk, retries, update), chunks):
+                errors.update(chunk_errors)
+
+    failed_groups = set(errors)
+    conflict_groups = {index for index, error in errors.items() if isinstance(error, AlreadyExists)}
+
+    seconds = time.perf_counter() - start
+    failed = sum(len(groups[i]) for i in failed_groups)
+    written = sum(len(group) for group in groups) - failed
+
+    result = {
+        "written": written,
+        "failed": failed,
+        "failed_groups": failed_groups,
+        "conflict_groups": conflict_groups,
+        "batches": len(chunks),
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(written / seconds, 1) if seconds > 0 and written else None
+    }
+    logger.info(
+        f"{label}: wrote {written} documents in {len(chunks)} batches, {result['seconds']}s "
+        f"({result['docs_per_second']} docs/s){f', {failed} failed' if failed else ''}"
+        f"{f' ({len(conflict_groups)} groups already existed)' if conflict_groups else ''}"
+    )
+    return result
@@ -5,11 +5,16 @@ Manages the challenge pool for the SNOP app, replacing the old rotation system
 with a pre-generated pool approach.
 """
 
+import hashlib
 import logging
 import random
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from firebase_admin import firestore
 from firebase_config import db
+from services_pronunciation import with_scoring_fields
+from services_resilience import ResultCache
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -17,6 +22,19 @@ logger = logging.getLogger(__name__)
 # Constants
 ARCHIVE_THRESHOLD = 10  # Archive after this many uses
 COLLECTION_NAME = "challenge_pool"
+# content_hash -> {challenge_id}: lets inserts check for duplicates without scanning the pool
+HASH_INDEX_COLLECTION = "challenge_pool_hashes"
+HASH_LOOKUP_CHUNK = 300  # Document refs per get_all() call
+
+CEFR_LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2"]
+CHALLENGE_TYPES = ["pronunciation", "listening", "fill_blank", "multiple_choice", "irl"]
+POOL_STATUSES = ["available", "archived"]
+STATS_QUERY_WORKERS = 8  # Count queries run in parallel by get_pool_stats
+ARCHIVE_PAGE_SIZE = 500  # Documents per archival sweep query page
+
+# Cached count query results; created lazily so each gunicorn worker gets its own after fork
+_stats_cache = None
+_stats_cache_lock = threading.Lock()
 
 
 def get_challenges_from_pool(cefr_levels, types=None, count=5):
@@ -82,46 +100,147 @@ def get_challenges_from_pool(cefr_levels, types=None, count=5):
         raise
 
 
-def add_to_pool(challenges):
+def content_hash(challenge):
+    """
+    Hash of a challenge's identifying content (type, CEFR level, title and
+    target/sentence/audio text/prompt), ignoring case and whitespace.
+
+    Returns:
+        str - 32-digit hex digest
+    """
+    key_fields = [
+        challenge.get("type", ""),
+        challenge.get("cefr_level", ""),
+        challenge.get("title", ""),
+        challenge.get("target") or challenge.get("sentence") or challenge.get("audio_text") or challenge.get("prompt") or ""
+    ]
+    content = "|".join(" ".join(str(f).casefold().split()) for f in key_fields)
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+
+def find_existing_hashes(hashes):
+    """
+    Which content hashes are already in the pool.
+    Reads only the index documents for these hashes, so cost doesn't grow with the pool.
+
+    Args:
+        hashes: Iterable of content hashes
+
+    Returns:
+        set of hashes that are indexed
+    """
+    hashes = list(dict.fromkeys(hashes))
+    index = db.collection(HASH_INDEX_COLLECTION)
+    existing = set()
+
+    for start in range(0, len(hashes), HASH_LOOKUP_CHUNK):
+        refs = [index.document(h) for h in hashes[start:start + HASH_LOOKUP_CHUNK]]
+        existing.update(snapshot.id for snapshot in db.get_all(refs) if snapshot.exists)
+
+    return existing
+
+
+def dedupe_challenges(challenges):
+    """
+    Drop challenges that are already in the pool or repeated in the list.
+
+    Args:
+        challenges: List of challenge dictionaries
+
+    Returns:
+        Tuple of (new challenges with "content_hash" set, number skipped)
+    """
+    hashed = [{**challenge, "content_hash": content_hash(challenge)} for challenge in challenges]
+    seen = find_existing_hashes(challenge["content_hash"] for challenge in hashed)
+
+    new_challenges = []
+    for challenge in hashed:
+        if challenge["content_hash"] not in seen:
+            seen.add(challenge["content_hash"])
+            new_challenges.append(challenge)
+
+    return new_challenges, len(hashed) - len(new_challenges)
+
+
+def hash_index_write(challenge_hash, challenge_id):
+    """
+    The hash index entry for a pool challenge, as a bulk_set create() write.
+
+    dedupe_challenges() only checks the index before the insert; creating the
+    entry makes a concurrent insert of the same content fail its write group
+    (and so the challenge document with it) instead of adding a duplicate.
+    """
+    from services_bulk_writes import WRITE_CREATE
+
+    return db.collection(HASH_INDEX_COLLECTION).document(challenge_hash), {
+        "challenge_id": challenge_id,
+        "created_at": firestore.SERVER_TIMESTAMP
+    }, WRITE_CREATE
+
+
+def add_to_pool(challenges, dedupe=True, near_duplicates=False):
     """
     Add list of challenges to pool.
+    Pronunciation targets get their normalized text and phonemes
+    precomputed at ingestion. Each challenge is stored with its content_hash
+    and indexed by it (both in the same write batch); if the index entry
+    already exists, neither is written.
 
     Args:
         challenges: List of challenge dictionaries
+        dedupe: Skip challenges whose content is already in the pool
+        near_duplicates: Also skip paraphrases of pool challenges (see
+                         services_near_duplicates.py) and index the added ones
 
     Returns:
         List of added challenge IDs
     """
+    from services_bulk_writes import bulk_set
+
     try:
-        added_ids = []
-        batch = db.batch()
-        batch_count = 0
+        if dedupe:
+            challenges, skipped = dedupe_challenges(challenges)
+            if skipped:
+                logger.info(f"Skipping {skipped} challenges already in pool")
+        else:
+            challenges = [{**challenge, "content_hash": content_hash(challenge)} for challenge in challenges]
+
+        if near_duplicates:
+            from services_near_duplicates import filter_near_duplicates
+            challenges, rejected = filter_near_duplicates(challenges)
+            if rejected:
+                logger.info(f"Skipping {len(rejected)} near-duplicate challenges")
 
+        doc_ids = []
+        groups = []
         for challenge in challenges:
-            # Prepare challenge document
+            # Prepare challenge document (with precomputed scoring fields)
             doc_data = {
-                **challenge,
+                **with_scoring_fields(challenge),
                 "status": "available",
                 "used_count": 0,
                 "created_at": firestore.SERVER_TIMESTAMP,
                 "last_used_at": None
             }
 
-            # Create new document reference
+            # New document, plus its hash index entry
             doc_ref = db.collection(COLLECTION_NAME).document()
-            batch.set(doc_ref, doc_data)
-            added_ids.append(doc_ref.id)
-            batch_count += 1
+            doc_ids.append(doc_ref.id)
+            groups.append([(doc_ref, doc_data), hash_index_write(challenge["content_hash"], doc_ref.id)])
 
-            # Firestore batches are limited to 500 operations
-            if batch_count >= 500:
-                batch.commit()
-                batch = db.batch()
-                batch_count = 0
+        result = bulk_set(groups, label="Add to pool")
+        added_ids = [doc_id for i, doc_id in enumerate(doc_ids) if i not in result["failed_groups"]]
+        if result["conflict_groups"]:
+            logger.info(f"Skipping {len(result['conflict_groups'])} challenges added concurrently by another writer")
+        failed = len(result["failed_groups"]) - len(result["conflict_groups"])
+        if failed:
+            logger.error(f"Failed to add {failed} challenges to pool")
 
-        # Commit remaining
-        if batch_count > 0:
-            batch.commit()
+        invalidate_pool_stats()
+
+        if near_duplicates:
+            from services_near_duplicates import record_challenges
+            record_challenges(added_ids, [c for i, c in enumerate(challenges) if i not in result["failed_groups"]])
 
         logger.info(f"Added {len(added_ids)} challenges to pool")
         return added_ids
@@ -163,6 +282,12 @@ def mark_challenge_used(challenge_id):
             logger.info(f"Challenge {challenge_id} archived after {new_used_count} uses")
 
         doc_ref.update(update_data)
+        if update_data.get("status") == "archived":
+            invalidate_pool_stats()
+
+        # Usage events drive the refill scheduler's drain-rate forecast
+        from services_pool_refill import record_pool_usage
+        record_pool_usage(challenge_data.get("cefr_level"), challenge_data.get("type"))
 
         # Return updated data
         updated_doc = doc_ref.get()
@@ -177,6 +302,66 @@ def mark_challenge_used(challenge_id):
         raise
 
 
+def _get_stats_cache():
+    """Get (or create) this process's cache of pool counts."""
+    global _stats_cache
+    if _stats_cache is None:
+        with _stats_cache_lock:
+            if _stats_cache is None:
+                from config import get_config
+                _stats_cache = ResultCache(max_entries=256, ttl_seconds=get_config().POOL_STATS_CACHE_TTL)
+    return _stats_cache
+
+
+def invalidate_pool_stats():
+    """Drop this process's cached counts (after inserts and status changes)."""
+    if _stats_cache is not None:
+        _stats_cache.clear()
+
+
+def count_pool_challenges(status=None, cefr_level=None, challenge_type=None):
+    """
+    Count pool challenges with an aggregation query (cached for POOL_STATS_CACHE_TTL).
+    An aggregation costs one read per 1000 matching index entries, not one per document.
+
+    Args:
+        status: Optional status to filter by
+        cefr_level: Optional CEFR level to filter by
+        challenge_type: Optional challenge type to filter by
+
+    Returns:
+        Number of matching challenges
+    """
+    cache = _get_stats_cache()
+    key = (status, cefr_level, challenge_type)
+    count = cache.get(key)
+    if count is not None:
+        return count
+
+    query = db.collection(COLLECTION_NAME)
+    for field, value in (("status", status), ("cefr_level", cefr_level), ("type", challenge_type)):
+        if value is not None:
+            query = query.where(field, "==", value)
+
+    count = int(query.count().get()[0][0].value)
+    cache.set(key, count)
+    return count
+
+
+def count_pool_challenges_many(keys):
+    """
+    Run count_pool_challenges for several filters in parallel.
+
+    Args:
+        keys: List of (status, cefr_level, challenge_type) tuples (None = any)
+
+    Returns:
+        Dict mapping each key to its count
+    """
+    with ThreadPoolExecutor(max_workers=STATS_QUERY_WORKERS, thread_name_prefix="pool-stats") as executor:
+        return dict(zip(keys, executor.map(lambda key: count_pool_challenges(*key), keys)))
+
+
 def get_pool_stats(cefr_level=None):
     """
     Get statistics about the challenge pool.
@@ -185,48 +370,22 @@ def get_pool_stats(cefr_level=None):
         cefr_level: Optional CEFR level to filter by
 
     Returns:
-        Dict with counts by status, type, and cefr_level
+        Dict with counts by status, type, and cefr_level (only non-zero types and levels)
     """
     try:
-        query = db.collection(COLLECTION_NAME)
-
-        if cefr_level:
-            query = query.where("cefr_level", "==", cefr_level)
-
-        docs = query.stream()
+        levels = [cefr_level] if cefr_level else CEFR_LEVELS
+        status_keys = [(status, cefr_level, None) for status in POOL_STATUSES]
+        type_keys = [(None, cefr_level, challenge_type) for challenge_type in CHALLENGE_TYPES]
+        level_keys = [(None, level, None) for level in levels]
+        counts = count_pool_challenges_many([(None, cefr_level, None)] + status_keys + type_keys + level_keys)
 
         stats = {
-            "total": 0,
-            "by_status": {
-                "available": 0,
-                "used": 0,
-                "archived": 0
-            },
-            "by_type": {},
-            "by_cefr_level": {}
+            "total": counts[(None, cefr_level, None)],
+            "by_status": {key[0]: counts[key] for key in status_keys},
+            "by_type": {key[2]: counts[key] for key in type_keys if counts[key]},
+            "by_cefr_level": {key[1]: counts[key] for key in level_keys if counts[key]}
         }
 
-        for doc in docs:
-            data = doc.to_dict()
-            stats["total"] += 1
-
-            # Count by status
-            status = data.get("status", "available")
-            if status in stats["by_status"]:
-                stats["by_status"][status] += 1
-
-            # Count by type
-            challenge_type = data.get("type", "unknown")
-            if challenge_type not in stats["by_type"]:
-                stats["by_type"][challenge_type] = 0
-            stats["by_type"][challenge_type] += 1
-
-            # Count by CEFR level
-            level = data.get("cefr_level", "unknown")
-            if level not in stats["by_cefr_level"]:
-                stats["by_cefr_level"][level] = 0
-            stats["by_cefr_level"][level] += 1
-
         logger.info(f"Retrieved pool stats: {stats['total']} total challenges")
         return stats
 
@@ -243,22 +402,9 @@ def get_pool_health():
         Dict with warnings for CEFR levels with < 10 available challenges
     """
     try:
-        # Get all available challenges grouped by CEFR level
-        query = db.collection(COLLECTION_NAME).where("status", "==", "available")
-        docs = query.stream()
-
-        cefr_counts = {}
-        all_cefr_levels = ["A1", "A2", "B1", "B2", "C1", "C2"]
-
-        # Initialize all levels
-        for level in all_cefr_levels:
-            cefr_counts[level] = 0
-
-        for doc in docs:
-            data = doc.to_dict()
-            level = data.get("cefr_level")
-            if level in cefr_counts:
-                cefr_counts[level] += 1
+        keys = [("available", level, None) for level in CEFR_LEVELS]
+        counts = count_pool_challenges_many(keys)
+        cefr_counts = {key[1]: counts[key] for key in keys}
 
         # Check for low pools
         warnings = []
@@ -291,69 +437,92 @@ def get_pool_health():
         raise
 
 
-def archive_old_challenges(days=30):
+def _stale_queries(cutoff):
+    """
+    Queries for available challenges inactive since cutoff, as (range field, query).
+
+    Each needs a composite index:
+        status ASC, last_used_at ASC
+        status ASC, used_count ASC, created_at ASC
+    """
+    available = db.collection(COLLECTION_NAME).where("status", "==", "available")
+    never_used = available.where("used_count", "==", 0)
+    return [
+        ("last_used_at", available.where("last_used_at", "<", cutoff)),
+        ("created_at", never_used.where("created_at", "<", cutoff)),
+        # Seeded challenges store created_at as an ISO string, which a timestamp range never matches
+        ("created_at", never_used.where("created_at", "<", cutoff.isoformat()))
+    ]
+
+
+def _page_refs(query, field, page_size):
+    """Yield document references matching a query, one cursor-paged request at a time."""
+    query = query.order_by(field).select([field]).limit(page_size)
+    last = None
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        for doc in page:
+            yield doc.reference
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+
+def archive_old_challenges(days=30, dry_run=False, page_size=ARCHIVE_PAGE_SIZE):
     """
     Archive challenges not used in X days.
 
+    Only stale challenges are read (indexed range queries on last_used_at, and
+    on created_at for never-used ones), so the cost follows the number archived,
+    not the pool size. Updates are committed in parallel write batches. Archived
+    challenges drop out of the queries, so an interrupted sweep can simply be
+    run again; challenges in failed batches are picked up by the next run.
+
     Args:
         days: Number of days of inactivity before archiving
+        dry_run: Only count the challenges that would be archived
+        page_size: Documents per query page
 
     Returns:
-        Count of archived challenges
+        Count of archived challenges (or, with dry_run, of stale challenges)
     """
-    try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+    from config import get_config
+    from services_bulk_writes import bulk_set, MAX_BATCH_OPS
 
-        # Query for available challenges last used before cutoff
-        query = db.collection(COLLECTION_NAME).where("status", "==", "available")
-        docs = query.stream()
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        flush_size = get_config().BULK_WRITE_WORKERS * MAX_BATCH_OPS
 
+        stale_count = 0
         archived_count = 0
-        batch = db.batch()
-        batch_count = 0
-
-        for doc in docs:
-            data = doc.to_dict()
-            last_used = data.get("last_used_at")
-            created_at = data.get("created_at")
-
-            # Check if challenge should be archived
-            should_archive = False
-
-            if last_used:
-                # Convert Firestore timestamp to datetime if needed
-                if hasattr(last_used, 'timestamp'):
-                    last_used_dt = datetime.fromtimestamp(last_used.timestamp())
-                else:
-                    last_used_dt = last_used
-
-                if last_used_dt < cutoff_date:
-                    should_archive = True
-            elif created_at:
-                # If never used, check created_at
-                if hasattr(created_at, 'timestamp'):
-                    created_dt = datetime.fromtimestamp(created_at.timestamp())
-                else:
-                    created_dt = created_at
-
-                if created_dt < cutoff_date:
-                    should_archive = True
-
-            if should_archive:
-                batch.update(doc.reference, {"status": "archived"})
-                archived_count += 1
-                batch_count += 1
-
-                # Commit batch if reaching limit
-                if batch_count >= 500:
-                    batch.commit()
-                    batch = db.batch()
-                    batch_count = 0
-
-        # Commit remaining
-        if batch_count > 0:
-            batch.commit()
-
+        pending = []
+
+        def flush():
+            nonlocal archived_count
+            result = bulk_set([[(ref, {"status": "archived"})] for ref in pending],
+                              label="Archive challenges", update=True)
+            archived_count += result["written"]
+            pending.clear()
+
+        for field, query in _stale_queries(cutoff):
+            for ref in _page_refs(query, field, page_size):
+                stale_count += 1
+                if dry_run:
+                    continue
+                pending.append(ref)
+                if len(pending) >= flush_size:
+                    flush()
+
+        if dry_run:
+            logger.info(f"Found {stale_count} challenges to archive (inactive > {days} days)")
+            return stale_count
+
+        if pending:
+            flush()
+        invalidate_pool_stats()
+
+        if archived_count < stale_count:
+            logger.error(f"Failed to archive {stale_count - archived_count} challenges (next run retries them)")
         logger.info(f"Archived {archived_count} old challenges (inactive > {days} days)")
         return archived_count
 
@@ -385,6 +554,7 @@ def reset_challenge_status(challenge_id):
             "used_count": 0,
             "last_used_at": None
         })
+        invalidate_pool_stats()
 
         updated_doc = doc_ref.get()
         result = updated_doc.to_dict()
@@ -452,6 +452,8 @@ def get_todays_challenges_for_user(uid):
 
             if not pool_challenges:
                 logger.warning(f"Pool empty for type '{challenge_type}' and levels {available_levels}")
+                from services_pool_refill import notify_pool_empty
+                notify_pool_empty(challenge_type)
 
         except Exception as e:
             logger.error(f"Error fetching from pool for type '{challenge_type}': {e}")
@@ -482,10 +484,7 @@ def generate_challenges_for_user(uid, count=5, challenge_types=None):
     """
     from services_cefr import get_user_cefr_progress
     from services_ai_generation import (
-        generate_pronunciation_challenge,
-        generate_listening_challenge,
-        generate_fill_blank_challenge,
-        generate_multiple_choice_challenge,
+        generate_challenges_concurrently,
         CEFR_TO_DIFFICULTY,
         save_challenges_to_firestore
     )
@@ -513,35 +512,17 @@ def generate_challenges_for_user(uid, count=5, challenge_types=None):
     print(f"Count: {count}")
     print(f"{'='*60}\n")
 
-    # Generate challenges
-    challenges = []
-    for i in range(count):
-        challenge_type = random.choice(challenge_types)
-        topic = None  # Random topic
-
-        print(f"Generating challenge {i+1}/{count}: {challenge_type}, difficulty {difficulty}...")
+    # Generate challenges (several Ollama requests in flight)
+    specs = [
+        {"type": random.choice(challenge_types), "difficulty": difficulty, "topic": None, "frequency": "daily"}
+        for _ in range(count)
+    ]
+    batch = generate_challenges_concurrently(specs)
 
-        try:
-            if challenge_type == "pronunciation":
-                challenge = generate_pronunciation_challenge(difficulty, topic, "daily")
-            elif challenge_type == "listening":
-                challenge = generate_listening_challenge(difficulty, topic, "daily")
-            elif challenge_type == "fill_blank":
-                challenge = generate_fill_blank_challenge(difficulty, topic, "daily")
-            elif challenge_type == "multiple_choice":
-                challenge = generate_multiple_choice_challenge(difficulty, topic, "daily")
-            else:
-                print(f"  ✗ Unknown challenge type: {challenge_type}")
-                continue
-
-            # Add CEFR level to challenge
-            challenge["cefr_level"] = current_level
-            challenges.append(challenge)
-            print(f"  ✓ Generated: {challenge.get('title', 'Unknown')}")
-
-        except Exception as e:
-            print(f"  ✗ Failed to generate challenge {i+1}: {e}")
-            continue
+    # Add CEFR level to challenges
+    challenges = batch["challenges"]
+    for challenge in challenges:
+        challenge["cefr_level"] = current_level
 
     # Save to Firestore
     saved_ids = []
@@ -555,6 +536,7 @@ def generate_challenges_for_user(uid, count=5, challenge_types=None):
     print(f"✓ Successfully generated: {len(challenges)}/{count}")
     print(f"✗ Failed: {count - len(challenges)}")
     print(f"💾 Saved to Firestore: {len(saved_ids)}")
+    print(f"⏱ Rate: {batch['stats']['challenges_per_minute']} challenges/min")
     print(f"{'='*60}\n")
 
     return {
@@ -563,7 +545,8 @@ def generate_challenges_for_user(uid, count=5, challenge_types=None):
         "saved_count": len(saved_ids),
         "challenge_ids": saved_ids,
         "cefr_level": current_level,
-        "difficulty": difficulty
+        "difficulty": difficulty,
+        "challenges_per_minute": batch["stats"]["challenges_per_minute"]
     }
 
 
@@ -631,7 +614,7 @@ def submit_challenge_answer(uid, challenge_id, user_answer, audio_url=None, xp_m
             if use_mock:
                 result = mock_evaluate_pronunciation(target_phrase, difficulty)
             else:
-                result = evaluate_pronunciation(audio_url, target_phrase, difficulty)
+                result = evaluate_pronunciation(audio_url, target_phrase, difficulty, challenge=challenge)
 
             transcription = result.get("transcription")
             similarity = result.get("similarity")
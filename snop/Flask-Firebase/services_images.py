@@ -0,0 +1,157 @@
+# services_images.py
+"""
+Image preprocessing for IRL photo verification.
+Decodes phone photos straight to CLIP's 224x224 input: JPEG draft mode lets
+libjpeg decode at 1/2, 1/4 or 1/8 scale, EXIF orientation is applied, and
+the center crop and normalization are done in NumPy instead of CLIPProcessor.
+"""
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# CLIP ViT-B/32 input (matches CLIPProcessor defaults for openai/clip-vit-base-patch32)
+CLIP_INPUT_SIZE = 224
+CLIP_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+CLIP_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+
+# Normalization folded into one multiply-subtract per channel
+_PIXEL_SCALE = (1.0 / (255.0 * CLIP_STD))[:, np.newaxis, np.newaxis]
+_PIXEL_SHIFT = (CLIP_MEAN / CLIP_STD)[:, np.newaxis, np.newaxis]
+
+
+def bytes_reader(buffer):
+    """
+    File-like reader over an in-memory buffer.
+
+    BytesIO shares the memory of a bytes object instead of copying it, so a
+    memoryview spanning a whole bytes object is read through its owner.
+
+    Args:
+        buffer: bytes | bytearray | memoryview
+
+    Returns:
+        BytesIO
+    """
+    if isinstance(buffer, memoryview) and isinstance(buffer.obj, bytes) and buffer.nbytes == len(buffer.obj):
+        buffer = buffer.obj
+    return BytesIO(buffer)
+
+
+def open_image(source):
+    """
+    Open an image from bytes, a memoryview, a file-like object or a path.
+
+    Args:
+        source: bytes | bytearray | memoryview | file-like | str
+
+    Returns:
+        PIL.Image.Image - Lazily decoded image
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = bytes_reader(source)
+    return Image.open(source)
+
+
+def load_rgb_image(source, min_size=CLIP_INPUT_SIZE):
+    """
+    Decode an image to upright RGB, at the smallest JPEG scale that keeps both
+    sides at least min_size pixels.
+
+    Args:
+        source: Image bytes, file-like object or path (see open_image)
+        min_size: int - Smallest side needed after decoding
+
+    Returns:
+        PIL.Image.Image - RGB image
+    """
+    image = open_image(source)
+
+    # JPEG only: pick a DCT scale factor before decoding (no-op for other formats)
+    image.draft("RGB", (min_size, min_size))
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def resize_shortest_edge(image, size=CLIP_INPUT_SIZE):
+    """Resize so the shorter side equals size (bicubic, as CLIPProcessor does)."""
+    width, height = image.size
+    if width <= height:
+        new_size = (size, max(size, int(size * height / width)))
+    else:
+        new_size = (max(size, int(size * width / height)), size)
+
+    if new_size == image.size:
+        return image
+    return image.resize(new_size, Image.BICUBIC)
+
+
+def center_crop(pixels, size=CLIP_INPUT_SIZE):
+    """
+    Center-crop an HWC array to size x size.
+
+    Args:
+        pixels: np.ndarray - Image as (height, width, channels)
+        size: int - Output side length
+
+    Returns:
+        np.ndarray - View of the cropped region
+    """
+    height, width = pixels.shape[:2]
+    top = (height - size) // 2
+    left = (width - size) // 2
+    return pixels[top:top + size, left:left + size]
+
+
+def preprocess_for_clip(source, size=CLIP_INPUT_SIZE, out=None):
+    """
+    Decode and preprocess an image into CLIP pixel values.
+
+    Args:
+        source: Image bytes, file-like object or path (see open_image)
+        size: int - Model input size
+        out: np.ndarray - Optional preallocated float32 (1, 3, size, size) array
+             to write into (e.g. the NumPy view of a reusable torch tensor)
+
+    Returns:
+        np.ndarray - float32 array of shape (1, 3, size, size), normalized
+    """
+    image = resize_shortest_edge(load_rgb_image(source, size), size)
+    pixels = center_crop(np.asarray(image, dtype=np.uint8), size)
+
+    if out is None:
+        out = np.empty((1, 3, size, size), dtype=np.float32)
+
+    # (x / 255 - mean) / std, written channel-first straight into out
+    chw = pixels.transpose(2, 0, 1)
+    np.multiply(chw, _PIXEL_SCALE, out=out[0])
+    np.subtract(out[0], _PIXEL_SHIFT, out=out[0])
+    return out
+
+
+def dhash(source, hash_size=8):
+    """
+    Difference hash of an image: compares each pixel of a (hash_size + 1) x
+    hash_size grayscale thumbnail with its right neighbour. Re-encoded,
+    resized or lightly edited copies of a photo land within a few bits.
+
+    Args:
+        source: Image bytes, file-like object or path (see open_image)
+        hash_size: int - Hash is hash_size * hash_size bits
+
+    Returns:
+        int - Perceptual hash
+    """
+    image = load_rgb_image(source, min_size=4 * hash_size).convert("L")
+    thumbnail = np.asarray(image.resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
@@ -6,21 +6,57 @@ Handles photo uploads, GPS verification, and challenge completion.
 from firebase_config import db
 from firebase_admin import storage
 from datetime import datetime, timezone
+from services_pipeline import Stage, run_stages, STAGE_OK
 import math
 
 
-def upload_irl_photo(uid, photo_file, challenge_id):
+def decode_photo_base64(photo_base64):
     """
-    Upload IRL challenge proof photo to Firebase Storage.
+    Decode a base64 photo (optionally a data URL) once into an in-memory buffer.
+
+    Args:
+        photo_base64: str - Base64-encoded image data
+
+    Returns:
+        memoryview - Read-only view of the decoded bytes
+    """
+    import base64
+
+    # Remove data URL prefix if present (e.g., "data:image/jpeg;base64,")
+    if "," in photo_base64:
+        photo_base64 = photo_base64.split(",", 1)[1]
+
+    return memoryview(base64.b64decode(photo_base64))
+
+
+def read_photo_file(photo_file):
+    """
+    Read an uploaded photo (Flask FileStorage) once into an in-memory buffer.
+
+    Returns:
+        memoryview - Read-only view of the file contents
+    """
+    return memoryview(photo_file.read())
+
+
+def upload_irl_photo_bytes(uid, photo, challenge_id, content_type="image/jpeg"):
+    """
+    Upload an in-memory IRL proof photo to Firebase Storage as a public object.
+
+    The object is created with a public-read ACL in the upload request itself,
+    so no separate make_public() round trip is needed for the public URL.
 
     Args:
         uid: str - Firebase user ID
-        photo_file: FileStorage - Uploaded photo file (from Flask request.files)
+        photo: memoryview | bytes - Photo contents
         challenge_id: str - Challenge ID for naming
+        content_type: str - MIME type of the photo
 
     Returns:
         str - Public URL of uploaded photo
     """
+    from services_images import bytes_reader
+
     # Get Firebase Storage bucket
     bucket = storage.bucket()
 
@@ -28,54 +64,47 @@ def upload_irl_photo(uid, photo_file, challenge_id):
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     filename = f"user_photos/{uid}/irl_{challenge_id}_{timestamp}.jpg"
 
-    # Create blob and upload
+    # Create blob and upload (publicly readable)
     blob = bucket.blob(filename)
-    blob.upload_from_file(photo_file, content_type=photo_file.content_type)
-
-    # Make the blob publicly accessible
-    blob.make_public()
+    blob.upload_from_file(
+        bytes_reader(photo),
+        size=len(photo),
+        content_type=content_type or "image/jpeg",
+        predefined_acl="publicRead"
+    )
 
     return blob.public_url
 
 
-def upload_irl_photo_base64(uid, photo_base64, challenge_id):
+def upload_irl_photo(uid, photo_file, challenge_id):
     """
-    Upload IRL challenge proof photo from base64 string to Firebase Storage.
-    Alternative method for mobile apps that send base64-encoded images.
+    Upload IRL challenge proof photo to Firebase Storage.
 
     Args:
         uid: str - Firebase user ID
-        photo_base64: str - Base64-encoded image data
+        photo_file: FileStorage - Uploaded photo file (from Flask request.files)
         challenge_id: str - Challenge ID for naming
 
     Returns:
         str - Public URL of uploaded photo
     """
-    import base64
-    from io import BytesIO
-
-    # Decode base64 string
-    # Remove data URL prefix if present (e.g., "data:image/jpeg;base64,")
-    if "," in photo_base64:
-        photo_base64 = photo_base64.split(",")[1]
+    return upload_irl_photo_bytes(uid, read_photo_file(photo_file), challenge_id, photo_file.content_type)
 
-    photo_data = base64.b64decode(photo_base64)
 
-    # Get Firebase Storage bucket
-    bucket = storage.bucket()
-
-    # Generate filename
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    filename = f"user_photos/{uid}/irl_{challenge_id}_{timestamp}.jpg"
-
-    # Create blob and upload
-    blob = bucket.blob(filename)
-    blob.upload_from_file(BytesIO(photo_data), content_type="image/jpeg")
+def upload_irl_photo_base64(uid, photo_base64, challenge_id):
+    """
+    Upload IRL challenge proof photo from base64 string to Firebase Storage.
+    Alternative method for mobile apps that send base64-encoded images.
 
-    # Make the blob publicly accessible
-    blob.make_public()
+    Args:
+        uid: str - Firebase user ID
+        photo_base64: str - Base64-encoded image data
+        challenge_id: str - Challenge ID for naming
 
-    return blob.public_url
+    Returns:
+        str - Public URL of uploaded photo
+    """
+    return upload_irl_photo_bytes(uid, decode_photo_base64(photo_base64), challenge_id)
 
 
 def calculate_distance_km(lat1, lng1, lat2, lng2):
@@ -140,6 +169,120 @@ def verify_gps_location(user_lat, user_lng, challenge_lat, challenge_lng, radius
     }
 
 
+def _evaluate_irl_audio(audio_base64, expected_phrase):
+    """Score a base64 recording against the expected phrase (IRL audio stage)."""
+    from services_pronunciation import evaluate_pronunciation
+    import base64
+    import tempfile
+    import os
+
+    # Decode audio to temp file
+    if "," in audio_base64:
+        audio_base64 = audio_base64.split(",")[1]
+    audio_data = base64.b64decode(audio_base64)
+    temp_audio_path = tempfile.NamedTemporaryFile(delete=False, suffix='.m4a').name
+    try:
+        with open(temp_audio_path, 'wb') as f:
+            f.write(audio_data)
+
+        # Evaluate pronunciation
+        pronunciation_result = evaluate_pronunciation(temp_audio_path, expected_phrase)
+    finally:
+        # Clean up temp audio file
+        if os.path.exists(temp_audio_path):
+            os.remove(temp_audio_path)
+
+    return {
+        "transcription": pronunciation_result.get("transcription", ""),
+        "similarity": pronunciation_result.get("similarity", 0),
+        "xp_gained": pronunciation_result.get("xp_gained", 0),
+        "feedback": pronunciation_result.get("feedback", ""),
+        "pass": pronunciation_result.get("pass", False)
+    }
+
+
+def _build_irl_stages(uid, challenge, challenge_id, photo_url, photo_base64, photo_file,
+                      text_description, skip_ai, audio_base64, expected_phrase):
+    """
+    Build the IRL verification stage graph:
+
+        photo_buffer -> upload
+                     -> photo_hash -> photo (CLIP, skipped on a hash match)
+        audio (Whisper)
+        text (Ollama)
+
+    The photo is decoded once; upload, hashing and CLIP all read the same buffer.
+    Fallbacks match the sequential pipeline: audio errors are reported in the
+    result, text analysis falls back to the heuristic check, and a failed or
+    timed-out photo check counts as "AI verification unavailable".
+
+    Returns:
+        list of Stage
+    """
+    from config import get_config
+
+    cfg = get_config()
+    topic = challenge.get('topic', 'general')
+    cefr_level = challenge.get('cefr_level', 'A1')
+
+    def ingest_photo():
+        if photo_file:
+            return read_photo_file(photo_file)
+        if photo_base64:
+            return decode_photo_base64(photo_base64)
+        return None
+
+    def upload(photo):
+        if photo is None:
+            return photo_url
+        content_type = photo_file.content_type if photo_file else "image/jpeg"
+        return upload_irl_photo_bytes(uid, photo, challenge_id, content_type)
+
+    stages = [
+        Stage("photo_buffer", ingest_photo),
+        Stage("upload", upload, deps=("photo_buffer",), timeout=cfg.IRL_UPLOAD_TIMEOUT)
+    ]
+
+    if audio_base64 and expected_phrase:
+        stages.append(Stage(
+            "audio",
+            lambda: _evaluate_irl_audio(audio_base64, expected_phrase),
+            timeout=cfg.IRL_AUDIO_TIMEOUT,
+            fallback=lambda e: {"error": str(e), "feedback": "Audio processing failed"}
+        ))
+
+    if skip_ai:
+        return stages
+
+    from services_irl_verification import analyze_norwegian_text, _basic_text_analysis
+    from services_photo_hash import compute_photo_hash, verify_photo_cached
+
+    if photo_file or photo_base64:
+        stages.append(Stage(
+            "photo_hash",
+            compute_photo_hash,
+            deps=("photo_buffer",),
+            fallback=lambda e: None
+        ))
+        stages.append(Stage(
+            "photo",
+            lambda photo, photo_hash: verify_photo_cached(uid, challenge_id, topic, photo, photo_hash),
+            deps=("photo_buffer", "photo_hash"),
+            timeout=cfg.IRL_PHOTO_TIMEOUT,
+            fallback=lambda e: None
+        ))
+
+    if text_description and text_description.strip():
+        stages.append(Stage(
+            "text",
+            lambda: analyze_norwegian_text(text_description, cefr_level, topic),
+            timeout=cfg.IRL_TEXT_TIMEOUT,
+            fallback=lambda e: _basic_text_analysis(text_description, cefr_level, topic)
+        ))
+
+    return stages
+
+
 def verify_irl_challenge(uid, challenge_id, photo_url=None, photo_base64=None, photo_file=None,
                          gps_lat=None, gps_lng=None, text_description=None, skip_ai=False,
                          audio_base64=None, expected_phrase=None):
@@ -163,8 +306,6 @@ def verify_irl_challenge(uid, challenge_id, photo_url=None, photo_base64=None, p
         dict - Verification result with tier, xp_multiplier, feedback, etc.
     """
     from services_challenges import get_challenge_by_id
-    import tempfile
-    import os
 
     # Fetch challenge data
     challenge = get_challenge_by_id(challenge_id)
@@ -185,116 +326,72 @@ def verify_irl_challenge(uid, challenge_id, photo_url=None, photo_base64=None, p
         "feedback_no": "Utfordring markert som fullført"
     }
 
-    # Upload photo if provided
-    uploaded_photo_url = photo_url
-    temp_photo_path = None
-
-    if photo_file:
-        # Save to temp file for AI verification
-        temp_photo_path = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg').name
-        photo_file.save(temp_photo_path)
-        photo_file.seek(0)  # Reset file pointer for upload
-
-        uploaded_photo_url = upload_irl_photo(uid, photo_file, challenge_id)
-    elif photo_base64:
-        uploaded_photo_url = upload_irl_photo_base64(uid, photo_base64, challenge_id)
-
-        # Decode base64 to temp file for AI verification
-        import base64
-        if "," in photo_base64:
-            photo_base64 = photo_base64.split(",")[1]
-        photo_data = base64.b64decode(photo_base64)
-        temp_photo_path = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg').name
-        with open(temp_photo_path, 'wb') as f:
-            f.write(photo_data)
-
-    result["photo_url"] = uploaded_photo_url
+    # If no photo and no text and no audio, return bronze tier
+    if not (photo_url or photo_file or photo_base64) and not text_description and not audio_base64:
+        result["feedback"] = "Challenge marked as complete (no verification)"
+        return result
 
-    # Process audio for pronunciation scoring
-    if audio_base64 and expected_phrase:
-        try:
-            from services_pronunciation import evaluate_pronunciation
-            import base64
-
-            # Decode audio to temp file
-            if "," in audio_base64:
-                audio_base64 = audio_base64.split(",")[1]
-            audio_data = base64.b64decode(audio_base64)
-            temp_audio_path = tempfile.NamedTemporaryFile(delete=False, suffix='.m4a').name
-            with open(temp_audio_path, 'wb') as f:
-                f.write(audio_data)
-
-            # Evaluate pronunciation
-            pronunciation_result = evaluate_pronunciation(temp_audio_path, expected_phrase)
-
-            result["pronunciation"] = {
-                "transcription": pronunciation_result.get("transcription", ""),
-                "similarity": pronunciation_result.get("similarity", 0),
-                "xp_gained": pronunciation_result.get("xp_gained", 0),
-                "feedback": pronunciation_result.get("feedback", ""),
-                "pass": pronunciation_result.get("pass", False)
-            }
+    # Independent stages run concurrently; the request takes as long as the slowest one
+    stages = _build_irl_stages(
+        uid, challenge, challenge_id, photo_url, photo_base64, photo_file,
+        text_description, skip_ai, audio_base64, expected_phrase
+    )
+    stage_results = run_stages(stages)
 
-            # Clean up temp audio file
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
+    uploaded_photo_url = stage_results["upload"]["value"]
+    result["photo_url"] = uploaded_photo_url
 
+    # Pronunciation scoring
+    if "audio" in stage_results:
+        result["pronunciation"] = stage_results["audio"]["value"]
+        if stage_results["audio"]["status"] == STAGE_OK:
             # Audio submitted = at least bronze tier
             result["ai_verified"] = True
 
-        except Exception as e:
-            print(f"Audio processing error: {e}")
-            result["pronunciation"] = {
-                "error": str(e),
-                "feedback": "Audio processing failed"
+    # AI Verification (unless skipped)
+    if not skip_ai:
+        from services_irl_verification import combine_verification_results
+
+        photo_stage = stage_results.get("photo")
+        text_stage = stage_results.get("text")
+        ai_result = combine_verification_results(
+            photo_result=photo_stage["value"] if photo_stage else None,
+            text_result=text_stage["value"] if text_stage else None
+        )
+
+        result["tier"] = ai_result["tier"]
+        result["xp_multiplier"] = ai_result["xp_multiplier"]
+        result["ai_verified"] = ai_result["ai_verified"]
+        result["feedback"] = ai_result["feedback"]
+
+        # Add detailed results
+        if ai_result.get("photo_result"):
+            result["photo_verification"] = {
+                "verified": ai_result["photo_result"]["verified"],
+                "confidence": ai_result["photo_result"]["confidence"],
+                "message": ai_result["photo_result"]["message"],
+                "cached": ai_result["photo_result"].get("cached", False)
             }
 
-    # If no photo and no text and no audio, return bronze tier
-    if not uploaded_photo_url and not text_description and not audio_base64:
-        result["feedback"] = "Challenge marked as complete (no verification)"
-        return result
+            # Same (or near-identical) photo already submitted for another challenge or by another user
+            if ai_result["photo_result"].get("reuse"):
+                result["photo_reuse"] = ai_result["photo_result"]["reuse"]
+
+        if ai_result.get("text_result"):
+            result["text_verification"] = {
+                "verified": ai_result["text_result"]["verified"],
+                "score": ai_result["text_result"]["score"],
+                "word_count": ai_result["text_result"]["word_count"],
+                "feedback_no": ai_result["text_result"].get("feedback_no", ""),
+                "suggestions": ai_result["text_result"].get("suggestions", [])
+            }
+            result["feedback_no"] = ai_result["text_result"].get("feedback_no", result["feedback_no"])
 
-    # AI Verification (unless skipped)
-    if not skip_ai:
-        try:
-            from services_irl_verification import verify_irl_submission, calculate_irl_xp
-
-            ai_result = verify_irl_submission(
-                challenge=challenge,
-                photo_path=temp_photo_path,
-                text_response=text_description
-            )
-
-            result["tier"] = ai_result["tier"]
-            result["xp_multiplier"] = ai_result["xp_multiplier"]
-            result["ai_verified"] = ai_result["ai_verified"]
-            result["feedback"] = ai_result["feedback"]
-
-            # Add detailed results
-            if ai_result.get("photo_result"):
-                result["photo_verification"] = {
-                    "verified": ai_result["photo_result"]["verified"],
-                    "confidence": ai_result["photo_result"]["confidence"],
-                    "message": ai_result["photo_result"]["message"]
-                }
-
-            if ai_result.get("text_result"):
-                result["text_verification"] = {
-                    "verified": ai_result["text_result"]["verified"],
-                    "score": ai_result["text_result"]["score"],
-                    "word_count": ai_result["text_result"]["word_count"],
-                    "feedback_no": ai_result["text_result"].get("feedback_no", ""),
-                    "suggestions": ai_result["text_result"].get("suggestions", [])
-                }
-                result["feedback_no"] = ai_result["text_result"].get("feedback_no", result["feedback_no"])
-
-        except Exception as e:
-            # If AI verification fails, fall back to basic verification
-            print(f"AI verification failed: {e}")
-            if uploaded_photo_url:
-                result["tier"] = "silver"
-                result["xp_multiplier"] = 0.5
-                result["feedback"] = "Photo uploaded (AI verification unavailable)"
+        # If photo verification failed or timed out, fall back to basic verification
+        if photo_stage and photo_stage["status"] != STAGE_OK and result["tier"] == "bronze":
+            result["tier"] = "silver"
+            result["xp_multiplier"] = 0.5
+            result["feedback"] = "Photo uploaded (AI verification unavailable)"
     else:
         # Skip AI - just check what was submitted
         if uploaded_photo_url and text_description:
@@ -306,10 +403,6 @@ def verify_irl_challenge(uid, challenge_id, photo_url=None, photo_base64=None, p
             result["xp_multiplier"] = 0.5
             result["feedback"] = "Photo submitted"
 
-    # Clean up temp file
-    if temp_photo_path and os.path.exists(temp_photo_path):
-        os.remove(temp_photo_path)
-
     # Verify GPS if provided (bonus, doesn't affect tier)
     gps_result = None
     if gps_lat is not None and gps_lng is not None:
@@ -333,6 +426,9 @@ def verify_irl_challenge(uid, challenge_id, photo_url=None, photo_base64=None, p
     if text_description:
         result["verification_data"]["text_description"] = text_description
 
+    if result.get("photo_reuse"):
+        result["verification_data"]["photo_reuse"] = result["photo_reuse"]
+
     if gps_result:
         result["verification_data"]["gps_location"] = {
             "lat": gps_lat,
@@ -4,16 +4,38 @@ IRL Challenge verification service using local AI models.
 - CLIP for photo verification
 - Llama 3.2 (via Ollama) for Norwegian text analysis
 """
-import json
 import os
 import logging
-from PIL import Image
+import threading
+import time
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+
+# Keywords used when a challenge topic has no entry in VERIFICATION_KEYWORDS
+DEFAULT_KEYWORDS = ["photo", "image", "picture"]
+
+# Minimum softmax confidence of the best keyword for a photo to count as verified
+PHOTO_VERIFY_THRESHOLD = 0.20
+
 # Lazy load CLIP model to avoid startup delay
 _clip_model = None
 _clip_processor = None
+_clip_lock = threading.Lock()
+
+# Normalized CLIP text embeddings per topic, computed once with the model
+_topic_embeddings = None
+
+# Ollama text analysis: result cache and circuit breaker (created lazily from config)
+_text_analysis_cache = None
+_ollama_breaker = None
+_guards_lock = threading.Lock()
+_text_analysis_stats = {"llm_calls": 0, "fallbacks": 0, "resolved_locally": 0, "escalated": 0}
+
+# Per-thread preallocated CLIP input tensor (request and job threads share the model)
+_input_buffers = threading.local()
 
 # Verification keywords for each topic
 VERIFICATION_KEYWORDS = {
@@ -58,31 +80,213 @@ WORD_COUNT_REQUIREMENTS = {
     "C2": 45
 }
 
+# Output format for Llama's text analysis (Ollama structured output)
+TEXT_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_norwegian": {"type": "boolean"},
+        "grammar_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "vocabulary_appropriate": {"type": "boolean"},
+        "topic_relevant": {"type": "boolean"},
+        "feedback_no": {"type": "string"},
+        "feedback_en": {"type": "string"},
+        "suggestions": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["is_norwegian", "grammar_score", "vocabulary_appropriate", "topic_relevant",
+                 "feedback_no", "feedback_en", "suggestions"]
+}
+
+
+def get_clip_settings():
+    """
+    Read CLIP runtime settings from the active configuration.
+
+    Returns:
+        dict with keys: quantize_int8
+    """
+    from config import get_config
+
+    return {"quantize_int8": get_config().CLIP_QUANTIZE_INT8}
+
+
+def load_clip_backend(quantize_int8=False):
+    """
+    Load the CLIP model and processor for CPU inference. The torch thread count
+    is set separately (see services_warmup.apply_torch_thread_budget).
+
+    Args:
+        quantize_int8: bool - Dynamically quantize the linear layers of the vision
+                       encoder and its projection to int8 (the text tower is only
+                       used once, at load)
+
+    Returns:
+        tuple: (CLIPModel, CLIPProcessor)
+    """
+    import torch
+    from transformers import CLIPProcessor, CLIPModel
+
+    model = CLIPModel.from_pretrained(CLIP_MODEL_NAME)
+    model.eval()
+    if quantize_int8:
+        # Quantize by submodule name on the parent: quantize_dynamic only swaps
+        # children, so passing the bare visual_projection Linear would be a no-op
+        qconfig = torch.quantization.default_dynamic_qconfig
+        torch.quantization.quantize_dynamic(
+            model,
+            {"vision_model": qconfig, "visual_projection": qconfig},
+            dtype=torch.qint8,
+            inplace=True
+        )
+
+    processor = CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+    return model, processor
+
 
 def _load_clip_model():
-    """Lazy load CLIP model."""
-    global _clip_model, _clip_processor
+    """Lazy load CLIP model and its topic text embeddings."""
+    global _clip_model, _clip_processor, _topic_embeddings
 
     if _clip_model is None:
+        with _clip_lock:
+            # Another thread may have finished loading while we waited
+            if _clip_model is None:
+                try:
+                    from services_warmup import apply_torch_thread_budget
+
+                    settings = get_clip_settings()
+                    threads = apply_torch_thread_budget()
+                    logger.info(f"Loading CLIP model (int8={settings['quantize_int8']}, "
+                                f"threads={threads}, first time may take a while)...")
+                    model, processor = load_clip_backend(**settings)
+                    _topic_embeddings = _load_topic_embeddings(model, processor)
+                    _clip_model, _clip_processor = model, processor
+                    logger.info("CLIP model loaded successfully")
+                except Exception as e:
+                    logger.error(f"Failed to load CLIP model: {e}")
+                    raise
+
+    return _clip_model, _clip_processor
+
+
+def _keyword_index():
+    """Flat (topic, keyword) list covering every topic plus the default."""
+    topics = {**VERIFICATION_KEYWORDS, None: DEFAULT_KEYWORDS}
+    return [(topic, keyword) for topic, keywords in topics.items() for keyword in keywords]
+
+
+def _cache_labels(index):
+    return np.array([f"{CLIP_MODEL_NAME}|{topic or ''}|{keyword}" for topic, keyword in index])
+
+
+def _split_by_topic(index, embeddings):
+    """Split the flat embedding matrix into one (keywords, embeddings) pair per topic."""
+    import torch
+
+    matrix = torch.from_numpy(np.ascontiguousarray(embeddings, dtype=np.float32))
+    rows = {}
+    for i, (topic, _) in enumerate(index):
+        rows.setdefault(topic, []).append(i)
+
+    return {
+        topic: ([index[i][1] for i in ids], matrix[ids[0]:ids[-1] + 1])
+        for topic, ids in rows.items()
+    }
+
+
+def _load_topic_embeddings(model, processor):
+    """
+    Encode every verification keyword once with the CLIP text tower.
+
+    Embeddings are L2-normalized, so scoring a photo is a single matrix
+    multiply against the image embedding. If CLIP_EMBEDDINGS_CACHE is set,
+    the matrix is read from / written to that .npz file; a cache built for
+    a different model or keyword list is ignored and rebuilt.
+
+    Returns:
+        dict: topic (None for the default) -> (keywords, [K, D] tensor)
+    """
+    import torch
+    from config import get_config
+
+    index = _keyword_index()
+    labels = _cache_labels(index)
+    cache_path = get_config().CLIP_EMBEDDINGS_CACHE
+
+    if cache_path and os.path.exists(cache_path):
         try:
-            from transformers import CLIPProcessor, CLIPModel
-            logger.info("Loading CLIP model (first time may take a while)...")
-            _clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-            _clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-            logger.info("CLIP model loaded successfully")
+            with np.load(cache_path) as cached:
+                if np.array_equal(cached["labels"], labels):
+                    logger.info(f"Loaded CLIP topic embeddings from {cache_path}")
+                    return _split_by_topic(index, cached["embeddings"])
+            logger.info("CLIP embeddings cache is outdated, recomputing")
         except Exception as e:
-            logger.error(f"Failed to load CLIP model: {e}")
-            raise
+            logger.warning(f"Could not read CLIP embeddings cache {cache_path}: {e}")
 
-    return _clip_model, _clip_processor
+    inputs = processor(text=[keyword for _, keyword in index], return_tensors="pt", padding=True)
+    with torch.inference_mode():
+        text_features = model.get_text_features(**inputs)
+    text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+    embeddings = text_features.cpu().numpy().astype(np.float32)
+
+    if cache_path:
+        try:
+            np.savez(cache_path, labels=labels, embeddings=embeddings)
+            logger.info(f"Saved CLIP topic embeddings to {cache_path}")
+        except OSError as e:
+            logger.warning(f"Could not write CLIP embeddings cache {cache_path}: {e}")
+
+    logger.info(f"Encoded {len(index)} CLIP keywords for {len(VERIFICATION_KEYWORDS)} topics")
+    return _split_by_topic(index, embeddings)
 
 
-def verify_photo(image_path, topic):
+def _input_buffer():
+    """This thread's reusable (1, 3, 224, 224) input tensor."""
+    import torch
+    from services_images import CLIP_INPUT_SIZE
+
+    buffer = getattr(_input_buffers, "pixel_values", None)
+    if buffer is None:
+        buffer = torch.empty((1, 3, CLIP_INPUT_SIZE, CLIP_INPUT_SIZE), dtype=torch.float32)
+        _input_buffers.pixel_values = buffer
+    return buffer
+
+
+def clip_topic_probs(model, text_embeddings, image):
+    """
+    Score a photo against precomputed keyword embeddings.
+
+    Args:
+        model: CLIPModel - Loaded model (fp32 or int8 vision encoder)
+        text_embeddings: torch.Tensor - [K, D] normalized keyword embeddings
+        image: Photo as bytes, memoryview, file-like object or file path
+
+    Returns:
+        torch.Tensor - [1, K] softmax over keywords
+    """
+    import torch
+    from services_images import preprocess_for_clip
+
+    # Reduced-scale decode + NumPy crop/normalize, written into the reusable tensor
+    pixel_values = _input_buffer()
+    preprocess_for_clip(image, out=pixel_values.numpy())
+
+    # Image embedding vs. cached text embeddings (same scaling as CLIP's logits_per_image)
+    with torch.inference_mode():
+        image_features = model.get_image_features(pixel_values=pixel_values)
+        image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+        logits = model.logit_scale.exp() * image_features @ text_embeddings.T
+        return logits.softmax(dim=1)
+
+
+def verify_photo(image, topic):
     """
     Verify if a photo matches the expected topic using CLIP.
 
+    Only the vision encoder runs per photo; the topic keywords were encoded
+    once at model load (see _load_topic_embeddings).
+
     Args:
-        image_path: Path to the uploaded image file
+        image: Photo as bytes, memoryview, file-like object or file path
         topic: Challenge topic (e.g., "cafe", "transport")
 
     Returns:
@@ -94,37 +298,20 @@ def verify_photo(image_path, topic):
         }
     """
     try:
-        model, processor = _load_clip_model()
-
-        # Get keywords for topic
-        keywords = VERIFICATION_KEYWORDS.get(topic, ["photo", "image", "picture"])
+        model, _ = _load_clip_model()
 
-        # Load and process image
-        image = Image.open(image_path)
+        # Get precomputed keyword embeddings for topic
+        keywords, text_embeddings = _topic_embeddings.get(topic, _topic_embeddings[None])
 
-        # Convert to RGB if necessary (CLIP requires RGB)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-
-        # Process image and text descriptions
-        inputs = processor(
-            text=keywords,
-            images=image,
-            return_tensors="pt",
-            padding=True
-        )
-
-        # Get similarity scores
-        outputs = model(**inputs)
-        probs = outputs.logits_per_image.softmax(dim=1)
+        probs = clip_topic_probs(model, text_embeddings, image)
 
         # Find best match
         best_idx = probs.argmax().item()
         confidence = float(probs[0][best_idx].item())
         best_match = keywords[best_idx]
 
-        # Threshold for verification (0.25 is reasonable for CLIP)
-        verified = confidence > 0.20
+        # Threshold for verification
+        verified = confidence > PHOTO_VERIFY_THRESHOLD
 
         if verified:
             message = f"Photo verified as relevant to '{topic}'"
@@ -148,10 +335,75 @@ def verify_photo(image_path, topic):
         }
 
 
+def _get_text_analysis_guards():
+    """Get (or create) the text analysis result cache and Ollama circuit breaker."""
+    global _text_analysis_cache, _ollama_breaker
+
+    if _ollama_breaker is None:
+        with _guards_lock:
+            if _ollama_breaker is None:
+                from config import get_config
+                from services_resilience import ResultCache, CircuitBreaker
+
+                cfg = get_config()
+                _text_analysis_cache = ResultCache(
+                    max_entries=cfg.TEXT_ANALYSIS_CACHE_SIZE,
+                    ttl_seconds=cfg.TEXT_ANALYSIS_CACHE_TTL
+                )
+                _ollama_breaker = CircuitBreaker(
+                    "ollama_text_analysis",
+                    failure_threshold=cfg.OLLAMA_BREAKER_THRESHOLD,
+                    reset_seconds=cfg.OLLAMA_BREAKER_RESET_SECONDS,
+                    slow_call_seconds=cfg.OLLAMA_SLOW_CALL_SECONDS
+                )
+
+    return _text_analysis_cache, _ollama_breaker
+
+
+def _text_cache_key(text, cefr_level, topic):
+    """Texts differing only in case or whitespace share a cached analysis."""
+    return (" ".join(text.casefold().split()), cefr_level, topic)
+
+
+def _count(stat):
+    with _guards_lock:
+        _text_analysis_stats[stat] += 1
+
+
+def get_text_analysis_metrics():
+    """
+    Text analysis cache and circuit breaker metrics for this process.
+
+    Returns:
+        dict: {
+            cache: {size, hits, misses, hit_rate},
+            breaker: {name, state, consecutive_failures, trips, rejected},
+            llm_calls: int,
+            fallbacks: int,
+            resolved_locally: int - Texts decided by the local screening cascade
+            escalated: int - Texts the cascade sent on to the LLM
+            local_share: float - resolved_locally / screened texts
+        }
+    """
+    cache, breaker = _get_text_analysis_guards()
+    with _guards_lock:
+        stats = dict(_text_analysis_stats)
+
+    screened = stats["resolved_locally"] + stats["escalated"]
+    stats["local_share"] = round(stats["resolved_locally"] / screened, 3) if screened else None
+    return {"cache": cache.stats(), "breaker": breaker.stats(), **stats}
+
+
 def analyze_norwegian_text(text, cefr_level, topic):
     """
     Analyze Norwegian text quality using Llama 3.2 via Ollama.
 
+    Texts are first screened locally (language ID, length, topic words; see
+    services_text_screening); clear passes and failures are answered without
+    the LLM. Results are cached per (normalized text, CEFR level, topic).
+    While the Ollama circuit breaker is open (repeated slow or failed calls),
+    the heuristic _basic_text_analysis() is returned without calling Ollama.
+
     Args:
         text: User's Norwegian text response
         cefr_level: Expected CEFR level (A1-C2)
@@ -167,13 +419,106 @@ def analyze_norwegian_text(text, cefr_level, topic):
             word_count: int
         }
     """
+    from config import get_config
+
+    cfg = get_config()
+    if cfg.TEXT_CASCADE_ENABLED:
+        local_result = _screen_locally(text, cefr_level, topic, cfg)
+        if local_result is not None:
+            return local_result
+
+    cache, breaker = _get_text_analysis_guards()
+    key = _text_cache_key(text, cefr_level, topic)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    if not breaker.allow_request():
+        _count("fallbacks")
+        return _basic_text_analysis(text, cefr_level, topic)
+
+    _count("llm_calls")
+    start = time.monotonic()
     try:
-        import ollama
+        result = _analyze_with_llm(text, cefr_level, topic)
+    except ValueError as e:
+        # Ollama answered, so the service is healthy; only this response was unusable
+        breaker.record_success(time.monotonic() - start)
+        logger.error(f"Failed to parse Llama response: {e}")
+        _count("fallbacks")
+        return _basic_text_analysis(text, cefr_level, topic)
+    except Exception as e:
+        breaker.record_failure()
+        logger.error(f"Text analysis error: {e}")
+        _count("fallbacks")
+        return _basic_text_analysis(text, cefr_level, topic)
 
-        word_count = len(text.split())
-        required_words = WORD_COUNT_REQUIREMENTS.get(cefr_level, 10)
+    breaker.record_success(time.monotonic() - start)
+    cache.set(key, result)
+    return dict(result)
 
-        prompt = f"""Analyze this Norwegian text from a {cefr_level} language learner.
+
+def _screen_locally(text, cefr_level, topic, cfg):
+    """
+    Decide clear cases without the LLM.
+
+    Returns:
+        dict - Result in analyze_norwegian_text() shape, or None if the text
+               is borderline and should go to the LLM
+    """
+    from services_text_screening import screen_text, DECISION_ACCEPT, DECISION_UNCERTAIN
+
+    required_words = WORD_COUNT_REQUIREMENTS.get(cefr_level, 10)
+    screening = screen_text(
+        text, required_words, topic,
+        reject_below=cfg.TEXT_CASCADE_REJECT_BELOW,
+        accept_from=cfg.TEXT_CASCADE_ACCEPT_FROM
+    )
+
+    if screening["decision"] == DECISION_UNCERTAIN:
+        _count("escalated")
+        return None
+    _count("resolved_locally")
+
+    is_norwegian = screening["norwegian_probability"] >= 0.5
+    verified = screening["decision"] == DECISION_ACCEPT
+
+    if verified:
+        feedback_no = "Bra jobbet! Teksten er på norsk og passer til oppgaven."
+        feedback_en = "Well done! Your text is in Norwegian and fits the task."
+        suggestions = []
+    elif not is_norwegian:
+        feedback_no = "Prøv å skrive teksten på norsk."
+        feedback_en = "Try writing your text in Norwegian."
+        suggestions = ["Write your answer in Norwegian"]
+    else:
+        feedback_no = f"Prøv å skrive minst {required_words} ord."
+        feedback_en = f"Try writing at least {required_words} words."
+        suggestions = [f"Write at least {required_words} words"]
+
+    return {
+        "verified": verified,
+        "score": screening["local_score"],
+        "is_norwegian": is_norwegian,
+        "grammar_score": 50,  # Unknown (not graded by the LLM)
+        "vocabulary_appropriate": True,
+        "topic_relevant": screening["topic_overlap"] > 0,
+        "word_count": screening["word_count"],
+        "required_words": required_words,
+        "feedback_no": feedback_no,
+        "feedback_en": feedback_en,
+        "suggestions": suggestions,
+        "screening": screening
+    }
+
+
+def _analyze_with_llm(text, cefr_level, topic):
+    """Ask Llama 3.2 to grade the text and turn its JSON answer into a score."""
+    word_count = len(text.split())
+    required_words = WORD_COUNT_REQUIREMENTS.get(cefr_level, 10)
+
+    prompt = f"""Analyze this Norwegian text from a {cefr_level} language learner.
 
 Text: "{text}"
 Expected topic: {topic}
@@ -199,88 +544,68 @@ Scoring guide:
 
 Be encouraging but honest. This is for learning."""
 
-        response = ollama.chat(
-            model='llama3.2',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': 'You are a Norwegian language teacher. Analyze student text and output only valid JSON. Be encouraging but accurate.'
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            options={'temperature': 0.2}
-        )
-
-        # Parse response
-        content = response['message']['content'].strip()
-
-        # Clean JSON
-        if content.startswith('```'):
-            content = content.split('```')[1]
-            if content.startswith('json'):
-                content = content[4:]
-        content = content.strip()
-
-        # Extract JSON
-        first_brace = content.find('{')
-        last_brace = content.rfind('}')
-        if first_brace != -1 and last_brace != -1:
-            content = content[first_brace:last_brace + 1]
-
-        result = json.loads(content)
-
-        # Calculate overall score
-        score = 0
-
-        # Word count check (20 points)
-        if word_count >= required_words:
-            score += 20
-        elif word_count >= required_words * 0.5:
-            score += 10
+    from services_ollama import chat_json
+
+    # The circuit breaker handles failures, so no retries here
+    result = chat_json(
+        messages=[
+            {
+                'role': 'system',
+                'content': 'You are a Norwegian language teacher. Analyze student text and output only valid JSON. Be encouraging but accurate.'
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ],
+        schema=TEXT_ANALYSIS_SCHEMA,
+        purpose="text_analysis",
+        options={'temperature': 0.2},
+        retries=0,
+        interactive=True
+    )
+
+    # Calculate overall score
+    score = 0
 
-        # Is Norwegian (20 points)
-        if result.get('is_norwegian', False):
-            score += 20
+    # Word count check (20 points)
+    if word_count >= required_words:
+        score += 20
+    elif word_count >= required_words * 0.5:
+        score += 10
 
-        # Grammar (30 points)
-        grammar = result.get('grammar_score', 0)
-        score += int(grammar * 0.3)
+    # Is Norwegian (20 points)
+    if result.get('is_norwegian', False):
+        score += 20
 
-        # Vocabulary (15 points)
-        if result.get('vocabulary_appropriate', False):
-            score += 15
+    # Grammar (30 points)
+    grammar = result.get('grammar_score', 0)
+    score += int(grammar * 0.3)
 
-        # Topic relevance (15 points)
-        if result.get('topic_relevant', False):
-            score += 15
+    # Vocabulary (15 points)
+    if result.get('vocabulary_appropriate', False):
+        score += 15
 
-        # Determine if verified (60+ is passing)
-        verified = score >= 60
+    # Topic relevance (15 points)
+    if result.get('topic_relevant', False):
+        score += 15
 
-        return {
-            "verified": verified,
-            "score": score,
-            "is_norwegian": result.get('is_norwegian', False),
-            "grammar_score": result.get('grammar_score', 0),
-            "vocabulary_appropriate": result.get('vocabulary_appropriate', False),
-            "topic_relevant": result.get('topic_relevant', False),
-            "word_count": word_count,
-            "required_words": required_words,
-            "feedback_no": result.get('feedback_no', ''),
-            "feedback_en": result.get('feedback_en', ''),
-            "suggestions": result.get('suggestions', [])
-        }
+    # Determine if verified (60+ is passing)
+    verified = score >= 60
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse Llama response: {e}")
-        # Fallback to basic analysis
-        return _basic_text_analysis(text, cefr_level, topic)
-    except Exception as e:
-        logger.error(f"Text analysis error: {e}")
-        return _basic_text_analysis(text, cefr_level, topic)
+    return {
+        "verified": verified,
+        "score": score,
+        "is_norwegian": result.get('is_norwegian', False),
+        "grammar_score": result.get('grammar_score', 0),
+        "vocabulary_appropriate": result.get('vocabulary_appropriate', False),
+        "topic_relevant": result.get('topic_relevant', False),
+        "word_count": word_count,
+        "required_words": required_words,
+        "feedback_no": result.get('feedback_no', ''),
+        "feedback_en": result.get('feedback_en', ''),
+        "suggestions": result.get('suggestions', [])
+    }
 
 
 def _basic_text_analysis(text, cefr_level, topic):
@@ -317,13 +642,14 @@ def _basic_text_analysis(text, cefr_level, topic):
     }
 
 
-def verify_irl_submission(challenge, photo_path=None, text_response=None):
+def verify_irl_submission(challenge, photo_path=None, text_response=None, photo_bytes=None):
     """
     Complete verification of an IRL challenge submission.
 
     Args:
         challenge: Challenge dict with topic, cefr_level, etc.
         photo_path: Path to uploaded photo (optional)
+        photo_bytes: Photo contents already in memory (optional, used instead of photo_path)
         text_response: User's Norwegian text (optional)
 
     Returns:
@@ -339,31 +665,48 @@ def verify_irl_submission(challenge, photo_path=None, text_response=None):
     topic = challenge.get('topic', 'general')
     cefr_level = challenge.get('cefr_level', 'A1')
 
+    # Step 1: Photo verification
+    photo = photo_bytes
+    if not photo and photo_path and os.path.exists(photo_path):
+        photo = photo_path
+
+    photo_result = verify_photo(photo, topic) if photo else None
+
+    # Step 2: Text verification
+    text_result = None
+    if text_response and len(text_response.strip()) > 0:
+        text_result = analyze_norwegian_text(text_response, cefr_level, topic)
+
+    return combine_verification_results(photo_result, text_result)
+
+
+def combine_verification_results(photo_result=None, text_result=None):
+    """
+    Decide the verification tier from the photo and text checks.
+
+    Args:
+        photo_result: Result of verify_photo() (None if no photo was checked)
+        text_result: Result of analyze_norwegian_text() (None if no text was checked)
+
+    Returns:
+        dict - Same shape as verify_irl_submission()
+    """
     result = {
         "tier": "bronze",
         "xp_multiplier": 0.2,
-        "photo_result": None,
-        "text_result": None,
+        "photo_result": photo_result,
+        "text_result": text_result,
         "feedback": "Challenge marked as complete",
         "ai_verified": False
     }
 
-    # Step 1: Photo verification
-    if photo_path and os.path.exists(photo_path):
-        photo_result = verify_photo(photo_path, topic)
-        result["photo_result"] = photo_result
-
-        if photo_result["verified"]:
-            result["tier"] = "silver"
-            result["xp_multiplier"] = 0.5
-            result["feedback"] = f"Photo verified! {photo_result['message']}"
-            result["ai_verified"] = True
-
-    # Step 2: Text verification
-    if text_response and len(text_response.strip()) > 0:
-        text_result = analyze_norwegian_text(text_response, cefr_level, topic)
-        result["text_result"] = text_result
+    if photo_result and photo_result["verified"]:
+        result["tier"] = "silver"
+        result["xp_multiplier"] = 0.5
+        result["feedback"] = f"Photo verified! {photo_result['message']}"
+        result["ai_verified"] = True
 
+    if text_result:
         # Gold tier requires both photo and text verified
         if result["tier"] == "silver" and text_result["verified"]:
             result["tier"] = "gold"
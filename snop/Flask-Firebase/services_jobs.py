@@ -0,0 +1,190 @@
+# services_jobs.py
+"""
+Background evaluation jobs.
+Slow work (audio download + Whisper inference + XP/badge side effects) runs on a
+small in-process thread pool so web request threads return immediately.
+Job state is stored in Firestore, so any worker can answer status polls.
+
+Jobs run in the worker that accepted them, so a worker restart loses them.
+get_job() marks a job failed once it has been queued or running for longer
+than JOB_STALE_SECONDS, so clients stop polling. Job documents carry an
+expires_at timestamp (JOB_RETENTION_HOURS after creation) for a Firestore TTL
+policy on evaluation_jobs; cleanup_expired_jobs() deletes them without one.
+"""
+from firebase_config import db
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import threading
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "evaluation_jobs"
+
+# Job lifecycle
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+TERMINAL_STATUSES = (STATUS_DONE, STATUS_FAILED)
+
+STALE_JOB_ERROR = "Job was interrupted (worker restarted); please submit again"
+CLEANUP_BATCH_SIZE = 500
+
+# Created lazily so each gunicorn worker gets its own pool after fork
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Get (or create) this process's job thread pool."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from config import get_config
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_config().EVALUATION_JOB_WORKERS,
+                    thread_name_prefix="evaluation-job"
+                )
+    return _executor
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def enqueue_job(uid, kind, func, **kwargs):
+    """
+    Create a job document and run func(**kwargs) in the background.
+
+    Args:
+        uid: str - Firebase user ID that owns the job
+        kind: str - Job kind (e.g., "challenge_submit")
+        func: callable - Work to run; its return value becomes the job result
+        **kwargs: Arguments passed to func
+
+    Returns:
+        str - Job ID
+    """
+    from config import get_config
+
+    job_id = uuid.uuid4().hex
+    created_at = datetime.now(timezone.utc)
+    db.collection(COLLECTION_NAME).document(job_id).set({
+        "uid": uid,
+        "kind": kind,
+        "status": STATUS_QUEUED,
+        "result": None,
+        "error": None,
+        "created_at": created_at.isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "expires_at": created_at + timedelta(hours=get_config().JOB_RETENTION_HOURS)
+    })
+
+    _get_executor().submit(_run_job, job_id, func, kwargs)
+    logger.info(f"Enqueued {kind} job {job_id} for user {uid}")
+    return job_id
+
+
+def _run_job(job_id, func, kwargs):
+    """Execute a job and record its outcome."""
+    doc_ref = db.collection(COLLECTION_NAME).document(job_id)
+
+    try:
+        doc_ref.update({"status": STATUS_RUNNING, "started_at": _now_iso()})
+        result = func(**kwargs)
+        doc_ref.update({
+            "status": STATUS_DONE,
+            "result": result,
+            "finished_at": _now_iso()
+        })
+        logger.info(f"Job {job_id} finished")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+        doc_ref.update({
+            "status": STATUS_FAILED,
+            "error": str(e),
+            "finished_at": _now_iso()
+        })
+
+
+def _is_stale(job, now, stale_seconds):
+    """True if a queued/running job has gone longer than stale_seconds without finishing."""
+    if job.get("status") not in (STATUS_QUEUED, STATUS_RUNNING):
+        return False
+    since = job.get("started_at") or job.get("created_at")
+    if not since:
+        return False
+    return (now - datetime.fromisoformat(since)).total_seconds() > stale_seconds
+
+
+def get_job(job_id, uid=None):
+    """
+    Fetch a job's current state.
+
+    A queued or running job older than JOB_STALE_SECONDS was lost with its
+    worker; it is marked failed (unless it finished in the meantime).
+
+    Args:
+        job_id: str - Job ID
+        uid: str - If given, only return the job when it belongs to this user
+
+    Returns:
+        dict - Job data with "id", or None if not found
+    """
+    from config import get_config
+
+    doc = db.collection(COLLECTION_NAME).document(job_id).get()
+    if not doc.exists:
+        return None
+
+    job = doc.to_dict()
+    if uid is not None and job.get("uid") != uid:
+        return None
+
+    if _is_stale(job, datetime.now(timezone.utc), get_config().JOB_STALE_SECONDS):
+        failed = {"status": STATUS_FAILED, "error": STALE_JOB_ERROR, "finished_at": _now_iso()}
+        try:
+            # Only if the job document did not change since it was read
+            doc.reference.update(failed, option=db.write_option(last_update_time=doc.update_time))
+            logger.warning(f"Job {job_id} was stale ({job.get('status')}), marked failed")
+            job.update(failed)
+        except Exception as e:
+            # Most likely the job finished in the meantime: report its current state
+            logger.info(f"Job {job_id} not marked stale: {e}")
+            job = doc.reference.get().to_dict()
+
+    job.pop("expires_at", None)
+    job["id"] = doc.id
+    return job
+
+
+def cleanup_expired_jobs():
+    """
+    Delete job documents past their expires_at (for projects without a TTL policy).
+
+    Returns:
+        int - Number of deleted jobs
+    """
+    query = (
+        db.collection(COLLECTION_NAME)
+        .where("expires_at", "<", datetime.now(timezone.utc))
+        .limit(CLEANUP_BATCH_SIZE)
+    )
+
+    deleted = 0
+    while True:
+        docs = list(query.stream())
+        if not docs:
+            break
+        batch = db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        batch.commit()
+        deleted += len(docs)
+
+    logger.info(f"Deleted {deleted} expired evaluation jobs")
+    return deleted
@@ -0,0 +1,368 @@
+# services_near_duplicates.py
+"""
+Near-duplicate detection for generated pool challenges.
+
+The exact content hash (services_challenge_pool.content_hash) misses
+paraphrases: "Jeg vil gjerne ha en kaffe" vs "Jeg vil gjerne ha kaffe, takk".
+Each challenge's main Norwegian/English text is turned into a character
+n-gram vector (hashed into a fixed number of buckets, log-scaled, L2-normalized),
+so cosine similarity is a dot product. Vectors are kept in one NumPy matrix
+per (cefr_level, type); checking a candidate is a single matrix-vector product.
+
+The index is saved to NEAR_DUPLICATE_INDEX_PATH (.npz) after each update and
+loaded by the next job run. When the file is missing or was built with other
+vector settings, it is rebuilt from the pool with one collection scan.
+Several processes (gunicorn workers, jobs) share the file: each reloads it
+when its mtime changes, and saves merge with what is on disk under a file lock,
+so no process overwrites entries another one added.
+"""
+from contextlib import contextmanager
+import logging
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are not locked against other processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Vector settings (saved with the index; an index built with other settings is rebuilt)
+NGRAM_SIZES = (3, 4)
+NUM_BUCKETS = 4096
+VECTOR_VERSION = 1
+
+_NON_LETTERS = re.compile(r"[^0-9a-zæøåéèêóòôü]+")
+
+_index = None
+_index_mtime = None  # st_mtime_ns of the index file when this process last read or wrote it
+_index_lock = threading.RLock()  # Reentrant: get_index() saves a rebuilt index while holding it
+
+
+def challenge_text(challenge):
+    """Text compared between challenges: the phrase the learner works with, not the generic title."""
+    challenge_type = challenge.get("type")
+    if challenge_type == "fill_blank":
+        return (challenge.get("sentence") or "").replace("___", challenge.get("missing_word") or "")
+    if challenge_type == "listening":
+        return challenge.get("audio_text") or ""
+    if challenge_type == "multiple_choice":
+        options = challenge.get("options") or []
+        correct = challenge.get("correct_answer")
+        answer = options[correct] if isinstance(correct, int) and 0 <= correct < len(options) else ""
+        return f"{challenge.get('prompt') or ''} {answer}"
+    return challenge.get("target") or challenge.get("prompt") or ""
+
+
+def vectorize(texts):
+    """
+    Hashed character n-gram vectors.
+
+    Args:
+        texts: list of str
+
+    Returns:
+        np.ndarray [len(texts), NUM_BUCKETS] float32, rows L2-normalized (all-zero for empty text)
+    """
+    vectors = np.zeros((len(texts), NUM_BUCKETS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f" {_NON_LETTERS.sub(' ', text.casefold()).strip()} "
+        buckets = [
+            zlib.crc32(padded[i:i + n].encode("utf-8")) % NUM_BUCKETS
+            for n in NGRAM_SIZES
+            for i in range(len(padded) - n + 1)
+        ]
+        if buckets:
+            np.add.at(vectors[row], buckets, 1.0)
+
+    np.log1p(vectors, out=vectors)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def _group_key(challenge):
+    return f"{challenge.get('cefr_level', '')}|{challenge.get('type', '')}"
+
+
+class NearDuplicateIndex:
+    """
+    Per-(cefr_level, type) matrices of challenge vectors.
+    Rows grow by doubling, so adding a challenge is amortized O(1).
+    """
+
+    def __init__(self):
+        self._groups = {}  # group key -> {"vectors": ndarray (capacity, D), "ids": list}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(group["ids"]) for group in self._groups.values())
+
+    def _matrix(self, key):
+        group = self._groups.get(key)
+        if group is None:
+            return np.zeros((0, NUM_BUCKETS), dtype=np.float32), []
+        return group["vectors"][:len(group["ids"])], group["ids"]
+
+    def most_similar(self, challenge, vector=None):
+        """
+        Closest indexed challenge of the same CEFR level and type.
+
+        Returns:
+            tuple: (cosine similarity 0-1, challenge key) or (0.0, None) when the group is empty
+        """
+        if vector is None:
+            vector = vectorize([challenge_text(challenge)])[0]
+
+        with self._lock:
+            matrix, ids = self._matrix(_group_key(challenge))
+            if not ids:
+                return 0.0, None
+            similarities = matrix @ vector
+            best = int(similarities.argmax())
+            return float(similarities[best]), ids[best]
+
+    def _append(self, key, challenge_key, vector):
+        """Append one row to a group (caller holds self._lock)."""
+        group = self._groups.setdefault(key, {"vectors": np.zeros((16, NUM_BUCKETS), dtype=np.float32), "ids": []})
+        size = len(group["ids"])
+        if size == len(group["vectors"]):
+            grown = np.zeros((size * 2, NUM_BUCKETS), dtype=np.float32)
+            grown[:size] = group["vectors"]
+            group["vectors"] = grown
+        group["vectors"][size] = vector
+        group["ids"].append(challenge_key)
+
+    def add(self, challenge_key, challenge, vector=None):
+        """Add one challenge (challenge_key: pool doc ID or content hash)."""
+        if vector is None:
+            vector = vectorize([challenge_text(challenge)])[0]
+
+        with self._lock:
+            self._append(_group_key(challenge), challenge_key, vector)
+
+    def merge(self, other):
+        """
+        Add the challenges of another index that this one doesn't have.
+
+        Returns:
+            int - Number of challenges added
+        """
+        with other._lock:
+            groups = {key: (matrix.copy(), list(ids)) for key, (matrix, ids) in
+                      ((key, other._matrix(key)) for key in other._groups)}
+
+        added = 0
+        with self._lock:
+            for key, (matrix, ids) in groups.items():
+                existing = set(self._groups[key]["ids"]) if key in self._groups else set()
+                for vector, challenge_key in zip(matrix, ids):
+                    if challenge_key not in existing:
+                        self._append(key, challenge_key, vector)
+                        existing.add(challenge_key)
+                        added += 1
+        return added
+
+    def save(self, path):
+        """Write the index to an .npz file (atomically, via a temporary file)."""
+        arrays = {"settings": np.array([VECTOR_VERSION, NUM_BUCKETS, *NGRAM_SIZES])}
+        with self._lock:
+            for n, (key, group) in enumerate(self._groups.items()):
+                size = len(group["ids"])
+                arrays[f"key_{n}"] = np.array(key)
+                arrays[f"vectors_{n}"] = group["vectors"][:size].astype(np.float16)
+                arrays[f"ids_{n}"] = np.array(group["ids"], dtype=str)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an index written by save().
+
+        Returns:
+            NearDuplicateIndex, or None if the file was built with other vector settings
+        """
+        index = cls()
+        with np.load(path) as data:
+            if not np.array_equal(data["settings"], [VECTOR_VERSION, NUM_BUCKETS, *NGRAM_SIZES]):
+                return None
+            n = 0
+            while f"key_{n}" in data:
+                vectors = data[f"vectors_{n}"].astype(np.float32)
+                index._groups[str(data[f"key_{n}"])] = {
+                    "vectors": vectors if len(vectors) else np.zeros((16, NUM_BUCKETS), dtype=np.float32),
+                    "ids": [str(i) for i in data[f"ids_{n}"]]
+                }
+                n += 1
+        return index
+
+
+def build_from_pool():
+    """Build the index from every challenge in the pool (one collection scan)."""
+    from firebase_config import db
+    from services_challenge_pool import COLLECTION_NAME
+
+    index = NearDuplicateIndex()
+    for doc in db.collection(COLLECTION_NAME).stream():
+        index.add(doc.id, doc.to_dict())
+
+    logger.info(f"Built near-duplicate index from {len(index)} pool challenges")
+    return index
+
+
+def _file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on <path>.lock, held across read-merge-write of the index file."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load(path):
+    """Read the index file; None if it is unreadable or was built with other settings."""
+    try:
+        index = NearDuplicateIndex.load(path)
+    except Exception as e:
+        logger.warning(f"Could not read near-duplicate index {path}: {e}")
+        return None
+    if index is None:
+        logger.info("Near-duplicate index was built with other settings, rebuilding")
+    return index
+
+
+def get_index(rebuild=False):
+    """
+    Get this process's index: loaded from NEAR_DUPLICATE_INDEX_PATH, or built
+    from the pool (and saved) if the file is missing, outdated or rebuild=True.
+    When another process has saved the file since this one last read or wrote
+    it, it is reloaded (keeping any entries only this process has).
+    """
+    global _index, _index_mtime
+    from config import get_config
+
+    with _index_lock:
+        path = get_config().NEAR_DUPLICATE_INDEX_PATH
+        mtime = _file_mtime(path) if path else None
+
+        if _index is not None and not rebuild:
+            if mtime is None or mtime == _index_mtime:
+                return _index
+            index = _load(path)
+            if index is not None:
+                index.merge(_index)
+                _index, _index_mtime = index, mtime
+                logger.info(f"Reloaded near-duplicate index ({len(index)} challenges) from {path}")
+            return _index
+
+        index = None
+        if mtime is not None and not rebuild:
+            index = _load(path)
+            if index is not None:
+                _index_mtime = mtime
+                logger.info(f"Loaded near-duplicate index ({len(index)} challenges) from {path}")
+
+        if index is None:
+            index = build_from_pool()
+            # A rebuild replaces the file instead of merging stale entries back in
+            _save(index, path, merge=False)
+
+        _index = index
+        return _index
+
+
+def _save(index, path, merge=True):
+    """
+    Write this process's index. Under the file lock, entries another process
+    saved since this one last read the file are merged in first. Holds
+    _index_lock, so _index_mtime always matches the index it was read with.
+    """
+    global _index_mtime
+    if not path:
+        return
+    try:
+        with _index_lock, _file_lock(path):
+            if merge and _file_mtime(path) not in (None, _index_mtime):
+                on_disk = _load(path)
+                if on_disk is not None:
+                    index.merge(on_disk)
+            index.save(path)
+            _index_mtime = _file_mtime(path)
+    except OSError as e:
+        logger.warning(f"Could not write near-duplicate index {path}: {e}")
+
+
+def filter_near_duplicates(challenges, threshold=None):
+    """
+    Drop challenges too similar to the pool or to an earlier challenge in the list.
+
+    Args:
+        challenges: list of challenge dicts (with cefr_level and type)
+        threshold: float - Cosine similarity at or above which a challenge is
+                   rejected (default: NEAR_DUPLICATE_THRESHOLD)
+
+    Returns:
+        tuple: (kept challenges, list of {challenge, similarity, duplicate_of})
+    """
+    from config import get_config
+
+    threshold = get_config().NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    index = get_index()
+    vectors = vectorize([challenge_text(challenge) for challenge in challenges])
+
+    kept, rejected = [], []
+    batch = NearDuplicateIndex()  # Challenges kept so far in this call
+    for n, (challenge, vector) in enumerate(zip(challenges, vectors)):
+        matches = [index.most_similar(challenge, vector), batch.most_similar(challenge, vector)]
+        similarity, duplicate_of = max(matches, key=lambda m: m[0])
+
+        if similarity >= threshold:
+            rejected.append({"challenge": challenge, "similarity": round(similarity, 3), "duplicate_of": duplicate_of})
+            logger.info(f"Rejected near-duplicate {challenge.get('type')} '{challenge_text(challenge)}' "
+                        f"(similarity {similarity:.2f} to {duplicate_of})")
+        else:
+            kept.append(challenge)
+            batch.add(f"candidate_{n}", challenge, vector)
+
+    return kept, rejected
+
+
+def record_challenges(challenge_ids, challenges):
+    """
+    Add saved pool challenges to the index and persist it.
+
+    Args:
+        challenge_ids: list of pool document IDs
+        challenges: list of the saved challenge dicts (same order)
+    """
+    from config import get_config
+
+    if not challenges:
+        return
+
+    vectors = vectorize([challenge_text(challenge) for challenge in challenges])
+    with _index_lock:
+        index = get_index()
+        for challenge_id, challenge, vector in zip(challenge_ids, challenges, vectors):
+            index.add(challenge_id, challenge, vector)
+        _save(index, get_config().NEAR_DUPLICATE_INDEX_PATH)
@@ -0,0 +1,216 @@
+# services_ollama.py
+"""
+Shared Ollama client for all LLM calls (challenge generation, IRL text analysis).
+- One client per process (and per timeout), so calls reuse the HTTP connection
+- keep_alive keeps the model loaded between calls instead of reloading it
+- JSON-schema constrained output (Ollama's `format`), so responses parse
+  without stripping markdown or patching braces
+- Bounded retries on invalid output or transport errors
+- Per-purpose metrics: calls, failures, retries, tokens/sec
+- Interactive calls (made while a user waits) touch OLLAMA_ACTIVITY_FILE, so
+  background generation in any worker on this host can yield to them
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# One client per timeout value; created lazily so each gunicorn worker gets its own after fork
+_clients = {}
+_clients_lock = threading.Lock()
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+_last_interactive = 0.0  # time.time() of this process's last interactive call
+
+
+def get_client(timeout=None):
+    """
+    Get this process's Ollama client for a request timeout.
+
+    Args:
+        timeout: float - Seconds per request (default: OLLAMA_TIMEOUT)
+
+    Returns:
+        ollama.Client
+    """
+    from config import get_config
+
+    cfg = get_config()
+    timeout = timeout or cfg.OLLAMA_TIMEOUT
+
+    client = _clients.get(timeout)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(timeout)
+            if client is None:
+                import ollama
+                client = ollama.Client(host=cfg.OLLAMA_HOST or None, timeout=timeout)
+                _clients[timeout] = client
+    return client
+
+
+def object_schema(properties, required=None):
+    """
+    JSON schema for an object with the given properties.
+
+    Args:
+        properties: dict - Property name -> JSON schema (e.g. {"type": "string"})
+        required: list - Required properties (default: all)
+
+    Returns:
+        dict - JSON schema
+    """
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties) if required is None else required
+    }
+
+
+def _record(purpose, **counts):
+    with _metrics_lock:
+        entry = _metrics.setdefault(purpose, {
+            "calls": 0, "responses": 0, "failures": 0, "retries": 0,
+            "eval_tokens": 0, "eval_seconds": 0.0, "prompt_tokens": 0, "total_seconds": 0.0
+        })
+        for name, value in counts.items():
+            entry[name] += value
+
+
+def _note_interactive():
+    """Record an interactive call in this process and (at most once a second) in the activity file."""
+    global _last_interactive
+    from config import get_config
+
+    now = time.time()
+    if now - _last_interactive < 1:
+        return
+    _last_interactive = now
+
+    path = get_config().OLLAMA_ACTIVITY_FILE
+    if not path:
+        return
+    try:
+        with open(path, "a"):
+            os.utime(path, (now, now))
+    except OSError as e:
+        logger.debug(f"Could not touch Ollama activity file {path}: {e}")
+
+
+def interactive_idle_seconds():
+    """
+    Seconds since the last interactive Ollama call by any worker on this host.
+
+    Returns:
+        float - float("inf") if no interactive call was recorded
+    """
+    from config import get_config
+
+    last = _last_interactive
+    path = get_config().OLLAMA_ACTIVITY_FILE
+    if path:
+        try:
+            last = max(last, os.path.getmtime(path))
+        except OSError:
+            pass
+    return time.time() - last if last else float("inf")
+
+
+def chat_json(messages, schema, purpose="default", options=None, validate=None,
+              retries=None, timeout=None, model=None, interactive=False):
+    """
+    Chat with Ollama and return the parsed JSON answer.
+
+    Args:
+        messages: list - Chat messages ({"role", "content"})
+        schema: dict - JSON schema the answer must follow (Ollama `format`)
+        purpose: str - Metrics bucket (e.g. "generate_pronunciation")
+        options: dict - Ollama model options (temperature, ...)
+        validate: callable - validate(data) raises ValueError for unusable answers;
+                  these are retried like malformed JSON
+        retries: int - Extra attempts after the first (default: OLLAMA_MAX_RETRIES)
+        timeout: float - Seconds per request (default: OLLAMA_TIMEOUT)
+        model: str - Model name (default: OLLAMA_MODEL)
+        interactive: bool - A user is waiting on this call; background work
+                     backs off while such calls are recent (see interactive_idle_seconds)
+
+    Returns:
+        dict | list - Parsed answer
+
+    Raises:
+        ValueError - The answer was invalid on every attempt
+        Exception - Transport errors from the last attempt (connection, timeout)
+    """
+    from config import get_config
+
+    cfg = get_config()
+    retries = cfg.OLLAMA_MAX_RETRIES if retries is None else retries
+    client = get_client(timeout)
+    if interactive:
+        _note_interactive()
+
+    last_error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            _record(purpose, retries=1)
+        _record(purpose, calls=1)
+        start = time.perf_counter()
+
+        try:
+            response = client.chat(
+                model=model or cfg.OLLAMA_MODEL,
+                messages=messages,
+                format=schema,
+                options=options or {},
+                keep_alive=cfg.OLLAMA_KEEP_ALIVE
+            )
+            _record(
+                purpose,
+                responses=1,
+                total_seconds=time.perf_counter() - start,
+                eval_tokens=response.get("eval_count") or 0,
+                eval_seconds=(response.get("eval_duration") or 0) / 1e9,
+                prompt_tokens=response.get("prompt_eval_count") or 0
+            )
+
+            data = json.loads(response["message"]["content"])
+            if validate is not None:
+                validate(data)
+            return data
+
+        except (json.JSONDecodeError, ValueError) as e:
+            last_error = ValueError(f"Invalid JSON from AI: {e}")
+        except Exception as e:
+            last_error = e
+
+        _record(purpose, failures=1)
+        logger.warning(f"Ollama {purpose} attempt {attempt + 1}/{retries + 1} failed: {last_error}")
+        if attempt < retries and not isinstance(last_error, ValueError):
+            # Transport error: give the server a moment before retrying
+            time.sleep(min(2 ** attempt, 5))
+
+    raise last_error
+
+
+def get_ollama_metrics():
+    """
+    Ollama call metrics for this process, per purpose.
+
+    Returns:
+        dict: purpose -> {calls, responses, failures, retries, prompt_tokens,
+                          eval_tokens, tokens_per_second, avg_seconds}
+    """
+    with _metrics_lock:
+        snapshot = {purpose: dict(entry) for purpose, entry in _metrics.items()}
+
+    for entry in snapshot.values():
+        eval_seconds = entry.pop("eval_seconds")
+        total_seconds = entry.pop("total_seconds")
+        entry["tokens_per_second"] = round(entry["eval_tokens"] / eval_seconds, 1) if eval_seconds else None
+        entry["avg_seconds"] = round(total_seconds / entry["responses"], 2) if entry["responses"] else None
+    return snapshot
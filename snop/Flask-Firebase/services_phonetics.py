@@ -0,0 +1,272 @@
+# services_phonetics.py
+"""
+Norwegian phonetic helpers for pronunciation scoring: grapheme-to-phoneme
+rules and a weighted phoneme edit distance, so near-homophones
+("kjøre"/"sjøre") score as close rather than as plain character mismatches,
+while consonant length ("tak"/"takk") still costs.
+"""
+import re
+import numpy as np
+
+# =============================================================================
+# Grapheme-to-phoneme (G2P)
+# =============================================================================
+# Rule table for Bokmål with an Eastern Norwegian pronunciation. Rules are
+# compiled into a single alternation regex; at each position the first rule
+# that matches wins, so multi-letter and context rules come before single
+# letters. Patterns must not contain capturing groups (lookarounds are fine).
+
+_G2P_RULES = [
+    # Sje-sound
+    (r"skj|sch|sj|sk(?=[iyj]|ei|øy)|rs", "ʃ"),
+    # Kje-sound
+    (r"kj|tj|k(?=[iy]|ei|øy)", "ç"),
+    # Silent h/g/d before j, soft g
+    (r"hj|gj|dj|g(?=[iy]|ei|øy)", "j"),
+    (r"hv", "v"),
+    # Silent final d after l, n, r and silent g in -ig/-lig
+    (r"rd\b", "r"),
+    (r"ld\b", "l"),
+    (r"nd\b", "n"),
+    (r"(?<=i)g\b", ""),
+    # Retroflexes (r + dental)
+    (r"rt", "ʈ"),
+    (r"rd", "ɖ"),
+    (r"rn", "ɳ"),
+    (r"rl", "ɭ"),
+    # Nasals
+    (r"ng", "ŋ"),
+    (r"n(?=k)", "ŋ"),
+    # Foreign spellings
+    (r"ck", "k"),
+    (r"ph", "f"),
+    (r"th", "t"),
+    (r"qu", "k v"),
+    (r"x", "k s"),
+    (r"z", "s"),
+    (r"c(?=[eiy])", "s"),
+    (r"c", "k"),
+    (r"w", "v"),
+    # Double consonants are long (tak/takk, hat/hatt are different words)
+    (r"bb", "bː"), (r"dd", "dː"), (r"ff", "fː"), (r"gg", "gː"), (r"kk", "kː"), (r"ll", "lː"),
+    (r"mm", "mː"), (r"nn", "nː"), (r"pp", "pː"), (r"rr", "rː"), (r"ss", "sː"), (r"tt", "tː"),
+    (r"vv", "vː"),
+    # Diphthongs
+    (r"ei|eg(?=[ln]\b)", "æi"),
+    (r"øy", "øy"),
+    (r"au", "æʉ"),
+    (r"ai", "ai"),
+    # Vowels
+    (r"aa|å", "o"),
+    (r"e\b", "ə"),
+    (r"a", "a"), (r"e", "e"), (r"i", "i"), (r"o", "u"), (r"u", "ʉ"), (r"y", "y"),
+    (r"æ", "æ"), (r"ø", "ø"),
+    # Consonants
+    (r"b", "b"), (r"d", "d"), (r"f", "f"), (r"g", "g"), (r"h", "h"), (r"j", "j"),
+    (r"k", "k"), (r"l", "l"), (r"m", "m"), (r"n", "n"), (r"p", "p"), (r"r", "r"),
+    (r"s", "s"), (r"t", "t"), (r"v", "v"),
+]
+
+_G2P_REGEX = re.compile("|".join(f"({pattern})" for pattern, _ in _G2P_RULES))
+_G2P_OUTPUT = [tuple(phonemes.split()) for _, phonemes in _G2P_RULES]
+
+# Frequent words whose pronunciation the rules don't capture
+G2P_EXCEPTIONS = {
+    "jeg": ("j", "æi"),
+    "meg": ("m", "æi"),
+    "deg": ("d", "æi"),
+    "seg": ("s", "æi"),
+    "det": ("d", "e"),
+    "de": ("d", "i"),
+    "og": ("o",),
+    "er": ("æ", "r"),
+    "her": ("h", "æ", "r"),
+    "der": ("d", "æ", "r"),
+    "hva": ("v", "a"),
+    "godt": ("g", "o", "t"),
+    "dag": ("d", "a", "g"),
+    "morgen": ("m", "o", "ɳ"),
+}
+
+# Phoneme inventory. Vowels: (height 0=open..3=close, backness 0=front..2=back, rounded)
+_VOWELS = {
+    "i": (3, 0, 0), "y": (3, 0, 1), "ʉ": (3, 1, 1), "u": (3, 2, 1),
+    "e": (2, 0, 0), "ø": (2, 0, 1), "ə": (1.5, 1, 0), "o": (2, 2, 1),
+    "æ": (1, 0, 0), "a": (0, 1, 0),
+}
+# Diphthongs are scored like their first element plus a small penalty
+_DIPHTHONGS = {"æi": "æ", "øy": "ø", "æʉ": "æ", "ai": "a"}
+# Consonants: (place, manner, voiced)
+_CONSONANTS = {
+    "p": ("labial", "stop", 0), "b": ("labial", "stop", 1), "m": ("labial", "nasal", 1),
+    "f": ("labial", "fricative", 0), "v": ("labial", "approximant", 1),
+    "t": ("alveolar", "stop", 0), "d": ("alveolar", "stop", 1), "n": ("alveolar", "nasal", 1),
+    "s": ("alveolar", "fricative", 0), "l": ("alveolar", "lateral", 1), "r": ("alveolar", "trill", 1),
+    "ʈ": ("retroflex", "stop", 0), "ɖ": ("retroflex", "stop", 1), "ɳ": ("retroflex", "nasal", 1),
+    "ɭ": ("retroflex", "lateral", 1), "ʃ": ("postalveolar", "fricative", 0),
+    "ç": ("palatal", "fricative", 0), "j": ("palatal", "approximant", 1),
+    "k": ("velar", "stop", 0), "g": ("velar", "stop", 1), "ŋ": ("velar", "nasal", 1),
+    "h": ("glottal", "fricative", 0),
+}
+# Long consonants (double letters) map to their short counterpart
+_LONG_CONSONANTS = {c + "ː": c for c in "bdfgklmnprstv"}
+# Cost of hearing a short consonant where a long one was expected (or vice versa)
+LENGTH_COST = 0.35
+# Places of articulation that learners (and Whisper) commonly confuse
+_CLOSE_PLACES = {
+    frozenset(("alveolar", "retroflex")): 0.2,
+    frozenset(("postalveolar", "palatal")): 0.25,
+    frozenset(("alveolar", "postalveolar")): 0.4,
+}
+
+PHONEMES = list(_VOWELS) + list(_DIPHTHONGS) + list(_CONSONANTS) + list(_LONG_CONSONANTS)
+PHONEME_IDS = {phoneme: i for i, phoneme in enumerate(PHONEMES)}
+
+
+def _vowel_cost(a, b):
+    ha, ba, ra = _VOWELS[a]
+    hb, bb, rb = _VOWELS[b]
+    return min(1.0, 0.15 * abs(ha - hb) + 0.15 * abs(ba - bb) + 0.1 * abs(ra - rb) + 0.1)
+
+
+def _consonant_cost(a, b):
+    place_a, manner_a, voiced_a = _CONSONANTS[a]
+    place_b, manner_b, voiced_b = _CONSONANTS[b]
+    if place_a == place_b and manner_a == manner_b:
+        return 0.3  # Voicing only (p/b, t/d, k/g)
+    if manner_a == manner_b:
+        return _CLOSE_PLACES.get(frozenset((place_a, place_b)), 0.6)
+    if place_a == place_b:
+        return 0.7
+    return 1.0
+
+
+def _substitution_cost(a, b):
+    """Weighted cost of hearing phoneme b where a was expected."""
+    if a == b:
+        return 0.0
+    if a in _LONG_CONSONANTS or b in _LONG_CONSONANTS:
+        base_a = _LONG_CONSONANTS.get(a, a)
+        base_b = _LONG_CONSONANTS.get(b, b)
+        if base_a in _CONSONANTS and base_b in _CONSONANTS:
+            length = LENGTH_COST if (a in _LONG_CONSONANTS) != (b in _LONG_CONSONANTS) else 0.0
+            return min(1.0, _consonant_cost(base_a, base_b) + length) if base_a != base_b else length
+        return 1.0
+    if a in _DIPHTHONGS or b in _DIPHTHONGS:
+        base_a = _DIPHTHONGS.get(a, a)
+        base_b = _DIPHTHONGS.get(b, b)
+        if base_a in _VOWELS and base_b in _VOWELS:
+            return min(1.0, _vowel_cost(base_a, base_b) + 0.3)
+        return 1.0
+    if a in _VOWELS and b in _VOWELS:
+        return _vowel_cost(a, b)
+    if a in _CONSONANTS and b in _CONSONANTS:
+        return _consonant_cost(a, b)
+    if {a, b} == {"i", "j"}:
+        return 0.5
+    return 1.0
+
+
+def _build_substitution_matrix():
+    size = len(PHONEMES)
+    matrix = np.ones((size, size), dtype=np.float32)
+    for a in PHONEMES:
+        for b in PHONEMES:
+            matrix[PHONEME_IDS[a], PHONEME_IDS[b]] = _substitution_cost(a, b)
+    return matrix
+
+
+# Precomputed once at import: cost of substituting phoneme i with phoneme j
+SUBSTITUTION_COSTS = _build_substitution_matrix()
+INDEL_COST = 1.0
+
+
+def word_to_phonemes(word):
+    """
+    Convert one normalized word to phonemes using the compiled rule table.
+
+    Args:
+        word: str - Normalized word
+
+    Returns:
+        list of str - Phonemes
+    """
+    if word in G2P_EXCEPTIONS:
+        return list(G2P_EXCEPTIONS[word])
+
+    phonemes = []
+    for match in _G2P_REGEX.finditer(word):
+        phonemes.extend(_G2P_OUTPUT[match.lastindex - 1])
+    return phonemes
+
+
+def text_to_phonemes(normalized_text):
+    """
+    Convert a normalized phrase to a phoneme sequence (word boundaries are
+    dropped, since Whisper's word splitting varies, e.g. "i dag" / "idag").
+
+    Args:
+        normalized_text: str - Output of services_pronunciation.normalize_text()
+
+    Returns:
+        list of str - Phonemes
+    """
+    phonemes = []
+    for word in normalized_text.split():
+        phonemes.extend(word_to_phonemes(word))
+    return phonemes
+
+
+def weighted_edit_distance(source_ids, target_ids):
+    """
+    Weighted edit distance between two phoneme ID sequences.
+
+    Rows are computed with NumPy: all substitution costs come from one
+    gather into SUBSTITUTION_COSTS, and the constant-cost insertion chain of
+    each row is resolved with a running minimum.
+
+    Args:
+        source_ids: np.ndarray - Phoneme IDs of the transcription
+        target_ids: np.ndarray - Phoneme IDs of the target
+
+    Returns:
+        float - Distance
+    """
+    m = len(target_ids)
+    offsets = np.arange(m + 1, dtype=np.float32) * INDEL_COST
+    substitution = SUBSTITUTION_COSTS[np.ix_(source_ids, target_ids)]
+    prev = offsets.copy()
+    row = np.empty(m + 1, dtype=np.float32)
+
+    for i in range(len(source_ids)):
+        row[0] = (i + 1) * INDEL_COST
+        np.minimum(prev[1:] + INDEL_COST, prev[:-1] + substitution[i], out=row[1:])
+        row -= offsets
+        np.minimum.accumulate(row, out=prev)
+        prev += offsets
+
+    return float(prev[-1])
+
+
+def phoneme_ids(phonemes):
+    """Encode phonemes as an ID array for weighted_edit_distance()."""
+    return np.fromiter((PHONEME_IDS[p] for p in phonemes), dtype=np.intp, count=len(phonemes))
+
+
+def phonetic_similarity(transcription_phonemes, target_phonemes):
+    """
+    Phonetic similarity in [0, 1]: 1 - weighted distance / longer length.
+
+    Args:
+        transcription_phonemes: list of str - Phonemes heard
+        target_phonemes: list of str - Target phonemes
+
+    Returns:
+        float - Similarity ratio
+    """
+    longest = max(len(transcription_phonemes), len(target_phonemes))
+    if longest == 0 or transcription_phonemes == target_phonemes:
+        return 1.0
+
+    distance = weighted_edit_distance(phoneme_ids(transcription_phonemes), phoneme_ids(target_phonemes))
+    return max(0.0, 1.0 - distance / (longest * INDEL_COST))
@@ -0,0 +1,197 @@
+# services_photo_hash.py
+"""
+Perceptual-hash index of IRL proof photos.
+
+Every verified photo is stored with its 64-bit dHash and CLIP result. Users
+often resubmit the same (or a re-encoded) photo on retries or for other
+challenges; a near-match for the same topic reuses the stored verification
+instead of running CLIP again, and reuse across challenges is flagged.
+
+Firestore can't query by Hamming distance, so each hash is also stored as 8
+one-byte bands. Two hashes within 7 bits of each other must share at least one
+band, so an array_contains_any query on the bands finds every candidate.
+"""
+from firebase_config import db
+from firebase_admin import firestore
+from services_images import dhash, hamming_distance
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "photo_hashes"
+
+HASH_BITS = 64
+BAND_BITS = 8
+NUM_BANDS = HASH_BITS // BAND_BITS
+# Band lookup finds every match up to NUM_BANDS - 1 differing bits
+MAX_INDEXED_DISTANCE = NUM_BANDS - 1
+
+# Most recent candidates read per lookup
+CANDIDATE_LIMIT = 50
+
+
+def compute_photo_hash(photo):
+    """
+    Perceptual hash of a photo, as stored in the index.
+
+    Args:
+        photo: Photo as bytes, memoryview, file-like object or file path
+
+    Returns:
+        str - 16-digit hex dHash
+    """
+    return f"{dhash(photo):016x}"
+
+
+def hash_bands(photo_hash):
+    """Band keys ("<band index>:<byte>") used for candidate lookup."""
+    value = int(photo_hash, 16)
+    return [
+        f"{i}:{(value >> (HASH_BITS - BAND_BITS * (i + 1))) & 0xFF:02x}"
+        for i in range(NUM_BANDS)
+    ]
+
+
+def _max_distance():
+    from config import get_config
+    return min(get_config().PHOTO_HASH_MAX_DISTANCE, MAX_INDEXED_DISTANCE)
+
+
+def find_similar_photos(photo_hash, max_distance=None):
+    """
+    Find indexed photos within max_distance bits of photo_hash.
+
+    Args:
+        photo_hash: str - Hex dHash from compute_photo_hash()
+        max_distance: int - Hamming threshold (default: PHOTO_HASH_MAX_DISTANCE)
+
+    Returns:
+        list of dicts (stored entry + "id" and "distance"), closest first
+    """
+    if max_distance is None:
+        max_distance = _max_distance()
+
+    value = int(photo_hash, 16)
+    # Needs a composite index: bands ARRAY_CONTAINS, created_at DESC
+    query = (db.collection(COLLECTION_NAME)
+             .where("bands", "array_contains_any", hash_bands(photo_hash))
+             .order_by("created_at", direction=firestore.Query.DESCENDING)
+             .limit(CANDIDATE_LIMIT))
+
+    matches = []
+    for doc in query.stream():
+        entry = doc.to_dict()
+        distance = hamming_distance(value, int(entry["hash"], 16))
+        if distance <= max_distance:
+            entry["id"] = doc.id
+            entry["distance"] = distance
+            matches.append(entry)
+
+    matches.sort(key=lambda m: m["distance"])
+    return matches
+
+
+def record_photo(uid, challenge_id, topic, photo_hash, photo_result):
+    """
+    Add a verified photo to the index.
+
+    Args:
+        uid: str - Firebase user ID
+        challenge_id: str - Challenge the photo was submitted for
+        topic: str - Challenge topic the photo was verified against
+        photo_hash: str - Hex dHash
+        photo_result: dict - Result of verify_photo()
+    """
+    db.collection(COLLECTION_NAME).add({
+        "uid": uid,
+        "challenge_id": challenge_id,
+        "topic": topic,
+        "hash": photo_hash,
+        "bands": hash_bands(photo_hash),
+        "result": photo_result,
+        "created_at": firestore.SERVER_TIMESTAMP
+    })
+
+
+def describe_reuse(uid, challenge_id, matches):
+    """
+    Summarize whether this photo was already submitted elsewhere.
+
+    Returns:
+        dict | None: {
+            same_user_challenges: list of challenge IDs (other challenges by this user),
+            other_users: int (distinct other users who submitted it),
+            distance: int (closest match)
+        }
+    """
+    other_challenges = sorted({
+        m["challenge_id"] for m in matches
+        if m["uid"] == uid and m["challenge_id"] != challenge_id
+    })
+    other_users = {m["uid"] for m in matches if m["uid"] != uid}
+
+    if not other_challenges and not other_users:
+        return None
+
+    return {
+        "same_user_challenges": other_challenges,
+        "other_users": len(other_users),
+        "distance": min(m["distance"] for m in matches)
+    }
+
+
+def verify_photo_cached(uid, challenge_id, topic, photo, photo_hash=None):
+    """
+    verify_photo() with perceptual-hash reuse.
+
+    A stored result for a near-identical photo and the same topic is returned
+    without running CLIP (the user's own submissions are preferred). New
+    results are added to the index. Index errors never block verification.
+
+    Args:
+        uid: str - Firebase user ID
+        challenge_id: str - Challenge ID
+        topic: str - Challenge topic
+        photo: Photo as bytes, memoryview, file-like object or file path
+        photo_hash: str - Precomputed hex dHash (computed here if None)
+
+    Returns:
+        dict - verify_photo() result plus:
+            cached: bool - Result reused from the index
+            photo_hash: str | None
+            reuse: dict | None - See describe_reuse()
+    """
+    from services_irl_verification import verify_photo
+
+    matches = []
+    try:
+        if photo_hash is None:
+            photo_hash = compute_photo_hash(photo)
+        matches = find_similar_photos(photo_hash)
+    except Exception as e:
+        logger.warning(f"Photo hash lookup failed, verifying without cache: {e}")
+
+    reuse = describe_reuse(uid, challenge_id, matches)
+    if reuse:
+        logger.info(f"Photo from {uid} for {challenge_id} matches earlier submissions: {reuse}")
+
+    # Prefer this user's own earlier result, then anyone's, for the same topic
+    same_topic = [m for m in matches if m.get("topic") == topic and m.get("result")]
+    same_topic.sort(key=lambda m: (m["uid"] != uid, m["distance"]))
+
+    if same_topic:
+        photo_result = dict(same_topic[0]["result"])
+        cached = True
+    else:
+        photo_result = verify_photo(photo, topic)
+        cached = False
+
+    # Index the submission, unless CLIP failed or it's an exact repeat of this user's entry
+    repeat = any(m["uid"] == uid and m["challenge_id"] == challenge_id and m["distance"] == 0 for m in matches)
+    if photo_hash and photo_result.get("best_match") is not None and not repeat:
+        try:
+            record_photo(uid, challenge_id, topic, photo_hash, photo_result)
+        except Exception as e:
+            logger.warning(f"Could not index photo hash: {e}")
+
+    return {**photo_result, "cached": cached, "photo_hash": photo_hash, "reuse": reuse}
@@ -0,0 +1,194 @@
+# services_pipeline.py
+"""
+Small stage-graph runner for request pipelines.
+Independent stages (e.g. photo upload, Whisper, CLIP and Ollama for an IRL
+submission) run concurrently on a bounded per-process thread pool, so a
+request takes about as long as its slowest stage instead of the sum.
+Each stage can have a timeout and a fallback that supplies its result when
+it fails or runs out of time.
+
+A timed-out stage keeps its pool thread until its function returns, since
+Python threads cannot be cancelled. Stage functions should therefore put their
+own limit on blocking calls (HTTP timeouts etc.); the number of such threads
+is logged so a saturated pool shows up.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Stage outcomes
+STAGE_OK = "ok"
+STAGE_FAILED = "failed"
+STAGE_TIMEOUT = "timeout"
+
+# Created lazily so each gunicorn worker gets its own pool after fork
+_executor = None
+_executor_lock = threading.Lock()
+
+# Timed-out stages whose threads are still running
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+def _get_executor():
+    """Get (or create) this process's pipeline thread pool."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from config import get_config
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_config().PIPELINE_WORKERS,
+                    thread_name_prefix="pipeline-stage"
+                )
+    return _executor
+
+
+class Stage:
+    """
+    One node of a pipeline.
+
+    Args:
+        name: str - Unique stage name (results are keyed by it)
+        func: callable - Called with the values of its dependencies, in order
+        deps: tuple of str - Stages that must finish first
+        timeout: float - Seconds the stage may run once a pool thread has started it
+                 before the fallback is used; a stage still queued after this
+                 long is dropped as well (None = no limit)
+        fallback: callable - fallback(exception) -> value used on failure or timeout;
+                  without one, a failure is re-raised by run_stages()
+    """
+
+    def __init__(self, name, func, deps=(), timeout=None, fallback=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+
+
+class _StageRun:
+    """One submission of a stage; started is set by the pool thread running it."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = False
+        self.abandoned = False
+
+    def __call__(self, *args):
+        self.started = time.perf_counter()
+        try:
+            return self.stage.func(*args)
+        finally:
+            global _abandoned
+            with _abandoned_lock:
+                self.finished = True
+                if self.abandoned:
+                    _abandoned -= 1
+
+    def deadline(self):
+        """When the stage times out: timeout after it started, or after submission while queued."""
+        if self.stage.timeout is None:
+            return None
+        return (self.started or self.submitted) + self.stage.timeout
+
+    def abandon(self):
+        """Mark a timed-out stage whose thread may still be running. Returns: int - Abandoned threads"""
+        global _abandoned
+        with _abandoned_lock:
+            if not self.finished and not self.abandoned:
+                self.abandoned = True
+                _abandoned += 1
+            return _abandoned
+
+
+def _outcome(stage, status, started, value=None, error=None):
+    if status != STAGE_OK:
+        if stage.fallback is None:
+            raise error
+        logger.warning(f"Pipeline stage '{stage.name}' {status}: {error}; using fallback")
+        value = stage.fallback(error)
+
+    return {"status": status, "value": value, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def run_stages(stages):
+    """
+    Run a stage graph to completion.
+
+    Stages start as soon as all their dependencies have finished. A stage's
+    timeout is measured from when a pool thread starts it, so time spent queued
+    behind other requests doesn't count (a stage that is never started within
+    its timeout is cancelled). A stage that times out gets its fallback value
+    immediately; its thread is left to finish in the background.
+
+    Args:
+        stages: list of Stage
+
+    Returns:
+        dict: stage name -> {status: "ok" | "failed" | "timeout", value, seconds}
+
+    Raises:
+        ValueError - Unknown dependencies or a dependency cycle
+        Exception - The error of a failed or timed-out stage that has no fallback
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+    executor = _get_executor()
+    results = {}
+    running = {}   # future -> _StageRun
+    waiting = list(stages)
+
+    def submit_ready():
+        for stage in [s for s in waiting if all(dep in results for dep in s.deps)]:
+            waiting.remove(stage)
+            args = [results[dep]["value"] for dep in stage.deps]
+            run = _StageRun(stage)
+            running[executor.submit(run, *args)] = run
+
+    try:
+        submit_ready()
+        while running:
+            deadlines = [run.deadline() for run in running.values() if run.stage.timeout is not None]
+            wait_for = max(0.0, min(deadlines) - time.perf_counter()) if deadlines else None
+            done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                run = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    results[run.stage.name] = _outcome(run.stage, STAGE_OK, run.submitted, value=future.result())
+                else:
+                    results[run.stage.name] = _outcome(run.stage, STAGE_FAILED, run.submitted, error=error)
+
+            now = time.perf_counter()
+            for future, run in list(running.items()):
+                deadline = run.deadline()
+                if deadline is not None and now >= deadline:
+                    running.pop(future)
+                    if not future.cancel():
+                        abandoned = run.abandon()
+                        logger.warning(f"Pipeline stage '{run.stage.name}' timed out; "
+                                       f"{abandoned} timed-out stage thread(s) still running")
+                    error = TimeoutError(f"Stage '{run.stage.name}' exceeded {run.stage.timeout}s")
+                    results[run.stage.name] = _outcome(run.stage, STAGE_TIMEOUT, run.submitted, error=error)
+
+            submit_ready()
+
+        if waiting:
+            raise ValueError(f"Pipeline has a dependency cycle: {[s.name for s in waiting]}")
+    finally:
+        # On an unhandled failure, don't start work nobody will read
+        for future in running:
+            future.cancel()
+
+    return results
@@ -0,0 +1,456 @@
+# services_pool_refill.py
+"""
+Predictive challenge pool refill.
+
+Manual refills (/admin/refill-pool, jobs/generate_pool_challenges.py) use a fixed
+minimum, so popular levels run dry between runs. This scheduler refills ahead
+of demand instead:
+- Every mark_challenge_used() call is counted per (cefr_level, type) in
+  memory; the scheduler thread adds the counts to an hourly usage document
+  (pool_usage/<YYYYMMDDHH>) every POOL_USAGE_FLUSH_SECONDS
+- Drain rate = uses per hour over POOL_USAGE_WINDOW_HOURS / ARCHIVE_THRESHOLD
+  (a challenge leaves the pool after that many uses)
+- Time to empty = available challenges / drain rate
+- Each group is topped up to max(POOL_MIN_AVAILABLE, POOL_BUFFER_HOURS of drain),
+  most urgent group first
+
+It stays out of the way of interactive Ollama traffic (IRL text analysis):
+- One generation request in flight (POOL_REFILL_PER_REQUEST challenges each)
+- At most POOL_REFILL_MAX_PER_CYCLE challenges per cycle, one cycle per
+  POOL_REFILL_INTERVAL
+- Before each request, the rest of the cycle is deferred unless no interactive
+  call was made on this host for POOL_REFILL_QUIET_SECONDS
+
+Every worker starts the scheduler thread (see post_fork in gunicorn_config.py),
+but a cycle only runs in the worker holding the Firestore lease, so replicas
+don't refill the same groups twice. An empty pool seen by any worker is
+flagged on the lease document, which the holder checks on every flush.
+"""
+import atexit
+import logging
+import math
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+USAGE_COLLECTION = "pool_usage"
+LEASE_COLLECTION = "scheduler_leases"
+LEASE_DOCUMENT = "pool_refill"
+
+# Types the generator can produce (IRL challenges are written by hand)
+GENERATED_TYPES = ["pronunciation", "listening", "fill_blank", "multiple_choice"]
+
+MIN_CYCLE_GAP = 60  # Seconds; wakeups (notify_pool_empty) never run cycles closer than this
+
+_lock = threading.Lock()
+_thread = None
+_wake = threading.Event()
+_last_refill_request = 0.0  # monotonic time this process last flagged an empty pool
+
+# Uses not yet written: hour id -> {(cefr_level, type): count}
+_usage_buffer = {}
+_usage_lock = threading.Lock()
+_state = {
+    "running": False,
+    "last_cycle": None,
+    "cycles": 0,
+    "generated": 0,
+    "saved": 0,
+    "deferred_cycles": 0
+}
+
+
+def _hour_id(moment):
+    return moment.strftime("%Y%m%d%H")
+
+
+def record_pool_usage(cefr_level, challenge_type, count=1):
+    """
+    Count uses of pool challenges for the drain-rate forecast.
+    With the scheduler running, the count is only buffered in memory (see
+    flush_pool_usage); otherwise (scripts, POOL_REFILL_ENABLED off) it is
+    written right away. Failures are logged, never raised: usage tracking
+    must not break submissions.
+
+    Args:
+        cefr_level: str - CEFR level of the used challenge
+        challenge_type: str - Type of the used challenge
+        count: int - Number of uses
+    """
+    if not cefr_level or not challenge_type:
+        return
+
+    hour = _hour_id(datetime.now(timezone.utc))
+    with _usage_lock:
+        counts = _usage_buffer.setdefault(hour, {})
+        counts[(cefr_level, challenge_type)] = counts.get((cefr_level, challenge_type), 0) + count
+
+    if _thread is None:
+        flush_pool_usage()
+
+
+def flush_pool_usage():
+    """
+    Add the buffered usage counts to their hourly usage documents (one write
+    per hour). Counts that fail to write stay buffered for the next flush.
+
+    Returns:
+        int - Uses written
+    """
+    from firebase_admin import firestore
+    from firebase_config import db
+
+    with _usage_lock:
+        pending = dict(_usage_buffer)
+        _usage_buffer.clear()
+
+    written = 0
+    for hour, counts in pending.items():
+        uses = {}
+        for (level, challenge_type), count in counts.items():
+            uses.setdefault(level, {})[challenge_type] = firestore.Increment(count)
+        try:
+            db.collection(USAGE_COLLECTION).document(hour).set({
+                "hour": datetime.strptime(hour, "%Y%m%d%H").replace(tzinfo=timezone.utc),
+                "uses": uses
+            }, merge=True)
+            written += sum(counts.values())
+        except Exception as e:
+            logger.warning(f"Could not record pool usage for hour {hour}: {e}")
+            with _usage_lock:
+                buffered = _usage_buffer.setdefault(hour, {})
+                for key, count in counts.items():
+                    buffered[key] = buffered.get(key, 0) + count
+    return written
+
+
+def get_usage_rates(window_hours=None):
+    """
+    Average uses per hour of each (cefr_level, type) over the last window_hours.
+
+    Args:
+        window_hours: int - Hours of history (default: POOL_USAGE_WINDOW_HOURS)
+
+    Returns:
+        dict: (cefr_level, type) -> uses per hour
+    """
+    from config import get_config
+    from firebase_config import db
+
+    window_hours = window_hours or get_config().POOL_USAGE_WINDOW_HOURS
+    now = datetime.now(timezone.utc)
+    refs = [
+        db.collection(USAGE_COLLECTION).document(_hour_id(now - timedelta(hours=h)))
+        for h in range(window_hours)
+    ]
+
+    totals = {}
+    for snapshot in db.get_all(refs):
+        if not snapshot.exists:
+            continue
+        for level, by_type in (snapshot.to_dict().get("uses") or {}).items():
+            for challenge_type, uses in by_type.items():
+                key = (level, challenge_type)
+                totals[key] = totals.get(key, 0) + uses
+
+    return {key: uses / window_hours for key, uses in totals.items()}
+
+
+def get_available_counts():
+    """
+    Available pool challenges per (cefr_level, type) (cached count queries).
+
+    Returns:
+        dict: (cefr_level, type) -> int
+    """
+    from services_challenge_pool import count_pool_challenges_many, CEFR_LEVELS
+
+    keys = [("available", level, challenge_type) for level in CEFR_LEVELS for challenge_type in GENERATED_TYPES]
+    counts = count_pool_challenges_many(keys)
+    return {(level, challenge_type): count for (_, level, challenge_type), count in counts.items()}
+
+
+def forecast_pool():
+    """
+    Drain forecast and refill need for every (cefr_level, type), most urgent first.
+
+    Returns:
+        list of dict: {
+            cefr_level, type,
+            available: int,
+            uses_per_hour: float,
+            drain_per_hour: float - Challenges archived per hour,
+            hours_to_empty: float | None - None when nothing drains,
+            target: int - Available count to keep,
+            needed: int - Challenges to generate to reach target
+        }
+    """
+    from config import get_config
+    from services_challenge_pool import ARCHIVE_THRESHOLD
+
+    cfg = get_config()
+    rates = get_usage_rates()
+    available_counts = get_available_counts()
+
+    forecast = []
+    for (level, challenge_type), available in available_counts.items():
+        uses_per_hour = rates.get((level, challenge_type), 0.0)
+        drain = uses_per_hour / ARCHIVE_THRESHOLD
+        target = max(cfg.POOL_MIN_AVAILABLE, math.ceil(drain * cfg.POOL_BUFFER_HOURS))
+        forecast.append({
+            "cefr_level": level,
+            "type": challenge_type,
+            "available": available,
+            "uses_per_hour": round(uses_per_hour, 2),
+            "drain_per_hour": round(drain, 3),
+            "hours_to_empty": round(available / drain, 1) if drain > 0 else None,
+            "target": target,
+            "needed": max(0, target - available)
+        })
+
+    forecast.sort(key=lambda g: (
+        g["hours_to_empty"] if g["hours_to_empty"] is not None else math.inf,
+        -g["needed"]
+    ))
+    return forecast
+
+
+def _acquire_lease(ttl):
+    """Take or renew the scheduler lease. Returns True if this process holds it."""
+    from firebase_admin import firestore
+    from firebase_config import db
+
+    ref = db.collection(LEASE_COLLECTION).document(LEASE_DOCUMENT)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    @firestore.transactional
+    def take(transaction):
+        snapshot = ref.get(transaction=transaction)
+        lease = snapshot.to_dict() if snapshot.exists else {}
+        now = time.time()
+        if lease.get("owner") not in (None, owner) and lease.get("expires_at", 0) > now:
+            return False
+        transaction.set(ref, {"owner": owner, "expires_at": now + ttl})
+        return True
+
+    return take(db.transaction())
+
+
+def _refill_requested():
+    """
+    Whether another worker flagged an empty pool that this process should act
+    on: it holds the lease, or the lease has expired. Taking the lease (the
+    start of every cycle) rewrites the document and so clears the flag.
+    """
+    from firebase_config import db
+
+    snapshot = db.collection(LEASE_COLLECTION).document(LEASE_DOCUMENT).get()
+    lease = snapshot.to_dict() if snapshot.exists else {}
+    if not lease.get("refill_requested"):
+        return False
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    return lease.get("owner") == owner or lease.get("expires_at", 0) <= time.time()
+
+
+def _ollama_quiet():
+    from config import get_config
+    from services_ollama import interactive_idle_seconds
+    return interactive_idle_seconds() >= get_config().POOL_REFILL_QUIET_SECONDS
+
+
+def _generate_into_pool(cefr_level, challenge_type, count):
+    """Generate count challenges of one group in a single request and add them to the pool."""
+    from services_ai_generation import generate_challenges_concurrently, CEFR_TO_DIFFICULTY
+    from services_challenge_pool import add_to_pool
+
+    difficulty = CEFR_TO_DIFFICULTY.get(cefr_level, 1)
+    specs = [
+        {"type": challenge_type, "difficulty": difficulty, "topic": None, "frequency": "daily"}
+        for _ in range(count)
+    ]
+    batch = generate_challenges_concurrently(specs, per_prompt=count)
+
+    challenges = [
+        {**challenge, "cefr_level": cefr_level, "generated_by": "refill_scheduler"}
+        for challenge in batch["challenges"]
+    ]
+    saved_ids = add_to_pool(challenges, near_duplicates=True) if challenges else []
+    return len(challenges), len(saved_ids)
+
+
+def run_refill_cycle(dry_run=False):
+    """
+    Forecast the pool and generate challenges for groups below their target.
+
+    Args:
+        dry_run: bool - Only return the forecast and plan (no lease, no generation)
+
+    Returns:
+        dict: {
+            started_at, seconds,
+            forecast: list - See forecast_pool,
+            planned: list of {cefr_level, type, count},
+            generated: int, saved: int,
+            deferred: str | None - Why the cycle stopped early
+        }
+    """
+    from config import get_config
+
+    cfg = get_config()
+    start = time.perf_counter()
+    result = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "forecast": [],
+        "planned": [],
+        "generated": 0,
+        "saved": 0,
+        "deferred": None
+    }
+
+    if not dry_run and not _acquire_lease(cfg.POOL_REFILL_INTERVAL * 2 + MIN_CYCLE_GAP):
+        result["deferred"] = "lease held by another worker"
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        return result
+
+    result["forecast"] = forecast_pool()
+
+    budget = cfg.POOL_REFILL_MAX_PER_CYCLE
+    for group in result["forecast"]:
+        if budget <= 0:
+            break
+        if group["needed"]:
+            count = min(group["needed"], budget)
+            result["planned"].append({"cefr_level": group["cefr_level"], "type": group["type"], "count": count})
+            budget -= count
+
+    if not dry_run:
+        per_request = max(1, cfg.POOL_REFILL_PER_REQUEST)
+        for job in result["planned"]:
+            remaining = job["count"]
+            while remaining > 0:
+                if not _ollama_quiet():
+                    result["deferred"] = "interactive Ollama traffic"
+                    break
+                count = min(remaining, per_request)
+                try:
+                    generated, saved = _generate_into_pool(job["cefr_level"], job["type"], count)
+                except Exception as e:
+                    logger.error(f"Refill of {job['cefr_level']}/{job['type']} failed: {e}")
+                    break
+                result["generated"] += generated
+                result["saved"] += saved
+                remaining -= count
+            if result["deferred"]:
+                break
+
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    if not dry_run:
+        deferred = f" (deferred: {result['deferred']})" if result["deferred"] else ""
+        logger.info(
+            f"Pool refill cycle: planned {sum(job['count'] for job in result['planned'])}, "
+            f"generated {result['generated']}, saved {result['saved']} in {result['seconds']}s{deferred}"
+        )
+    return result
+
+
+def _scheduler_loop():
+    from config import get_config
+
+    cfg = get_config()
+    interval = cfg.POOL_REFILL_INTERVAL
+    last_cycle = 0.0
+    # Jitter spreads workers' lease attempts
+    next_cycle = time.monotonic() + interval * random.uniform(0.9, 1.1)
+    while True:
+        woken = _wake.wait(timeout=max(0.0, min(cfg.POOL_USAGE_FLUSH_SECONDS, next_cycle - time.monotonic())))
+        _wake.clear()
+
+        flush_pool_usage()
+        if not woken and time.monotonic() < next_cycle:
+            try:
+                if not _refill_requested():
+                    continue
+            except Exception as e:
+                logger.warning(f"Could not check for refill requests: {e}")
+                continue
+
+        gap = time.monotonic() - last_cycle
+        if gap < MIN_CYCLE_GAP:
+            time.sleep(MIN_CYCLE_GAP - gap)
+        last_cycle = time.monotonic()
+        next_cycle = last_cycle + interval * random.uniform(0.9, 1.1)
+
+        try:
+            cycle = run_refill_cycle()
+        except Exception as e:
+            logger.error(f"Pool refill cycle failed: {e}")
+            continue
+
+        with _lock:
+            _state["last_cycle"] = {k: v for k, v in cycle.items() if k != "forecast"}
+            _state["cycles"] += 1
+            _state["generated"] += cycle["generated"]
+            _state["saved"] += cycle["saved"]
+            if cycle["deferred"]:
+                _state["deferred_cycles"] += 1
+
+
+def start_refill_scheduler():
+    """Start the refill scheduler in a background daemon thread (once per process, if POOL_REFILL_ENABLED)."""
+    global _thread
+    from config import get_config
+
+    if not get_config().POOL_REFILL_ENABLED:
+        return
+
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_scheduler_loop, name="pool-refill", daemon=True)
+        _state["running"] = True
+    _thread.start()
+    # Don't lose the last buffered counts when the worker shuts down
+    atexit.register(flush_pool_usage)
+
+
+def notify_pool_empty(challenge_type):
+    """
+    Run the next refill cycle early (a user was served no challenges of this type).
+    The lease holder is usually another worker, so the request is flagged on
+    the lease document (at most once per MIN_CYCLE_GAP per process) as well
+    as waking this process's scheduler.
+    """
+    global _last_refill_request
+    if _thread is None or challenge_type not in GENERATED_TYPES:
+        return
+
+    _wake.set()
+    with _lock:
+        if time.monotonic() - _last_refill_request < MIN_CYCLE_GAP:
+            return
+        _last_refill_request = time.monotonic()
+
+    from firebase_config import db
+    try:
+        db.collection(LEASE_COLLECTION).document(LEASE_DOCUMENT).set({
+            "refill_requested": True,
+            "refill_requested_type": challenge_type
+        }, merge=True)
+    except Exception as e:
+        logger.warning(f"Could not request an early pool refill: {e}")
+
+
+def get_refill_scheduler_status():
+    """
+    Refill scheduler state of this process.
+
+    Returns:
+        dict: {running, last_cycle, cycles, generated, saved, deferred_cycles}
+    """
+    with _lock:
+        return dict(_state)
@@ -5,12 +5,27 @@ Handles speech-to-text transcription and accuracy scoring.
 """
 import os
 import requests
-from difflib import SequenceMatcher
 import re
 import tempfile
+import threading
 
 # Global variable for lazy-loaded Whisper model
 _whisper_model = None
+_whisper_load_lock = threading.Lock()
+
+# One Whisper inference at a time per process: the decoder's key/value cache is
+# installed as forward hooks on the shared model, so overlapping decodes (job
+# pool, request, pipeline and warmup threads) would overwrite each other's cache
+_whisper_inference_lock = threading.Lock()
+
+# Model sizes that are practical for CPU inference
+WHISPER_MODEL_SIZES = ("tiny", "base", "small")
+
+# Bump when normalize_text(), the G2P rules or the stored fields change so backfills re-run
+SCORING_FIELDS_VERSION = 4
+
+# Scoring modes (PRONUNCIATION_SCORING in config.py)
+SCORING_MODES = ("text", "phonetic")
 
 
 def normalize_text(text):
@@ -29,26 +44,147 @@ def normalize_text(text):
     return text.lower().strip()
 
 
-def calculate_similarity(transcription, target):
+def precompute_target_fields(target):
+    """
+    Precompute the target-side scoring fields stored on each challenge, so
+    evaluation only has to normalize the transcription.
+
+    Args:
+        target: str - Target phrase of a pronunciation challenge
+
+    Returns:
+        dict with keys:
+            - target_normalized: str - normalize_text(target)
+            - target_phonemes: list of str - G2P phoneme sequence
+            - scoring_fields_version: int
+    """
+    from services_phonetics import text_to_phonemes
+
+    normalized = normalize_text(target)
+    return {
+        "target_normalized": normalized,
+        "target_phonemes": text_to_phonemes(normalized),
+        "scoring_fields_version": SCORING_FIELDS_VERSION
+    }
+
+
+def with_scoring_fields(challenge):
+    """
+    Return a copy of a challenge with precomputed scoring fields added.
+    Challenges without a target phrase are returned unchanged.
+
+    Args:
+        challenge: dict - Challenge data
+
+    Returns:
+        dict - Challenge data (copy) ready to store
+    """
+    if not challenge.get("target"):
+        return challenge
+    return {**challenge, **precompute_target_fields(challenge["target"])}
+
+
+def _has_current_fields(challenge):
+    return bool(challenge) and challenge.get("scoring_fields_version") == SCORING_FIELDS_VERSION
+
+
+def _normalized_target(target, challenge=None):
+    """Use the challenge's stored normalized target when it is current."""
+    if _has_current_fields(challenge) and challenge.get("target_normalized") is not None:
+        return challenge["target_normalized"]
+    return normalize_text(target)
+
+
+def _target_phonemes(normalized_target, challenge=None):
+    """Use the challenge's stored phonemes when they are current."""
+    from services_phonetics import text_to_phonemes
+
+    if _has_current_fields(challenge) and challenge.get("target_phonemes") is not None:
+        return challenge["target_phonemes"]
+    return text_to_phonemes(normalized_target)
+
+
+def get_scoring_mode():
+    """Read PRONUNCIATION_SCORING from the active configuration."""
+    from config import get_config
+
+    mode = get_config().PRONUNCIATION_SCORING
+    if mode not in SCORING_MODES:
+        raise ValueError(f"Unsupported pronunciation scoring mode: {mode}")
+    return mode
+
+
+def _score(normalized_transcription, normalized_target, challenge=None, mode=None):
+    """Similarity between normalized texts in the given (or configured) mode."""
+    from services_scoring import similarity_ratio
+    from services_phonetics import text_to_phonemes, phonetic_similarity
+
+    if (mode or get_scoring_mode()) == "phonetic":
+        return phonetic_similarity(
+            text_to_phonemes(normalized_transcription),
+            _target_phonemes(normalized_target, challenge)
+        )
+
+    # Character-level SequenceMatcher ratio
+    return similarity_ratio(normalized_transcription, normalized_target)
+
+
+def calculate_similarity(transcription, target, challenge=None, mode=None):
     """
     Calculate similarity between transcription and target text.
 
     Args:
         transcription: str - What the user said
         target: str - What they should have said
+        challenge: dict - Optional challenge with precomputed target fields
+        mode: str - "text" or "phonetic" (default: PRONUNCIATION_SCORING)
 
     Returns:
         float - Similarity score between 0 and 1
     """
+    return _score(normalize_text(transcription), _normalized_target(target, challenge), challenge, mode)
+
+
+def align_pronunciation(transcription, target, challenge=None, mode=None):
+    """
+    Align transcription and target at character and word level.
+
+    In phonetic mode the similarity is phoneme-based, and words that were
+    transcribed with a different spelling but the same pronunciation
+    (e.g. "kjøre"/"tjøre") are not reported as missed.
+
+    Args:
+        transcription: str - What the user said
+        target: str - What they should have said
+        challenge: dict - Optional challenge with precomputed target fields
+        mode: str - "text" or "phonetic" (default: PRONUNCIATION_SCORING)
+
+    Returns:
+        dict - similarity, per-word alignment, missed_words and extra_words
+               (see services_scoring.score_alignment)
+    """
+    from services_scoring import score_alignment, WORD_SUBSTITUTED
+    from services_phonetics import word_to_phonemes
+
+    mode = mode or get_scoring_mode()
     normalized_transcription = normalize_text(transcription)
-    normalized_target = normalize_text(target)
+    normalized_target = _normalized_target(target, challenge)
+
+    alignment = score_alignment(normalized_transcription, normalized_target)
+
+    if mode == "phonetic":
+        alignment["similarity"] = _score(normalized_transcription, normalized_target, challenge, mode)
+        alignment["missed_words"] = [
+            w["word"] for w in alignment["words"]
+            if w["status"] != "correct" and not (
+                w["status"] == WORD_SUBSTITUTED and word_to_phonemes(w["heard"]) == word_to_phonemes(w["word"])
+            )
+        ]
 
-    # Use SequenceMatcher for similarity calculation
-    similarity = SequenceMatcher(None, normalized_transcription, normalized_target).ratio()
-    return similarity
+    return alignment
 
 
-def generate_feedback(similarity, transcription, target):
+def generate_feedback(similarity, transcription, target, alignment=None):
     """
     Generate helpful feedback based on pronunciation accuracy.
 
@@ -56,18 +192,23 @@ def generate_feedback(similarity, transcription, target):
         similarity: float - Similarity score (0-1)
         transcription: str - What the user said
         target: str - What they should have said
+        alignment: dict - Optional result of align_pronunciation(); when given,
+                   feedback names the target words that were missed
 
     Returns:
         str - Feedback message
     """
+    missed_words = alignment.get("missed_words", []) if alignment else []
+    practice_hint = f" Practice: {', '.join(missed_words)}." if missed_words else ""
+
     if similarity >= 0.95:
         return "Perfect pronunciation! Excellent job! 🎉"
     elif similarity >= 0.85:
-        return "Great pronunciation! Just minor differences."
+        return "Great pronunciation! Just minor differences." + practice_hint
     elif similarity >= 0.70:
-        return "Good effort! Keep practicing for better clarity."
+        return "Good effort! Keep practicing for better clarity." + practice_hint
     elif similarity >= 0.50:
-        return "You're getting there. Focus on pronouncing each word clearly."
+        return "You're getting there. Focus on pronouncing each word clearly." + practice_hint
     else:
         # Provide specific feedback
         normalized_transcription = normalize_text(transcription)
@@ -76,7 +217,7 @@ def generate_feedback(similarity, transcription, target):
         if normalized_transcription == "":
             return "We couldn't detect clear speech. Try speaking louder and more clearly."
 
-        return f"Try again. We heard: '{transcription}'. Target: '{target}'"
+        return f"Try again. We heard: '{transcription}'. Target: '{target}'" + practice_hint
 
 
 def calculate_xp(similarity, difficulty=1):
@@ -113,28 +254,276 @@ def calculate_xp(similarity, difficulty=1):
     return int(xp * multiplier)
 
 
+def get_whisper_settings():
+    """
+    Read the Whisper backend settings from the active configuration.
+
+    Returns:
+        dict with keys: model_size, quantize_int8, decoding, beam_size,
+        fast_scoring, fast_token_margin, target_conditioning
+    """
+    from config import get_config
+
+    cfg = get_config()
+    return {
+        "model_size": cfg.WHISPER_MODEL_SIZE,
+        "quantize_int8": cfg.WHISPER_QUANTIZE_INT8,
+        "decoding": cfg.WHISPER_DECODING,
+        "beam_size": cfg.WHISPER_BEAM_SIZE,
+        "fast_scoring": cfg.WHISPER_FAST_SCORING,
+        "fast_token_margin": cfg.WHISPER_FAST_TOKEN_MARGIN,
+        "target_conditioning": cfg.WHISPER_TARGET_CONDITIONING
+    }
+
+
+def _quantize_linear_layers(model):
+    """
+    Apply dynamic int8 quantization to every linear layer of a Whisper model.
+
+    Whisper wraps nn.Linear in its own subclass (it only adds a dtype cast,
+    which is a no-op in fp32), and torch's dynamic quantization matches on the
+    exact module type, so the layers are downcast to nn.Linear first.
+    """
+    import torch
+    import whisper.model
+
+    for module in model.modules():
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_whisper_backend(model_size="base", quantize_int8=False):
+    """
+    Load a CPU Whisper backend. The torch thread count is set separately
+    (see services_warmup.apply_torch_thread_budget).
+
+    Args:
+        model_size: str - "tiny", "base" or "small"
+        quantize_int8: bool - Quantize linear layers to int8 (faster, smaller)
+
+    Returns:
+        whisper.Whisper - Loaded model
+    """
+    import whisper
+
+    if model_size not in WHISPER_MODEL_SIZES:
+        raise ValueError(f"Unsupported Whisper model size: {model_size}")
+
+    model = whisper.load_model(model_size, device="cpu")
+    if quantize_int8:
+        model = _quantize_linear_layers(model)
+    model.eval()
+    return model
+
+
+def get_decode_options(decoding="greedy", beam_size=5):
+    """
+    Build Whisper decode options for a decoding strategy.
+
+    Args:
+        decoding: str - "greedy" or "beam"
+        beam_size: int - Beam width when decoding == "beam"
+
+    Returns:
+        dict - Keyword arguments for model.transcribe()
+    """
+    # fp16 is not supported on CPU; setting it explicitly avoids a warning per call
+    options = {"fp16": False}
+
+    if decoding == "beam":
+        options["beam_size"] = beam_size
+        options["best_of"] = beam_size
+    elif decoding != "greedy":
+        raise ValueError(f"Unsupported Whisper decoding strategy: {decoding}")
+
+    return options
+
+
 def get_whisper_model():
     """
     Lazy-load the Whisper model (only loads once, stays in memory).
-    Uses 'base' model - good balance of speed and accuracy.
-    Other options: 'tiny' (fastest), 'small', 'medium', 'large' (most accurate)
+    Model size and int8 quantization come from config.py
+    (WHISPER_MODEL_SIZE, WHISPER_QUANTIZE_INT8); threads from TORCH_NUM_THREADS.
     """
     global _whisper_model
     if _whisper_model is None:
-        import whisper
-        print("Loading Whisper model (this may take a moment on first run)...")
-        # 'base' is a good balance. Use 'tiny' for faster but less accurate
-        _whisper_model = whisper.load_model("base")
-        print("Whisper model loaded!")
+        with _whisper_load_lock:
+            if _whisper_model is None:
+                from services_warmup import apply_torch_thread_budget
+
+                settings = get_whisper_settings()
+                threads = apply_torch_thread_budget()
+                print(f"Loading Whisper model '{settings['model_size']}' "
+                      f"(int8={settings['quantize_int8']}, threads={threads})...")
+                _whisper_model = load_whisper_backend(
+                    model_size=settings["model_size"],
+                    quantize_int8=settings["quantize_int8"]
+                )
+                print("Whisper model loaded!")
     return _whisper_model
 
 
-def transcribe_audio_whisper(audio_url):
+def whisper_transcribe(model, audio, **decode_options):
+    """
+    model.transcribe() in Norwegian, serialized with every other Whisper
+    inference in this process.
+
+    Returns:
+        dict - Whisper's transcription result
+    """
+    with _whisper_inference_lock:
+        return model.transcribe(audio, language="no", **decode_options)  # "no" for Norwegian
+
+
+class _TargetDivergenceFilter:
+    """
+    Whisper logit filter that ends decoding once the hypothesis has clearly
+    left the target phrase.
+
+    When more generated tokens fall outside the target's token set than the
+    allowed budget, every logit except end-of-text is masked so the decoder
+    stops on the next step instead of running to the token cap.
+    """
+
+    def __init__(self, target_tokens, sample_begin, eot, max_misses):
+        self.target_tokens = set(target_tokens)
+        self.sample_begin = sample_begin
+        self.eot = eot
+        self.max_misses = max_misses
+
+    def apply(self, logits, tokens):
+        for row, sequence in enumerate(tokens[:, self.sample_begin:].tolist()):
+            misses = sum(1 for token in sequence if token not in self.target_tokens)
+            if misses > self.max_misses:
+                eot_logit = logits[row, self.eot].clone()
+                logits[row, :] = float("-inf")
+                logits[row, self.eot] = eot_logit
+
+
+def _decode_with_target(model, audio, target_phrase, token_margin=10, condition_on_target=False):
+    """
+    Fast scoring decode: a single greedy pass capped at the target's length.
+
+    Compared to model.transcribe(), this skips the temperature fallback loop and
+    caps the output at the target's token count plus a margin.
+
+    With condition_on_target, the target is also fed as the decoder prompt and
+    decoding stops early once the hypothesis diverges. Both pull the transcript
+    toward the target, so wrong recordings score higher; keep it off unless
+    benchmarks/benchmark_target_conditioning.py shows no inflation on known-wrong
+    recordings.
+
+    Args:
+        model: whisper.Whisper - Loaded model
+        audio: np.ndarray - Trimmed 16 kHz audio
+        target_phrase: str - Expected phrase
+        token_margin: int - Extra tokens allowed beyond the target length
+        condition_on_target: bool - Prompt with the target and stop on divergence
+
+    Returns:
+        str - Transcribed text, or None if the audio is too long for one window
+    """
+    import whisper
+    from whisper.decoding import DecodingOptions, DecodingTask
+    from whisper.tokenizer import get_tokenizer
+
+    if len(audio) > whisper.audio.N_SAMPLES:
+        return None
+
+    tokenizer = get_tokenizer(
+        model.is_multilingual,
+        num_languages=model.num_languages,
+        language="no",
+        task="transcribe"
+    )
+    target_tokens = tokenizer.encode(" " + target_phrase.strip())
+    sample_len = min(len(target_tokens) + token_margin, model.dims.n_text_ctx // 2)
+
+    options = DecodingOptions(
+        task="transcribe",
+        language="no",
+        temperature=0.0,
+        sample_len=sample_len,
+        prompt=target_phrase if condition_on_target else None,
+        without_timestamps=True,
+        fp16=False
+    )
+    task = DecodingTask(model, options)
+    if condition_on_target:
+        task.logit_filters.append(_TargetDivergenceFilter(
+            target_tokens,
+            task.sample_begin,
+            tokenizer.eot,
+            max_misses=max(3, len(target_tokens) // 2)
+        ))
+
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+    with _whisper_inference_lock:
+        result = task.run(mel.unsqueeze(0))[0]
+    return result.text.strip()
+
+
+def _transcribe_file(file_path, model=None, decode_options=None, target_phrase=None):
+    """
+    Trim silence from a local audio file and transcribe the remaining speech.
+
+    Args:
+        file_path: str - Path to a local audio file
+        model: whisper.Whisper - Model to use (default: configured model)
+        decode_options: dict - Decode options (default: configured strategy)
+        target_phrase: str - Expected phrase, enables fast scoring when configured
+
+    Returns:
+        str - Transcribed text ("" if no speech was detected)
+    """
+    from services_audio import load_audio, trim_silence
+
+    try:
+        samples = load_audio(file_path)
+    except RuntimeError as e:
+        # ffmpeg could not decode it (empty or corrupt upload): treat it like a recording without speech
+        print(f"Could not decode audio {file_path}: {e}")
+        return ""
+
+    audio = trim_silence(samples)
+    if audio is None:
+        # Silent or empty recording - don't spend a Whisper inference on it
+        return ""
+
+    if model is None:
+        model = get_whisper_model()
+
+    if decode_options is None:
+        settings = get_whisper_settings()
+
+        if target_phrase and settings["fast_scoring"]:
+            text = _decode_with_target(
+                model,
+                audio,
+                target_phrase,
+                settings["fast_token_margin"],
+                condition_on_target=settings["target_conditioning"]
+            )
+            if text is not None:
+                return text
+
+        decode_options = get_decode_options(settings["decoding"], settings["beam_size"])
+
+    result = whisper_transcribe(model, audio, **decode_options)
+    return result["text"].strip()
+
+
+def transcribe_audio_whisper(audio_url, target_phrase=None):
     """
     Transcribe audio using local Whisper model (FREE, no API costs).
+    Leading/trailing silence is trimmed first; recordings without speech
+    return an empty string without running the model.
 
     Args:
         audio_url: str - URL or file path to audio file
+        target_phrase: str - Expected phrase (used by WHISPER_FAST_SCORING)
 
     Returns:
         str - Transcribed text
@@ -142,16 +531,13 @@ def transcribe_audio_whisper(audio_url):
     Raises:
         Exception if transcription fails
     """
-    model = get_whisper_model()
-
     # If audio_url is a local file path
     if audio_url.startswith("file://") or not audio_url.startswith("http"):
         # Remove file:// prefix if present
         file_path = audio_url.replace("file://", "")
 
         # Transcribe directly from file
-        result = model.transcribe(file_path, language="no")  # "no" for Norwegian
-        return result["text"].strip()
+        return _transcribe_file(file_path, target_phrase=target_phrase)
     else:
         # If it's a URL (e.g., Firebase Storage), download first
         audio_response = requests.get(audio_url)
@@ -164,14 +550,13 @@ def transcribe_audio_whisper(audio_url):
 
         try:
             # Transcribe from temp file
-            result = model.transcribe(tmp_path, language="no")  # "no" for Norwegian
-            return result["text"].strip()
+            return _transcribe_file(tmp_path, target_phrase=target_phrase)
         finally:
             # Clean up temp file
             os.unlink(tmp_path)
 
 
-def evaluate_pronunciation(audio_url, target_phrase, difficulty=1):
+def evaluate_pronunciation(audio_url, target_phrase, difficulty=1, challenge=None):
     """
     Main function to evaluate pronunciation from audio.
 
@@ -179,6 +564,8 @@ def evaluate_pronunciation(audio_url, target_phrase, difficulty=1):
         audio_url: str - URL to the audio file (from Firebase Storage)
         target_phrase: str - The correct phrase the user should say
         difficulty: int - Challenge difficulty level (1-3)
+        challenge: dict - Optional challenge document; its precomputed
+                   target fields are reused instead of re-normalizing
 
     Returns:
         dict with keys:
@@ -187,13 +574,15 @@ def evaluate_pronunciation(audio_url, target_phrase, difficulty=1):
             - feedback: str - Helpful feedback message
             - pass: bool - Whether the attempt passed (>= 70% similarity)
             - similarity: float - Accuracy score (0-1)
+            - missed_words: list - Target words that were missing or mispronounced
     """
     try:
         # Transcribe the audio
-        transcription = transcribe_audio_whisper(audio_url)
+        transcription = transcribe_audio_whisper(audio_url, target_phrase)
 
-        # Calculate accuracy
-        similarity = calculate_similarity(transcription, target_phrase)
+        # Calculate accuracy (character ratio + word-level alignment)
+        alignment = align_pronunciation(transcription, target_phrase, challenge)
+        similarity = alignment["similarity"]
 
         # Determine if passed (70% threshold)
         passed = similarity >= 0.70
@@ -202,14 +591,15 @@ def evaluate_pronunciation(audio_url, target_phrase, difficulty=1):
         xp_gained = calculate_xp(similarity, difficulty)
 
         # Generate feedback
-        feedback = generate_feedback(similarity, transcription, target_phrase)
+        feedback = generate_feedback(similarity, transcription, target_phrase, alignment)
 
         return {
             "transcription": transcription,
             "xp_gained": xp_gained,
             "feedback": feedback,
             "pass": passed,
-            "similarity": round(similarity, 2)
+            "similarity": round(similarity, 2),
+            "missed_words": alignment["missed_words"]
         }
 
     except Exception as e:
@@ -219,7 +609,8 @@ def evaluate_pronunciation(audio_url, target_phrase, difficulty=1):
             "xp_gained": 0,
             "feedback": f"Error processing audio: {str(e)}",
             "pass": False,
-            "similarity": 0.0
+            "similarity": 0.0,
+            "missed_words": []
         }
 
 
@@ -248,5 +639,6 @@ def mock_evaluate_pronunciation(target_phrase, difficulty=1):
         "xp_gained": xp_gained,
         "feedback": feedback,
         "pass": passed,
-        "similarity": round(similarity, 2)
+        "similarity": round(similarity, 2),
+        "missed_words": []
     }
@@ -0,0 +1,152 @@
+# services_resilience.py
+"""
+Guards for slow local model services (Ollama).
+- ResultCache: thread-safe in-process LRU cache with a TTL and hit/miss counts
+- CircuitBreaker: after repeated slow or failed calls, stop calling the service
+  and use the fallback right away; after a cool-down, let one probe call through
+  (half-open) and close again if it succeeds
+"""
+from collections import OrderedDict
+import threading
+import time
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class ResultCache:
+    """
+    LRU cache with per-entry expiry.
+
+    Args:
+        max_entries: int - Least recently used entries are evicted beyond this
+        ttl_seconds: float - Entries older than this are treated as missing
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None
+            }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Args:
+        name: str - Used in stats
+        failure_threshold: int - Consecutive slow/failed calls that open the breaker
+        reset_seconds: float - Time the breaker stays open before a half-open probe
+        slow_call_seconds: float - Successful calls slower than this count as failures
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_seconds=30, slow_call_seconds=10):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._lock = threading.Lock()
+        self._state = BREAKER_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+
+    def allow_request(self):
+        """
+        Whether a call may go to the service now.
+        While half-open only a single probe call is let through.
+        """
+        with self._lock:
+            if self._state == BREAKER_OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = BREAKER_HALF_OPEN
+                self._probe_in_flight = False
+
+            if self._state == BREAKER_CLOSED:
+                return True
+            if self._state == BREAKER_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self, duration):
+        """Record a completed call; a slow call counts as a failure."""
+        if duration > self.slow_call_seconds:
+            self.record_failure()
+            return
+
+        with self._lock:
+            self._state = BREAKER_CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+
+            if self._state == BREAKER_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != BREAKER_OPEN:
+                    self.trips += 1
+                self._state = BREAKER_OPEN
+                self._opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == BREAKER_OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return BREAKER_HALF_OPEN
+            return self._state
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "trips": self.trips,
+                "rejected": self.rejected
+            }
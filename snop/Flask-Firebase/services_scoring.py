@@ -0,0 +1,162 @@
+# services_scoring.py
+"""
+Pronunciation scoring engine.
+Aligns a transcription against the target phrase at character level (overall
+similarity ratio) and at word level (which target words were said correctly,
+substituted or missed).
+
+The overall ratio is difflib.SequenceMatcher's, which the pass/XP thresholds
+were tuned on. 2 * LCS / (n + m) looks similar but is a different metric: it
+is an upper bound of SequenceMatcher's ratio and scores insertions and
+transpositions much higher (see benchmarks/benchmark_scoring.py).
+"""
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# Word alignment statuses
+WORD_CORRECT = "correct"
+WORD_SUBSTITUTED = "substituted"
+WORD_MISSING = "missing"
+
+# Word alignments up to this many DP cells use plain Python lists; NumPy's
+# per-row overhead only pays off for longer phrases
+SMALL_ALIGNMENT_CELLS = 400
+
+
+def similarity_ratio(a, b):
+    """
+    Character-level similarity in [0, 1] (difflib.SequenceMatcher ratio).
+
+    Args:
+        a: str - First string (already normalized)
+        b: str - Second string (already normalized)
+
+    Returns:
+        float - Similarity ratio
+    """
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def levenshtein_matrix(source, target):
+    """
+    Full Levenshtein DP matrix between two integer sequences.
+
+    Each row is computed with NumPy: deletions and substitutions are a
+    vectorized minimum over the previous row, and the left-to-right insertion
+    chain is resolved with a running minimum (min.accumulate) trick.
+
+    Args:
+        source: np.ndarray - Integer-encoded source sequence
+        target: np.ndarray - Integer-encoded target sequence
+
+    Returns:
+        np.ndarray - (len(source) + 1, len(target) + 1) distance matrix
+    """
+    n, m = len(source), len(target)
+    offsets = np.arange(m + 1, dtype=np.int32)
+
+    matrix = np.empty((n + 1, m + 1), dtype=np.int32)
+    matrix[0] = offsets
+
+    for i in range(1, n + 1):
+        prev = matrix[i - 1]
+        row = matrix[i]
+        row[0] = i
+        substitution = prev[:-1] + (target != source[i - 1])
+        np.minimum(prev[1:] + 1, substitution, out=row[1:])
+        row[:] = np.minimum.accumulate(row - offsets) + offsets
+
+    return matrix
+
+
+def _small_levenshtein_matrix(source, target):
+    """levenshtein_matrix() with Python lists, faster for short sequences."""
+    rows = [list(range(len(target) + 1))]
+    for i, item in enumerate(source, 1):
+        prev = rows[-1]
+        row = [i]
+        for j, other in enumerate(target, 1):
+            row.append(min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (item != other)))
+        rows.append(row)
+    return rows
+
+
+def _encode_words(source_words, target_words):
+    """Map words to integer IDs shared between both sequences."""
+    vocab = {}
+    source = np.array([vocab.setdefault(w, len(vocab)) for w in source_words], dtype=np.int32)
+    target = np.array([vocab.setdefault(w, len(vocab)) for w in target_words], dtype=np.int32)
+    return source, target
+
+
+def align_words(transcription_words, target_words):
+    """
+    Align heard words against target words with a word-level edit distance.
+
+    Args:
+        transcription_words: list of str - Normalized words the user said
+        target_words: list of str - Normalized target words
+
+    Returns:
+        tuple (words, extra_words):
+            words: list of dicts, one per target word, in order:
+                {"word": str, "status": "correct"|"substituted"|"missing", "heard": str|None}
+            extra_words: list of str - Heard words with no counterpart in the target
+    """
+    if (len(transcription_words) + 1) * (len(target_words) + 1) <= SMALL_ALIGNMENT_CELLS:
+        source, target = transcription_words, target_words
+        matrix = _small_levenshtein_matrix(source, target)
+    else:
+        source, target = _encode_words(transcription_words, target_words)
+        matrix = levenshtein_matrix(source, target)
+
+    words = []
+    extra_words = []
+    i, j = len(source), len(target)
+
+    # Backtrace from the bottom-right corner, preferring matches/substitutions
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            if matrix[i][j] == matrix[i - 1][j - 1] + cost:
+                status = WORD_CORRECT if cost == 0 else WORD_SUBSTITUTED
+                words.append({"word": target_words[j - 1], "status": status, "heard": transcription_words[i - 1]})
+                i -= 1
+                j -= 1
+                continue
+        if j > 0 and matrix[i][j] == matrix[i][j - 1] + 1:
+            words.append({"word": target_words[j - 1], "status": WORD_MISSING, "heard": None})
+            j -= 1
+        else:
+            extra_words.append(transcription_words[i - 1])
+            i -= 1
+
+    words.reverse()
+    extra_words.reverse()
+    return words, extra_words
+
+
+def score_alignment(normalized_transcription, normalized_target):
+    """
+    Score a transcription against the target at character and word level.
+
+    Args:
+        normalized_transcription: str - Normalized transcription
+        normalized_target: str - Normalized target phrase
+
+    Returns:
+        dict with keys:
+            - similarity: float - Character-level ratio (0-1)
+            - words: list - Per-target-word alignment (see align_words)
+            - missed_words: list of str - Target words substituted or missing
+            - extra_words: list of str - Heard words not in the target
+    """
+    words, extra_words = align_words(normalized_transcription.split(), normalized_target.split())
+
+    return {
+        "similarity": similarity_ratio(normalized_transcription, normalized_target),
+        "words": words,
+        "missed_words": [w["word"] for w in words if w["status"] != WORD_CORRECT],
+        "extra_words": extra_words
+    }
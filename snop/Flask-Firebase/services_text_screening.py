@@ -0,0 +1,188 @@
+# services_text_screening.py
+"""
+Fast local screening of IRL text responses, run before the LLM.
+
+Scores a text from three cheap signals:
+- Norwegian language ID: character trigram log-likelihood against Norwegian
+  and English frequency tables built from cefr_challenges.json (which holds
+  every challenge in both languages)
+- Length: word count against WORD_COUNT_REQUIREMENTS
+- Topic: overlap with Norwegian words used in challenges on the same topic
+
+Clear passes and clear failures are decided locally; only texts whose score
+lands in the uncertain band are sent to Llama 3.2. A text is never accepted
+locally unless it shares words with the topic and is not mostly repetition
+("jeg jeg jeg jeg jeg" is Norwegian and long enough, but says nothing).
+"""
+from collections import Counter
+import json
+import math
+import os
+import re
+import threading
+
+CHALLENGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cefr_challenges.json")
+
+# Challenge fields by language (mission_description is skipped: English with Norwegian quotes)
+NORWEGIAN_FIELDS = ("title_no", "description_no", "audio_text", "sentence")
+ENGLISH_FIELDS = ("title", "description", "hint", "prompt")
+
+# Screening decisions
+DECISION_ACCEPT = "accept"
+DECISION_REJECT = "reject"
+DECISION_UNCERTAIN = "uncertain"
+
+# Weights of the local score (0-100)
+LANGUAGE_WEIGHT = 50
+LENGTH_WEIGHT = 35
+TOPIC_WEIGHT = 15
+
+# Average per-trigram log-likelihood ratio that maps to ~73% Norwegian
+LANGUAGE_SCALE = 0.5
+
+# Topic words shorter than this are mostly function words
+MIN_TOPIC_WORD_LENGTH = 4
+
+# Distinct words / total words below this is filler, never accepted locally
+MIN_UNIQUE_WORD_RATIO = 0.6
+
+_NON_LETTERS = re.compile(r"[^a-zæøåéèêóòôü]+")
+
+_profiles = None
+_profiles_lock = threading.Lock()
+
+
+def _letters_only(text):
+    return _NON_LETTERS.sub(" ", text.lower()).strip()
+
+
+def char_trigrams(text):
+    """Character trigrams of each word, padded with spaces (" hei " -> " he", "hei", "ei ")."""
+    trigrams = []
+    for word in _letters_only(text).split():
+        padded = f" {word} "
+        trigrams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def _log_probabilities(counter):
+    """Add-one smoothed log-probabilities, plus the log-probability of an unseen trigram."""
+    total = sum(counter.values()) + len(counter) + 1
+    return {gram: math.log((n + 1) / total) for gram, n in counter.items()}, math.log(1 / total)
+
+
+def _load_profiles():
+    """Build trigram tables and per-topic Norwegian vocabularies (once per process)."""
+    global _profiles
+
+    if _profiles is None:
+        with _profiles_lock:
+            if _profiles is None:
+                with open(CHALLENGES_PATH, "r", encoding="utf-8") as f:
+                    challenges = json.load(f).get("challenges", [])
+
+                norwegian, english = Counter(), Counter()
+                topic_words = {}
+                for challenge in challenges:
+                    for field in NORWEGIAN_FIELDS:
+                        text = (challenge.get(field) or "").replace("___", challenge.get("missing_word", ""))
+                        norwegian.update(char_trigrams(text))
+                        words = {w for w in _letters_only(text).split() if len(w) >= MIN_TOPIC_WORD_LENGTH}
+                        topic_words.setdefault(challenge.get("topic"), set()).update(words)
+                    for field in ENGLISH_FIELDS:
+                        english.update(char_trigrams(challenge.get(field) or ""))
+
+                _profiles = {
+                    "no": _log_probabilities(norwegian),
+                    "en": _log_probabilities(english),
+                    "topic_words": topic_words
+                }
+
+    return _profiles
+
+
+def norwegian_probability(text):
+    """
+    Probability-like score (0-1) that text is Norwegian rather than English.
+
+    Returns:
+        float - 0.5 when there is nothing to judge
+    """
+    trigrams = char_trigrams(text)
+    if not trigrams:
+        return 0.5
+
+    profiles = _load_profiles()
+    (no_table, no_unseen), (en_table, en_unseen) = profiles["no"], profiles["en"]
+    ratio = sum(no_table.get(t, no_unseen) - en_table.get(t, en_unseen) for t in trigrams) / len(trigrams)
+    return 1.0 / (1.0 + math.exp(-ratio / LANGUAGE_SCALE))
+
+
+def topic_overlap(text, topic):
+    """Share (0-1) of the text's content words that appear in challenges on this topic."""
+    words = [w for w in _letters_only(text).split() if len(w) >= MIN_TOPIC_WORD_LENGTH]
+    vocabulary = _load_profiles()["topic_words"].get(topic)
+    if not words or not vocabulary:
+        return 0.0
+    return sum(w in vocabulary for w in words) / len(words)
+
+
+def unique_word_ratio(text):
+    """Distinct words / total words (0-1); 1.0 for empty text."""
+    words = _letters_only(text).split()
+    return len(set(words)) / len(words) if words else 1.0
+
+
+def screen_text(text, required_words, topic, reject_below=40, accept_from=85):
+    """
+    Score a text locally and decide whether the LLM is needed.
+
+    Args:
+        text: str - User's text response
+        required_words: int - Minimum word count for the CEFR level
+        topic: str - Challenge topic
+        reject_below: float - Local scores below this fail without the LLM
+        accept_from: float - Local scores from this pass without the LLM (only if
+                     the word count requirement is met, some words are on topic
+                     and the unique word ratio is at least MIN_UNIQUE_WORD_RATIO)
+
+    Returns:
+        dict: {
+            decision: "accept" | "reject" | "uncertain",
+            local_score: int (0-100),
+            norwegian_probability: float,
+            word_count: int,
+            topic_overlap: float,
+            unique_word_ratio: float
+        }
+    """
+    word_count = len(text.split())
+    language = norwegian_probability(text)
+    length = min(1.0, word_count / required_words) if required_words else 1.0
+    overlap = topic_overlap(text, topic)
+
+    # A third of the content words on topic counts as fully on topic
+    local_score = int(round(
+        LANGUAGE_WEIGHT * language + LENGTH_WEIGHT * length + TOPIC_WEIGHT * min(1.0, overlap * 3)
+    ))
+    unique_ratio = unique_word_ratio(text)
+    acceptable = length >= 1.0 and overlap > 0 and unique_ratio >= MIN_UNIQUE_WORD_RATIO
+    if not acceptable:
+        # Off-topic or filler text may still be fine, but only the LLM can say so
+        local_score = min(local_score, int(math.ceil(accept_from)) - 1)
+
+    if local_score < reject_below:
+        decision = DECISION_REJECT
+    elif local_score >= accept_from and acceptable:
+        decision = DECISION_ACCEPT
+    else:
+        decision = DECISION_UNCERTAIN
+
+    return {
+        "decision": decision,
+        "local_score": local_score,
+        "norwegian_probability": round(language, 3),
+        "word_count": word_count,
+        "topic_overlap": round(overlap, 3),
+        "unique_word_ratio": round(unique_ratio, 3)
+    }
@@ -0,0 +1,192 @@
+# services_warmup.py
+"""
+Model warmup and readiness tracking.
+
+Whisper and CLIP are lazy-loaded on first use, which makes the first
+pronunciation or IRL request in every fresh worker several seconds slower.
+Gunicorn starts warmup in each worker right after fork (see post_fork in
+gunicorn_config.py); it loads the configured models in a background thread and
+runs one dummy inference through each. /ready reports not-ready until it is done.
+"""
+import logging
+import os
+import threading
+import time
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+WARMUP_STATUS_PENDING = "pending"
+WARMUP_STATUS_WARMING = "warming"
+WARMUP_STATUS_READY = "ready"
+WARMUP_STATUS_FAILED = "failed"
+
+_lock = threading.Lock()
+_thread = None
+_torch_lock = threading.Lock()
+_torch_threads = None
+_state = {
+    "status": WARMUP_STATUS_PENDING,
+    "started_at": None,
+    "finished_at": None,
+    "models": {}
+}
+
+
+def get_torch_thread_budget():
+    """
+    torch intra-op threads for this process: TORCH_NUM_THREADS, or the cores
+    split between web workers instead of every worker using all of them.
+    """
+    from config import get_config
+
+    cfg = get_config()
+    if cfg.TORCH_NUM_THREADS > 0:
+        return cfg.TORCH_NUM_THREADS
+    return max(1, (os.cpu_count() or 1) // max(1, cfg.WEB_CONCURRENCY))
+
+
+def apply_torch_thread_budget():
+    """
+    Set torch's thread pool size once per process, before the first model loads.
+
+    torch.set_num_threads is process-wide, so Whisper and CLIP share one budget
+    instead of each loader overriding the other's setting.
+
+    Returns:
+        int - Thread count in effect
+    """
+    global _torch_threads
+
+    with _torch_lock:
+        if _torch_threads is None:
+            import torch
+            _torch_threads = get_torch_thread_budget()
+            torch.set_num_threads(_torch_threads)
+            logger.info(f"torch uses {_torch_threads} intra-op threads")
+        return _torch_threads
+
+
+def _warmup_whisper():
+    """Load Whisper and transcribe one second of silence."""
+    import numpy as np
+    from services_audio import SAMPLE_RATE
+    from services_pronunciation import get_whisper_model, get_whisper_settings, get_decode_options, whisper_transcribe
+
+    model = get_whisper_model()
+    settings = get_whisper_settings()
+    # Bypasses the VAD in _transcribe_file, which would skip silent audio entirely
+    whisper_transcribe(
+        model,
+        np.zeros(SAMPLE_RATE, dtype=np.float32),
+        **get_decode_options(settings["decoding"], settings["beam_size"])
+    )
+
+
+def _warmup_clip():
+    """Load CLIP (and its topic embeddings) and score one blank photo."""
+    from PIL import Image
+    import services_irl_verification as verification
+
+    model, _ = verification._load_clip_model()
+
+    buffer = BytesIO()
+    Image.new("RGB", (320, 240), (128, 128, 128)).save(buffer, format="JPEG")
+    _, text_embeddings = verification._topic_embeddings[None]
+    verification.clip_topic_probs(model, text_embeddings, buffer.getvalue())
+
+
+WARMUP_STEPS = {
+    "whisper": _warmup_whisper,
+    "clip": _warmup_clip
+}
+
+
+def _set_state(**fields):
+    with _lock:
+        _state.update(fields)
+
+
+def warmup_models(models=None):
+    """
+    Load and exercise each model, recording load time per model.
+
+    A model that fails to load is recorded with its error; the worker still
+    becomes ready (status "failed") so callers fall back as they do today.
+
+    Args:
+        models: list of str - Names from WARMUP_STEPS (default: WARMUP_MODELS config)
+
+    Returns:
+        dict - Readiness state (see get_readiness)
+    """
+    from config import get_config
+
+    if models is None:
+        models = get_config().WARMUP_MODELS
+
+    _set_state(status=WARMUP_STATUS_WARMING, started_at=time.time())
+    failed = False
+
+    for name in models:
+        step = WARMUP_STEPS.get(name)
+        if step is None:
+            logger.warning(f"Unknown warmup model '{name}', skipping")
+            continue
+
+        start = time.perf_counter()
+        try:
+            step()
+            entry = {"loaded": True, "load_seconds": round(time.perf_counter() - start, 2)}
+            logger.info(f"Warmed up {name} in {entry['load_seconds']}s")
+        except Exception as e:
+            failed = True
+            entry = {"loaded": False, "load_seconds": round(time.perf_counter() - start, 2), "error": str(e)}
+            logger.error(f"Warmup of {name} failed: {e}")
+
+        with _lock:
+            _state["models"][name] = entry
+
+    _set_state(
+        status=WARMUP_STATUS_FAILED if failed else WARMUP_STATUS_READY,
+        finished_at=time.time()
+    )
+    return get_readiness()
+
+
+def start_warmup(models=None):
+    """
+    Start warmup in a background daemon thread (once per process).
+
+    Running in the background keeps the worker answering /health and /ready
+    while models load, instead of blocking past gunicorn's worker timeout.
+    """
+    global _thread
+
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=warmup_models, args=(models,), name="model-warmup", daemon=True)
+    _thread.start()
+
+
+def get_readiness():
+    """
+    Current warmup state of this process.
+
+    Returns:
+        dict: {
+            ready: bool,
+            status: "pending" | "warming" | "ready" | "failed",
+            warmup_seconds: float | None,
+            models: {name: {loaded, load_seconds, error?}}
+        }
+    """
+    with _lock:
+        started, finished = _state["started_at"], _state["finished_at"]
+        return {
+            "ready": _state["status"] in (WARMUP_STATUS_READY, WARMUP_STATUS_FAILED),
+            "status": _state["status"],
+            "warmup_seconds": round(finished - started, 2) if started and finished else None,
+            "models": {name: dict(entry) for name, entry in _state["models"].items()}
+        }
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the energy-based VAD (services_audio.py).
+
+No server, Firebase or ffmpeg needed:
+    python -m pytest test_audio.py
+"""
+import numpy as np
+
+from services_audio import detect_speech_bounds, trim_silence, SAMPLE_RATE
+
+
+def _speech(seconds, low=0.1, high=0.2, seed=0):
+    """Noise with a syllable-rate envelope between low and high amplitude."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = low + (high - low) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    return (rng.standard_normal(t.size) * envelope).astype(np.float32)
+
+
+def _silence(seconds, level=1e-4, seed=1):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * level).astype(np.float32)
+
+
+def test_speech_between_silences_is_trimmed():
+    audio = np.concatenate([_silence(1.0), _speech(1.0), _silence(1.0)])
+    start, end = detect_speech_bounds(audio)
+    assert 0.7 * SAMPLE_RATE < start < 1.0 * SAMPLE_RATE
+    assert 2.0 * SAMPLE_RATE < end < 2.3 * SAMPLE_RATE
+
+
+def test_continuous_speech_without_silence_is_kept_whole():
+    # About 6 dB of dynamic range: the 10th-percentile "noise floor" is speech
+    audio = _speech(2.0)
+    assert detect_speech_bounds(audio) == (0, len(audio))
+    assert len(trim_silence(audio)) == len(audio)
+
+
+def test_silence_has_no_speech():
+    assert detect_speech_bounds(_silence(2.0)) is None
+    assert detect_speech_bounds(np.zeros(SAMPLE_RATE, dtype=np.float32)) is None
+
+
+def test_empty_and_too_short_audio_has_no_speech():
+    assert detect_speech_bounds(np.zeros(0, dtype=np.float32)) is None
+    assert detect_speech_bounds(_speech(0.01)) is None
+
+
+def test_single_click_is_not_speech():
+    audio = _silence(2.0)
+    audio[SAMPLE_RATE:SAMPLE_RATE + 200] = 0.5
+    assert detect_speech_bounds(audio) is None
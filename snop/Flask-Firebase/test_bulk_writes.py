@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Unit tests for batched Firestore writes (services_bulk_writes.py).
+
+No server or Firebase needed: firebase_config is replaced by an in-memory
+database that can be told to fail commits:
+    python -m pytest test_bulk_writes.py
+"""
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("google.api_core.exceptions")
+from google.api_core.exceptions import AlreadyExists, ServiceUnavailable
+
+
+class _Ref:
+    def __init__(self, db, doc_id):
+        self.db = db
+        self.id = doc_id
+
+    def get(self):
+        data = self.db.docs.get(self.id)
+        return types.SimpleNamespace(exists=data is not None, to_dict=lambda: dict(data))
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append(("set", ref, data))
+
+    def update(self, ref, data):
+        self.writes.append(("update", ref, data))
+
+    def create(self, ref, data):
+        self.writes.append(("create", ref, data))
+
+    def commit(self):
+        self.db.commits.append([ref.id for _, ref, _ in self.writes])
+        if self.db.failures:
+            error = self.db.failures.pop(0)
+            if error is not None:
+                if getattr(error, "lands", False):
+                    self._apply()
+                raise error
+        for operation, ref, _ in self.writes:
+            if operation == "create" and ref.id in self.db.docs:
+                raise AlreadyExists(f"{ref.id} exists")
+        self._apply()
+
+    def _apply(self):
+        for _, ref, data in self.writes:
+            self.db.docs[ref.id] = dict(data)
+
+
+class _Database:
+    def __init__(self):
+        self.docs = {}
+        self.commits = []
+        self.failures = []  # Errors raised by the next commits (None = succeed)
+
+    def batch(self):
+        return _Batch(self)
+
+    def ref(self, doc_id):
+        return _Ref(self, doc_id)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = _Database()
+    monkeypatch.setitem(sys.modules, "firebase_config", types.SimpleNamespace(db=database))
+    monkeypatch.delitem(sys.modules, "services_bulk_writes", raising=False)
+    import services_bulk_writes
+    monkeypatch.setattr(services_bulk_writes.time, "sleep", lambda seconds: None)
+    return database
+
+
+@pytest.fixture
+def bulk(db):
+    import services_bulk_writes
+    return services_bulk_writes
+
+
+def _groups(db, sizes):
+    return [[(db.ref(f"g{g}w{w}"), {"n": w}) for w in range(size)] for g, size in enumerate(sizes)]
+
+
+def test_chunk_groups_packs_without_splitting(bulk):
+    groups = [[None] * size for size in (2, 2, 3, 1, 4)]
+    assert bulk._chunk_groups(groups, max_ops=4) == [[0, 1], [2, 3], [4]]
+
+
+def test_chunk_groups_larger_than_max_get_their_own_chunk(bulk):
+    groups = [[None] * size for size in (1, 6, 1)]
+    assert bulk._chunk_groups(groups, max_ops=4) == [[0], [1], [2]]
+    assert bulk._chunk_groups([], max_ops=4) == []
+
+
+def test_bulk_set_writes_every_group(db, bulk):
+    groups = _groups(db, [2] * 10)
+    result = bulk.bulk_set(groups, workers=3, retries=0, max_ops=4)
+
+    assert result["written"] == 20 and result["failed"] == 0
+    assert result["batches"] == 5
+    assert len(db.docs) == 20
+
+
+def test_failed_batch_is_retried(db, bulk):
+    db.failures = [ServiceUnavailable("try again")]
+    result = bulk.bulk_set(_groups(db, [2, 2]), workers=1, retries=2)
+
+    assert result["failed_groups"] == set()
+    assert len(db.commits) == 2
+    assert len(db.docs) == 4
+
+
+def test_batch_failing_every_retry_reports_its_groups(db, bulk):
+    db.failures = [ServiceUnavailable("down")] * 3
+    result = bulk.bulk_set(_groups(db, [2, 2, 1]), workers=1, retries=2, max_ops=4)
+
+    # First chunk (groups 0 and 1) fails all 3 attempts, the second chunk is written
+    assert result["failed_groups"] == {0, 1}
+    assert result["failed"] == 4 and result["written"] == 1
+    assert result["conflict_groups"] == set()
+
+
+def test_create_conflict_only_fails_its_group(db, bulk):
+    db.docs["hash1"] = {"challenge_id": "other"}
+    groups = [
+        [(db.ref(f"c{n}"), {"n": n}), (db.ref(f"hash{n}"), {"challenge_id": f"c{n}"}, bulk.WRITE_CREATE)]
+        for n in range(3)
+    ]
+    result = bulk.bulk_set(groups, workers=1, retries=2)
+
+    assert result["failed_groups"] == result["conflict_groups"] == {1}
+    assert "c1" not in db.docs          # The group's other writes are not applied either
+    assert db.docs["hash1"] == {"challenge_id": "other"}
+    assert {"c0", "c2", "hash0", "hash2"} <= set(db.docs)
+
+
+def test_retried_create_that_already_landed_counts_as_written(db, bulk):
+    landed = ServiceUnavailable("timeout after commit")
+    landed.lands = True
+    db.failures = [landed]
+    groups = [[(db.ref("c0"), {"n": 0}), (db.ref("hash0"), {"challenge_id": "c0"}, bulk.WRITE_CREATE)]]
+
+    result = bulk.bulk_set(groups, workers=1, retries=2)
+    assert result["failed_groups"] == set()
+    assert result["written"] == 2
+
+
+def test_update_mode_uses_update(db, bulk, monkeypatch):
+    db.docs["a"] = {"status": "available"}
+    operations = []
+    monkeypatch.setattr(_Batch, "update", lambda self, ref, data: operations.append(("update", ref.id)))
+    monkeypatch.setattr(_Batch, "set", lambda self, ref, data: operations.append(("set", ref.id)))
+
+    bulk.bulk_set([[(db.ref("a"), {"status": "archived"})]], workers=1, retries=0, update=True)
+    assert operations == [("update", "a")]
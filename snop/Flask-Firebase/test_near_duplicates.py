@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Unit tests for near-duplicate detection (services_near_duplicates.py).
+
+No server or Firebase needed (the pool is never scanned: every test starts
+from an index file or an in-memory index):
+    python -m pytest test_near_duplicates.py
+"""
+import os
+import threading
+
+import pytest
+
+import services_near_duplicates as near
+from config import get_config
+from services_near_duplicates import NearDuplicateIndex, filter_near_duplicates, record_challenges
+
+
+def _challenge(target, cefr_level="A1", challenge_type="pronunciation"):
+    return {"type": challenge_type, "cefr_level": cefr_level, "target": target}
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    """A fresh index file path, with no index loaded in this process."""
+    path = str(tmp_path / "near_duplicates.npz")
+    monkeypatch.setattr(get_config(), "NEAR_DUPLICATE_INDEX_PATH", path)
+    monkeypatch.setattr(near, "_index", None)
+    monkeypatch.setattr(near, "_index_mtime", None)
+    return path
+
+
+def _write_index(path, entries):
+    index = NearDuplicateIndex()
+    for key, challenge in entries:
+        index.add(key, challenge)
+    index.save(path)
+    return index
+
+
+def _bump_mtime(path):
+    """Make a rewrite visible even on filesystems with coarse timestamps."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_paraphrase_is_similar_and_other_text_is_not():
+    index = NearDuplicateIndex()
+    index.add("kaffe", _challenge("Jeg vil gjerne ha en kaffe"))
+
+    similarity, key = index.most_similar(_challenge("Jeg vil gjerne ha kaffe, takk"))
+    assert key == "kaffe" and similarity > 0.7
+
+    similarity, _ = index.most_similar(_challenge("Hvor ligger togstasjonen?"))
+    assert similarity < 0.3
+
+
+def test_groups_are_separated_by_level_and_type():
+    index = NearDuplicateIndex()
+    index.add("kaffe", _challenge("Jeg vil gjerne ha en kaffe"))
+    assert index.most_similar(_challenge("Jeg vil gjerne ha en kaffe", cefr_level="B1")) == (0.0, None)
+    assert index.most_similar(_challenge("Jeg vil gjerne ha en kaffe", challenge_type="listening")) == (0.0, None)
+
+
+def test_threshold_decides_rejection(index_path):
+    _write_index(index_path, [("kaffe", _challenge("Jeg vil gjerne ha en kaffe"))])
+    paraphrase = _challenge("Jeg vil gjerne ha kaffe, takk")
+    similarity = near.get_index().most_similar(paraphrase)[0]
+
+    kept, rejected = filter_near_duplicates([paraphrase], threshold=similarity)
+    assert kept == [] and rejected[0]["duplicate_of"] == "kaffe"
+
+    kept, rejected = filter_near_duplicates([paraphrase], threshold=similarity + 0.01)
+    assert kept == [paraphrase] and rejected == []
+
+
+def test_duplicates_within_one_batch_are_rejected(index_path):
+    _write_index(index_path, [])
+    first, second = _challenge("Jeg heter Anna"), _challenge("Jeg heter Anna!")
+    kept, rejected = filter_near_duplicates([first, second], threshold=0.9)
+    assert kept == [first]
+    assert rejected[0]["duplicate_of"] == "candidate_0"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = _write_index(path, [
+        (f"id{n}", _challenge(f"setning nummer {n}", cefr_level=level))
+        for n, level in enumerate(["A1", "A2"] * 20)
+    ])
+
+    loaded = NearDuplicateIndex.load(path)
+    assert len(loaded) == len(index) == 40
+    similarity, key = loaded.most_similar(_challenge("setning nummer 7", cefr_level="A2"))
+    assert key == "id7" and similarity > 0.99   # Vectors are stored as float16
+
+
+def test_index_with_other_settings_is_not_loaded(tmp_path, monkeypatch):
+    path = str(tmp_path / "index.npz")
+    _write_index(path, [("kaffe", _challenge("Jeg vil gjerne ha en kaffe"))])
+    monkeypatch.setattr(near, "VECTOR_VERSION", near.VECTOR_VERSION + 1)
+    assert NearDuplicateIndex.load(path) is None
+
+
+def test_merge_adds_only_missing_entries():
+    a, b = NearDuplicateIndex(), NearDuplicateIndex()
+    a.add("x", _challenge("Jeg heter Anna"))
+    b.add("x", _challenge("Jeg heter Anna"))
+    b.add("y", _challenge("Hvor bor du?"))
+
+    assert a.merge(b) == 1
+    assert len(a) == 2
+    assert a.merge(b) == 0
+
+
+def test_index_is_reloaded_when_another_process_saves(index_path):
+    _write_index(index_path, [("kaffe", _challenge("Jeg vil gjerne ha en kaffe"))])
+    assert len(near.get_index()) == 1
+
+    # Another worker saves a newer file
+    _write_index(index_path, [
+        ("kaffe", _challenge("Jeg vil gjerne ha en kaffe")),
+        ("te", _challenge("Kan jeg få en kopp te?"))
+    ])
+    _bump_mtime(index_path)
+
+    assert len(near.get_index()) == 2
+    assert near.get_index().most_similar(_challenge("Kan jeg få en kopp te?"))[1] == "te"
+
+
+def test_save_merges_entries_saved_by_another_process(index_path):
+    _write_index(index_path, [("kaffe", _challenge("Jeg vil gjerne ha en kaffe"))])
+    near.get_index()
+
+    # Another worker adds "te" after this process loaded the file
+    _write_index(index_path, [
+        ("kaffe", _challenge("Jeg vil gjerne ha en kaffe")),
+        ("te", _challenge("Kan jeg få en kopp te?"))
+    ])
+    _bump_mtime(index_path)
+    # ...and this process records "brød" from its stale copy
+    stale_mtime = near._index_mtime
+    near._index.add("brød", _challenge("Et brød, takk"))
+    near._save(near._index, index_path)
+
+    on_disk = NearDuplicateIndex.load(index_path)
+    assert len(on_disk) == 3
+    assert on_disk.most_similar(_challenge("Kan jeg få en kopp te?"))[1] == "te"
+    assert near._index_mtime != stale_mtime
+
+
+def test_record_challenges_persists(index_path):
+    _write_index(index_path, [])
+    record_challenges(["id1"], [_challenge("Jeg heter Anna")])
+    assert NearDuplicateIndex.load(index_path).most_similar(_challenge("Jeg heter Anna"))[1] == "id1"
+
+
+def test_concurrent_records_are_all_saved(index_path):
+    _write_index(index_path, [])
+    threads = [
+        threading.Thread(target=record_challenges, args=([f"id{n}"], [_challenge(f"setning nummer {n}")]))
+        for n in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    on_disk = NearDuplicateIndex.load(index_path)
+    assert len(on_disk) == 8
+    assert near._index_mtime == os.stat(index_path).st_mtime_ns
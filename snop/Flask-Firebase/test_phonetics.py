@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Norwegian phonetic helpers (services_phonetics.py).
+
+No server or Firebase needed:
+    python -m pytest test_phonetics.py
+"""
+import random
+
+from services_phonetics import (
+    word_to_phonemes,
+    text_to_phonemes,
+    phoneme_ids,
+    weighted_edit_distance,
+    phonetic_similarity,
+    SUBSTITUTION_COSTS,
+    PHONEMES,
+    PHONEME_IDS,
+    INDEL_COST,
+    LENGTH_COST
+)
+
+
+def _similarity(a, b):
+    return phonetic_similarity(text_to_phonemes(a), text_to_phonemes(b))
+
+
+def _reference_distance(source, target):
+    """Textbook weighted edit distance over phoneme lists."""
+    prev = [j * INDEL_COST for j in range(len(target) + 1)]
+    for i, a in enumerate(source, 1):
+        row = [i * INDEL_COST]
+        for j, b in enumerate(target, 1):
+            row.append(min(
+                prev[j] + INDEL_COST,
+                row[j - 1] + INDEL_COST,
+                prev[j - 1] + float(SUBSTITUTION_COSTS[PHONEME_IDS[a], PHONEME_IDS[b]])
+            ))
+        prev = row
+    return prev[-1]
+
+
+def test_g2p_rules_and_exceptions():
+    assert word_to_phonemes("jeg") == ["j", "æi"]
+    assert word_to_phonemes("kjøre") == ["ç", "ø", "r", "ə"]
+    assert word_to_phonemes("sjø") == ["ʃ", "ø"]
+    assert word_to_phonemes("kart") == ["k", "a", "ʈ"]
+
+
+def test_double_consonants_are_long():
+    assert word_to_phonemes("takk") == ["t", "a", "kː"]
+    assert word_to_phonemes("tak") == ["t", "a", "k"]
+
+
+def test_consonant_length_is_scored():
+    assert _similarity("tak", "takk") < 1.0
+    assert _similarity("hat", "hatt") < 1.0
+    assert SUBSTITUTION_COSTS[PHONEME_IDS["k"], PHONEME_IDS["kː"]] == LENGTH_COST
+    # Length alone costs less than a different consonant
+    assert _similarity("tak", "takk") > _similarity("tak", "tap")
+
+
+def test_near_homophones_score_close_but_not_equal():
+    assert 0.8 < _similarity("kjøre", "sjøre") < 1.0
+    assert _similarity("kjøre", "sjøre") > _similarity("kjøre", "føre")
+
+
+def test_identical_and_empty():
+    assert _similarity("jeg heter anna", "jeg heter anna") == 1.0
+    assert phonetic_similarity([], []) == 1.0
+    assert _similarity("hei", "") == 0.0
+
+
+def test_substitution_matrix_is_symmetric_with_zero_diagonal():
+    assert (SUBSTITUTION_COSTS == SUBSTITUTION_COSTS.T).all()
+    assert all(SUBSTITUTION_COSTS[i, i] == 0.0 for i in range(len(PHONEMES)))
+
+
+def test_weighted_edit_distance_matches_reference():
+    rng = random.Random(5)
+    for _ in range(200):
+        source = [rng.choice(PHONEMES) for _ in range(rng.randrange(0, 15))]
+        target = [rng.choice(PHONEMES) for _ in range(rng.randrange(0, 15))]
+        expected = _reference_distance(source, target)
+        assert abs(weighted_edit_distance(phoneme_ids(source), phoneme_ids(target)) - expected) < 1e-4
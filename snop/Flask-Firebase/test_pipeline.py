@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the stage-graph runner (services_pipeline.py).
+
+No server or Firebase needed:
+    python -m pytest test_pipeline.py
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import services_pipeline
+from services_pipeline import Stage, run_stages, STAGE_OK, STAGE_FAILED, STAGE_TIMEOUT
+
+
+@pytest.fixture(autouse=True)
+def executor(monkeypatch):
+    """A private pool, so the tests don't need config.PIPELINE_WORKERS."""
+    pool = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(services_pipeline, "_executor", pool)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+def test_dependencies_receive_values_in_order():
+    results = run_stages([
+        Stage("a", lambda: 2),
+        Stage("b", lambda: 3),
+        Stage("sum", lambda a, b: a * 10 + b, deps=("a", "b"))
+    ])
+    assert results["sum"] == {"status": STAGE_OK, "value": 23, "seconds": results["sum"]["seconds"]}
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+    results = run_stages([
+        Stage("a", barrier.wait),
+        Stage("b", barrier.wait)
+    ])
+    assert results["a"]["status"] == results["b"]["status"] == STAGE_OK
+
+
+def test_failed_stage_uses_fallback():
+    errors = []
+    results = run_stages([
+        Stage("flaky", _fail, fallback=lambda e: errors.append(e) or "fallback"),
+        Stage("next", lambda value: value.upper(), deps=("flaky",))
+    ])
+    assert results["flaky"]["status"] == STAGE_FAILED
+    assert results["flaky"]["value"] == "fallback"
+    assert isinstance(errors[0], RuntimeError)
+    # Dependents still run, with the fallback value
+    assert results["next"]["value"] == "FALLBACK"
+
+
+def test_failed_stage_without_fallback_raises():
+    with pytest.raises(RuntimeError, match="boom"):
+        run_stages([Stage("flaky", _fail)])
+
+
+def test_timeout_uses_fallback_without_waiting_for_the_stage():
+    release = threading.Event()
+    start = time.perf_counter()
+    results = run_stages([
+        Stage("slow", lambda: release.wait(5), timeout=0.1, fallback=lambda e: type(e).__name__),
+        Stage("fast", lambda: "done")
+    ])
+    elapsed = time.perf_counter() - start
+    release.set()
+
+    assert results["slow"]["status"] == STAGE_TIMEOUT
+    assert results["slow"]["value"] == "TimeoutError"
+    assert results["fast"]["status"] == STAGE_OK
+    assert elapsed < 2
+
+
+def test_timeout_without_fallback_raises():
+    release = threading.Event()
+    try:
+        with pytest.raises(TimeoutError):
+            run_stages([Stage("slow", lambda: release.wait(5), timeout=0.05)])
+    finally:
+        release.set()
+
+
+def test_unknown_dependency_and_cycle_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        run_stages([Stage("a", lambda x: x, deps=("missing",))])
+    with pytest.raises(ValueError, match="cycle"):
+        run_stages([
+            Stage("a", lambda b: b, deps=("b",)),
+            Stage("b", lambda a: a, deps=("a",))
+        ])
+
+
+def test_cycle_behind_a_runnable_stage_is_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        run_stages([
+            Stage("start", lambda: 1),
+            Stage("a", lambda start, b: b, deps=("start", "b")),
+            Stage("b", lambda a: a, deps=("a",))
+        ])
+
+
+def test_timeout_counts_from_start_not_from_queueing(monkeypatch):
+    monkeypatch.setattr(services_pipeline, "_executor", ThreadPoolExecutor(max_workers=1))
+    results = run_stages([
+        Stage("busy", lambda: time.sleep(0.15)),
+        # Queued behind "busy" for 0.15 s, then runs 0.1 s: within its own 0.2 s
+        Stage("queued", lambda: time.sleep(0.1) or "done", timeout=0.2)
+    ])
+    assert results["queued"]["status"] == STAGE_OK
+    assert results["queued"]["value"] == "done"
+
+
+def test_stage_never_started_within_its_timeout_is_cancelled(monkeypatch):
+    monkeypatch.setattr(services_pipeline, "_executor", ThreadPoolExecutor(max_workers=1))
+    started = []
+    results = run_stages([
+        Stage("busy", lambda: time.sleep(0.3)),
+        Stage("queued", lambda: started.append(True), timeout=0.05, fallback=lambda e: None)
+    ])
+    assert results["queued"]["status"] == STAGE_TIMEOUT
+    assert started == []
+
+
+def test_timed_out_stage_threads_are_counted_until_they_finish():
+    release = threading.Event()
+    finished = threading.Event()
+
+    def slow():
+        release.wait(5)
+        finished.set()
+
+    run_stages([Stage("slow", slow, timeout=0.05, fallback=lambda e: None)])
+    assert services_pipeline._abandoned == 1
+
+    release.set()
+    finished.wait(1)
+    time.sleep(0.05)   # Let the wrapper's finally block run
+    assert services_pipeline._abandoned == 0
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Unit tests for usage buffering and refill requests (services_pool_refill.py).
+
+No server or Firebase needed: firebase_config is replaced by an in-memory
+database that records writes:
+    python -m pytest test_pool_refill.py
+"""
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("firebase_admin")
+from firebase_admin import firestore
+
+import services_pool_refill as refill
+
+
+class _Doc:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def set(self, data, merge=False):
+        if self.db.fail:
+            raise RuntimeError("unavailable")
+        self.db.writes.append((self.path, data, merge))
+        stored = self.db.docs.setdefault(self.path, {}) if merge else {}
+        stored.update(data)
+        self.db.docs[self.path] = stored
+
+    def get(self):
+        data = self.db.docs.get(self.path)
+        return types.SimpleNamespace(exists=data is not None, to_dict=lambda: dict(data))
+
+
+class _Collection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def document(self, doc_id):
+        return _Doc(self.db, f"{self.name}/{doc_id}")
+
+
+class _Database:
+    def __init__(self):
+        self.docs = {}
+        self.writes = []
+        self.fail = False
+
+    def collection(self, name):
+        return _Collection(self, name)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = _Database()
+    monkeypatch.setitem(sys.modules, "firebase_config", types.SimpleNamespace(db=database))
+    monkeypatch.setattr(refill, "_usage_buffer", {})
+    monkeypatch.setattr(refill, "_last_refill_request", 0.0)
+    monkeypatch.setattr(refill, "_wake", refill.threading.Event())
+    return database
+
+
+@pytest.fixture
+def scheduler_running(monkeypatch):
+    monkeypatch.setattr(refill, "_thread", object())
+
+
+def _uses(data):
+    return {
+        level: {challenge_type: value.value for challenge_type, value in by_type.items()}
+        for level, by_type in data["uses"].items()
+    }
+
+
+def test_usage_is_buffered_while_the_scheduler_runs(db, scheduler_running):
+    for _ in range(3):
+        refill.record_pool_usage("A1", "listening")
+    refill.record_pool_usage("A2", "pronunciation", count=2)
+    assert db.writes == []
+
+    assert refill.flush_pool_usage() == 5
+    assert len(db.writes) == 1
+    path, data, merge = db.writes[0]
+    assert path.startswith(f"{refill.USAGE_COLLECTION}/") and merge
+    assert isinstance(data["uses"]["A1"]["listening"], firestore.Increment)
+    assert _uses(data) == {"A1": {"listening": 3}, "A2": {"pronunciation": 2}}
+
+    assert refill.flush_pool_usage() == 0
+    assert len(db.writes) == 1
+
+
+def test_usage_is_written_immediately_without_a_scheduler(db):
+    refill.record_pool_usage("A1", "listening")
+    assert len(db.writes) == 1
+    assert refill._usage_buffer == {}
+
+
+def test_failed_flush_keeps_the_counts(db, scheduler_running):
+    refill.record_pool_usage("A1", "listening")
+    db.fail = True
+    assert refill.flush_pool_usage() == 0
+
+    refill.record_pool_usage("A1", "listening")
+    db.fail = False
+    assert refill.flush_pool_usage() == 2
+    assert _uses(db.writes[0][1]) == {"A1": {"listening": 2}}
+
+
+def test_empty_pool_is_flagged_on_the_lease_once_per_gap(db, scheduler_running):
+    refill.notify_pool_empty("listening")
+    refill.notify_pool_empty("pronunciation")
+
+    lease_path = f"{refill.LEASE_COLLECTION}/{refill.LEASE_DOCUMENT}"
+    assert [path for path, _, _ in db.writes] == [lease_path]
+    assert db.docs[lease_path]["refill_requested"] is True
+    assert refill._wake.is_set()
+
+
+def test_empty_pool_of_other_types_is_ignored(db, scheduler_running):
+    refill.notify_pool_empty("irl")
+    assert db.writes == []
+
+
+def test_only_the_lease_holder_acts_on_a_request(db, monkeypatch):
+    lease_path = f"{refill.LEASE_COLLECTION}/{refill.LEASE_DOCUMENT}"
+    me = f"{refill.socket.gethostname()}:{refill.os.getpid()}"
+    now = refill.time.time()
+
+    db.docs[lease_path] = {"owner": "other:1", "expires_at": now + 600, "refill_requested": True}
+    assert not refill._refill_requested()
+
+    db.docs[lease_path] = {"owner": me, "expires_at": now + 600, "refill_requested": True}
+    assert refill._refill_requested()
+
+    # An expired lease can be taken by anyone
+    db.docs[lease_path] = {"owner": "other:1", "expires_at": now - 1, "refill_requested": True}
+    assert refill._refill_requested()
+
+    db.docs[lease_path] = {"owner": me, "expires_at": now + 600}
+    assert not refill._refill_requested()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Whisper inference in services_pronunciation.py.
+
+No server, Firebase or Whisper model needed (a stub model stands in):
+    python -m pytest test_pronunciation.py
+"""
+import threading
+import time
+
+import numpy as np
+
+import services_audio
+from services_pronunciation import _transcribe_file
+
+
+class _StubModel:
+    """Records how many transcribe() calls overlap."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, **options):
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        return {"text": " hei "}
+
+
+def test_concurrent_transcriptions_are_serialized(monkeypatch):
+    monkeypatch.setattr(services_audio, "load_audio", lambda path: np.ones(16000, dtype=np.float32))
+    monkeypatch.setattr(services_audio, "trim_silence", lambda audio: audio)
+    model = _StubModel()
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(_transcribe_file("a.wav", model=model, decode_options={})))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["hei"] * 4
+    assert model.calls == 4
+    assert model.max_active == 1
+
+
+def test_silent_recording_skips_the_model(monkeypatch):
+    monkeypatch.setattr(services_audio, "load_audio", lambda path: np.zeros(16000, dtype=np.float32))
+    monkeypatch.setattr(services_audio, "trim_silence", lambda audio: None)
+    model = _StubModel()
+
+    assert _transcribe_file("a.wav", model=model, decode_options={}) == ""
+    assert model.calls == 0
+
+
+def test_undecodable_recording_is_treated_as_silence(monkeypatch):
+    def load_audio(path):
+        raise RuntimeError("Failed to load audio: Invalid data found when processing input")
+
+    monkeypatch.setattr(services_audio, "load_audio", load_audio)
+    model = _StubModel()
+
+    assert _transcribe_file("empty.m4a", model=model, decode_options={}) == ""
+    assert model.calls == 0
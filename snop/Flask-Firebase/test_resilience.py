@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Ollama guards (services_resilience.py).
+
+No server or Firebase needed:
+    python -m pytest test_resilience.py
+"""
+import pytest
+
+import services_resilience
+from services_resilience import (
+    ResultCache,
+    CircuitBreaker,
+    BREAKER_CLOSED,
+    BREAKER_OPEN,
+    BREAKER_HALF_OPEN
+)
+
+
+class _Clock:
+    """Stands in for the time module, so expiry and cool-downs need no sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(services_resilience, "time", fake)
+    return fake
+
+
+def test_cache_hit_and_miss_counts():
+    cache = ResultCache(max_entries=4)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_cache_entries_expire_after_ttl(clock):
+    cache = ResultCache(ttl_seconds=60)
+    cache.set("a", 1)
+
+    clock.now += 60
+    assert cache.get("a") == 1
+
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")       # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_cache_set_refreshes_entry(clock):
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    clock.now += 50
+    cache.set("a", 10)   # New value, new timestamp, most recently used
+    cache.set("c", 3)
+
+    clock.now += 20
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+
+def test_cache_clear():
+    cache = ResultCache()
+    cache.set("a", 1)
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()["trips"] == 1
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED
+
+
+def test_slow_success_counts_as_failure(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=1, slow_call_seconds=10)
+    breaker.record_success(11)
+    assert breaker.state == BREAKER_OPEN
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+
+    clock.now += 29
+    assert not breaker.allow_request()
+
+    clock.now += 1
+    assert breaker.state == BREAKER_HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()   # Probe already in flight
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_success(0.5)
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker("ollama", failure_threshold=3, reset_seconds=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+
+    # A single failed probe reopens, regardless of failure_threshold
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()["trips"] == 2
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pronunciation scoring engine (services_scoring.py).
+
+No server or Firebase needed:
+    python -m pytest test_scoring.py
+"""
+import random
+from difflib import SequenceMatcher
+
+from services_scoring import (
+    similarity_ratio,
+    align_words,
+    levenshtein_matrix,
+    _small_levenshtein_matrix,
+    _encode_words,
+    WORD_CORRECT,
+    WORD_SUBSTITUTED,
+    WORD_MISSING
+)
+
+
+def _reference_lcs(a, b):
+    """Textbook O(n*m) LCS."""
+    prev = [0] * (len(b) + 1)
+    for ch in a:
+        row = [0]
+        for j, other in enumerate(b, 1):
+            row.append(prev[j - 1] + 1 if ch == other else max(prev[j], row[j - 1]))
+        prev = row
+    return prev[-1]
+
+
+def test_similarity_ratio_is_sequence_matcher():
+    rng = random.Random(11)
+    for _ in range(200):
+        a = "".join(rng.choice("abcdefg ") for _ in range(rng.randrange(0, 40)))
+        b = "".join(rng.choice("abcdefg ") for _ in range(rng.randrange(0, 40)))
+        assert similarity_ratio(a, b) == SequenceMatcher(None, a, b).ratio()
+        # The LCS ratio is an upper bound, not the same metric
+        if a or b:
+            assert similarity_ratio(a, b) <= 2 * _reference_lcs(a, b) / (len(a) + len(b)) + 1e-12
+
+
+def test_similarity_ratio_edges():
+    assert similarity_ratio("", "") == 1.0
+    assert similarity_ratio("hei", "") == 0.0
+    assert similarity_ratio("jeg heter anna", "jeg heter anna") == 1.0
+
+
+def test_align_words_correct_substituted_missing_extra():
+    words, extra = align_words("jeg vil ha en kake".split(), "jeg vil gjerne ha en kaffe".split())
+
+    assert [(w["word"], w["status"]) for w in words] == [
+        ("jeg", WORD_CORRECT),
+        ("vil", WORD_CORRECT),
+        ("gjerne", WORD_MISSING),
+        ("ha", WORD_CORRECT),
+        ("en", WORD_CORRECT),
+        ("kaffe", WORD_SUBSTITUTED)
+    ]
+    assert words[-1]["heard"] == "kake"
+    assert extra == []
+
+
+def test_align_words_extra_words():
+    words, extra = align_words("eh jeg heter anna".split(), "jeg heter anna".split())
+    assert all(w["status"] == WORD_CORRECT for w in words)
+    assert extra == ["eh"]
+
+
+def test_align_words_empty():
+    words, extra = align_words([], ["hei", "der"])
+    assert [w["status"] for w in words] == [WORD_MISSING, WORD_MISSING]
+    assert extra == []
+
+    words, extra = align_words(["hei"], [])
+    assert words == [] and extra == ["hei"]
+
+
+def test_numpy_and_list_matrices_agree():
+    rng = random.Random(3)
+    vocabulary = ["jeg", "vil", "ha", "kaffe", "takk", "en", "og"]
+    for _ in range(50):
+        heard = [rng.choice(vocabulary) for _ in range(rng.randrange(0, 30))]
+        target = [rng.choice(vocabulary) for _ in range(rng.randrange(0, 30))]
+        source, encoded_target = _encode_words(heard, target)
+        assert levenshtein_matrix(source, encoded_target).tolist() == _small_levenshtein_matrix(heard, target)
+
+
+def test_long_phrases_use_numpy_path_with_same_result():
+    target = ("jeg " * 30).split()
+    heard = target[:10] + ["du"] + target[11:]
+    words, extra = align_words(heard, target)
+    assert sum(w["status"] == WORD_SUBSTITUTED for w in words) == 1
+    assert extra == []
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local IRL text screening (services_text_screening.py).
+
+No server or Firebase needed:
+    python -m pytest test_text_screening.py
+"""
+from services_text_screening import (
+    screen_text,
+    unique_word_ratio,
+    DECISION_ACCEPT,
+    DECISION_REJECT,
+    DECISION_UNCERTAIN
+)
+
+ON_TOPIC_FOOD = "Jeg kjøpte brød og melk i butikken i dag, det var veldig hyggelig"
+
+
+def test_norwegian_on_topic_text_is_accepted():
+    result = screen_text(ON_TOPIC_FOOD, required_words=5, topic="food")
+    assert result["decision"] == DECISION_ACCEPT
+    assert result["topic_overlap"] > 0
+
+
+def test_english_text_is_rejected():
+    result = screen_text("Hello there, how are you", required_words=10, topic="shopping")
+    assert result["decision"] == DECISION_REJECT
+    assert result["norwegian_probability"] < 0.5
+
+
+def test_norwegian_off_topic_text_goes_to_llm():
+    result = screen_text(ON_TOPIC_FOOD, required_words=5, topic="shopping")
+    assert result["topic_overlap"] == 0
+    assert result["decision"] == DECISION_UNCERTAIN
+    assert result["local_score"] < 85
+
+
+def test_repeated_filler_is_never_accepted():
+    for text in ("jeg jeg jeg jeg jeg", " ".join(["og"] * 15)):
+        for topic in ("food", "shopping"):
+            result = screen_text(text, required_words=5, topic=topic, accept_from=85)
+            assert result["decision"] != DECISION_ACCEPT, (text, topic)
+            assert result["local_score"] < 85
+
+
+def test_repetition_blocks_accept_even_on_topic():
+    text = "brød brød brød brød brød brød melk"
+    result = screen_text(text, required_words=5, topic="food")
+    assert result["unique_word_ratio"] < 0.6
+    assert result["decision"] == DECISION_UNCERTAIN
+
+
+def test_short_text_is_not_accepted():
+    result = screen_text("Jeg kjøpte brød", required_words=20, topic="food")
+    assert result["decision"] != DECISION_ACCEPT
+
+
+def test_unique_word_ratio():
+    assert unique_word_ratio("jeg jeg jeg jeg") == 0.25
+    assert unique_word_ratio("Jeg liker kaffe") == 1.0
+    assert unique_word_ratio("") == 1.0